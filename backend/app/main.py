@@ -1,9 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+import httpx
 from fastapi import FastAPI
-from backend.app.routes import agent, settings, users  # Import the users router
+from backend.app.routes import agent, llm, metrics, settings, users  # Import the users router
+from backend.app.routes.users import get_headers
+from backend.app.services.agent_registry import agent_registry, fetch_agents
+from backend.app.services.agent_service import task_dispatcher
+from backend.app.services.analytics import record_task_event
+from backend.app.services.autoscaler import AUTOSCALER_ENABLED, autoscalers
+from backend.app.services.forecasting import FORECAST_REFRESH_INTERVAL, forecaster
+from backend.app.services.health_checks import health_checker
+from backend.app.services.llm_service import llm_gateway, supabase_rate_limits
+from backend.app.services.metrics_store import (
+    METRICS_FLUSH_INTERVAL, RESOLUTIONS, fetch_agent_metrics, metrics_store, record_llm_call, record_task, supabase_metrics_writer,
+)
+from backend.app.services.process_pool import process_pool
+from backend.app.services.quotas import resource_governor, supabase_resource_limits
+from backend.app.services.supabase_client import REST_TIMEOUT, SUPABASE_URL, supabase_lifespan
 
-app = FastAPI()
+# Warm the in-memory agent registry from the agents/agent_details tables
+async def load_agent_registry(client: httpx.AsyncClient):
+    try:
+        await agent_registry.load_in_background(await fetch_agents(client, get_headers(), timeout=REST_TIMEOUT))
+    except httpx.HTTPError as e:
+        print(f"Agent registry not loaded ({type(e).__name__}): {e}")
+
+# Merge the persisted daily metrics of the metrics store's retention back in
+async def load_metrics(client: httpx.AsyncClient):
+    since = datetime.now(timezone.utc).date() - timedelta(days=RESOLUTIONS[-1][1])
+    try:
+        metrics_store.load(await fetch_agent_metrics(client, get_headers(), since, timeout=REST_TIMEOUT))
+    except httpx.HTTPError as e:
+        print(f"Metrics history not loaded ({type(e).__name__}): {e}")
+
+# The lifespan owns the pooled Supabase HTTP client shared by all routes, loads the agent
+# registry and the metrics history without holding up startup, and runs the task dispatcher, the process pool, their
+# autoscalers, the agent health checker, the metrics store, the forecaster and the LLM gateway. Finished
+# tasks feed the metrics store and the analytics engine.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with supabase_lifespan(app):
+        background_loads = []
+        if SUPABASE_URL and users.SUPABASE_KEY:
+            background_loads.append(asyncio.create_task(load_agent_registry(app.state.supabase_client)))
+            background_loads.append(asyncio.create_task(load_metrics(app.state.supabase_client)))
+            metrics_store.writer = supabase_metrics_writer(app.state.supabase_client, get_headers())
+            llm_gateway.tenant_rate_limit = supabase_rate_limits(app.state.supabase_client, get_headers())
+            resource_governor.tenant_limits = supabase_resource_limits(app.state.supabase_client, get_headers())
+        else:
+            print("Agent registry not loaded: SUPABASE_URL and SUPABASE_KEY must be set")
+        await process_pool.start()
+        await task_dispatcher.start()
+        if AUTOSCALER_ENABLED:
+            for autoscaler in autoscalers.values():
+                autoscaler.start()
+        health_checker.start()
+        task_dispatcher.finish_listeners[:] = [record_task, record_task_event]
+        llm_gateway.on_usage = record_llm_call
+        metrics_store.start(METRICS_FLUSH_INTERVAL)
+        forecaster.start(FORECAST_REFRESH_INTERVAL)
+        try:
+            yield
+        finally:
+            for load in background_loads:
+                load.cancel()
+            await asyncio.gather(*background_loads, return_exceptions=True)
+            await health_checker.stop()
+            for autoscaler in autoscalers.values():
+                await autoscaler.stop()
+            await task_dispatcher.stop()
+            await process_pool.stop()
+            await forecaster.stop()
+            await metrics_store.stop()
+            await llm_gateway.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(agent.router)
+app.include_router(llm.router)
+app.include_router(metrics.router)
 app.include_router(settings.router)
 app.include_router(users.router)  # Include the users router
 
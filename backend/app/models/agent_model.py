@@ -1,6 +1,208 @@
-# Placeholder for agent data model
+# Agent data model: a compact per-agent object and a columnar table for large fleets
+
+import sys
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ("agent_type", "status", "llm_base")
+NUMERIC_COLUMNS = ("performance", "learning_rate", "temperature", "max_tokens")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class Agent:
-    def __init__(self, name, agent_type):
+    __slots__ = ("id", "tenant_id", "name", "agent_type", "status", "llm_base") + NUMERIC_COLUMNS
+
+    def __init__(self, name, agent_type, id=None, tenant_id=None, status=None, llm_base=None,
+                 performance=None, learning_rate=None, temperature=None, max_tokens=None):
+        self.id = id
+        self.tenant_id = _intern(tenant_id)
         self.name = name
-        self.agent_type = agent_type
+        # Categorical values repeat across agents, so share one string object per value
+        self.agent_type = _intern(agent_type)
+        self.status = _intern(status)
+        self.llm_base = _intern(llm_base)
+        self.performance = performance
+        self.learning_rate = learning_rate
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    # Build from a row of the agents/agent_details tables, where the type column is `type`
+    @classmethod
+    def from_record(cls, record: dict):
+        return cls(
+            record.get("name"), record.get("type", record.get("agent_type")),
+            **{field: record.get(field) for field in ("id", "tenant_id", "status", "llm_base") + NUMERIC_COLUMNS},
+        )
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"Agent(id={self.id!r}, name={self.name!r}, agent_type={self.agent_type!r}, status={self.status!r})"
+
+
+class CategoricalColumn:
+    def __init__(self):
+        self.categories = [None]  # code 0 is reserved for missing values
+        self.codes_by_value = {None: 0}
+
+    def code(self, value):
+        code = self.codes_by_value.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(_intern(value))
+            self.codes_by_value[value] = code
+        return code
+
+    # Code for an existing value, or -1 when the value never occurs (matches nothing)
+    def lookup(self, value):
+        return self.codes_by_value.get(value, -1)
+
+
+# Columnar store for many agents: numeric columns are float32 arrays (NaN when unset),
+# categorical columns are int32 code arrays over interned category lists.
+class AgentTable:
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._capacity = capacity
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.names = []
+        self.tenant_ids = []
+        self.numeric = {column: np.full(capacity, np.nan, dtype=np.float32) for column in NUMERIC_COLUMNS}
+        self.codes = {column: np.zeros(capacity, dtype=np.int32) for column in CATEGORICAL_COLUMNS}
+        self.categories = {column: CategoricalColumn() for column in CATEGORICAL_COLUMNS}
+
+    def __len__(self):
+        return self._size
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        table = cls(capacity=max(len(records), 1))
+        table.extend(records)
+        return table
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2)
+        self.ids = np.resize(self.ids, capacity)
+        for column, values in self.numeric.items():
+            grown = np.full(capacity, np.nan, dtype=np.float32)
+            grown[:self._size] = values[:self._size]
+            self.numeric[column] = grown
+        for column, codes in self.codes.items():
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:self._size] = codes[:self._size]
+            self.codes[column] = grown
+        self._capacity = capacity
+
+    # Append Agent objects or table records (dicts with a `type` or `agent_type` key)
+    def extend(self, rows):
+        agents = [row if isinstance(row, Agent) else Agent.from_record(row) for row in rows]
+        self._reserve(len(agents))
+        start, end = self._size, self._size + len(agents)
+        self.ids[start:end] = [-1 if a.id is None else a.id for a in agents]
+        self.names.extend(a.name for a in agents)
+        self.tenant_ids.extend(_intern(a.tenant_id) for a in agents)
+        for column in NUMERIC_COLUMNS:
+            self.numeric[column][start:end] = [np.nan if getattr(a, column) is None else getattr(a, column) for a in agents]
+        for column in CATEGORICAL_COLUMNS:
+            encode = self.categories[column].code
+            self.codes[column][start:end] = [encode(getattr(a, column)) for a in agents]
+        self._size = end
+
+    def append(self, row):
+        self.extend([row])
+
+    def column(self, name):
+        if name in NUMERIC_COLUMNS:
+            return self.numeric[name][:self._size]
+        if name in CATEGORICAL_COLUMNS:
+            return self.codes[name][:self._size]
+        if name == "id":
+            return self.ids[:self._size]
+        raise KeyError(name)
+
+    def row(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        values = {column: float(self.numeric[column][index]) for column in NUMERIC_COLUMNS}
+        values = {column: None if np.isnan(value) else value for column, value in values.items()}
+        for column in CATEGORICAL_COLUMNS:
+            values[column] = self.categories[column].categories[self.codes[column][index]]
+        agent_id = int(self.ids[index])
+        return Agent(
+            self.names[index], values.pop("agent_type"),
+            id=None if agent_id == -1 else agent_id, tenant_id=self.tenant_ids[index], **values,
+        )
+
+    # Boolean mask for equality filters on categorical columns (a list/tuple matches any of its
+    # values) and (low, high) inclusive ranges on numeric columns
+    def mask(self, **filters):
+        mask = np.ones(self._size, dtype=bool)
+        for column, wanted in filters.items():
+            if column in CATEGORICAL_COLUMNS:
+                lookup = self.categories[column].lookup
+                codes = self.column(column)
+                if isinstance(wanted, (list, tuple, set)):
+                    mask &= np.isin(codes, [lookup(value) for value in wanted])
+                else:
+                    mask &= codes == lookup(wanted)
+            elif column in NUMERIC_COLUMNS:
+                low, high = wanted
+                values = self.column(column)
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            else:
+                raise KeyError(column)
+        return mask
+
+    def filter(self, **filters):
+        return np.flatnonzero(self.mask(**filters))
+
+    # count/sum/mean/min/max of a numeric column, ignoring unset values, optionally per
+    # category of `by`
+    def aggregate(self, column, by=None, mask=None):
+        values = self.column(column)
+        valid = ~np.isnan(values)
+        if mask is not None:
+            valid &= mask
+        if by is None:
+            selected = values[valid].astype(np.float64)
+            return _summary(len(selected), selected.sum(), selected.min(initial=np.inf), selected.max(initial=-np.inf))
+        codes = self.column(by)[valid]
+        selected = values[valid].astype(np.float64)
+        groups = len(self.categories[by].categories)
+        counts = np.bincount(codes, minlength=groups)
+        sums = np.bincount(codes, weights=selected, minlength=groups)
+        minimums = np.full(groups, np.inf)
+        maximums = np.full(groups, -np.inf)
+        np.minimum.at(minimums, codes, selected)
+        np.maximum.at(maximums, codes, selected)
+        return {
+            category: _summary(counts[code], sums[code], minimums[code], maximums[code])
+            for code, category in enumerate(self.categories[by].categories)
+            if counts[code]
+        }
+
+    def nbytes(self):
+        arrays = [self.ids] + list(self.numeric.values()) + list(self.codes.values())
+        return sum(array.nbytes for array in arrays)
+
+
+def _summary(count, total, minimum, maximum):
+    count = int(count)
+    return {
+        "count": count,
+        "sum": float(total),
+        "mean": float(total) / count if count else None,
+        "min": float(minimum) if count else None,
+        "max": float(maximum) if count else None,
+    }
@@ -1,7 +1,270 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, List
+import json
+import time
+import httpx
+from backend.app.routes.users import TokenData, get_current_user, get_headers
+from backend.app.services.agent_registry import SORT_FIELDS, agent_registry
+from backend.app.services.agent_service import task_dispatcher
+from backend.app.services.autoscaler import autoscalers, configure_autoscalers
+from backend.app.services.health_checks import health_checker
+from backend.app.services.quotas import resource_governor
+from backend.app.services.llm_service import DEFAULT_MAX_TOKENS, MODEL_PROVIDERS, llm_cache, llm_gateway, stream_llm_response
+from backend.app.services.supabase_client import REST_TIMEOUT, get_supabase_client
 
 router = APIRouter()
 
-@router.get("/agents")
-async def get_agents():
-    return {"message": "List of agents"}
+class AgentBase(BaseModel):
+    name: str
+    type: str
+    status: str
+    description: Optional[str] = None
+    llm_base: Optional[str] = None
+
+class AgentUpdate(BaseModel):
+    name: Optional[str] = None
+    type: Optional[str] = None
+    status: Optional[str] = None
+    description: Optional[str] = None
+    llm_base: Optional[str] = None
+
+class AgentList(BaseModel):
+    agents: List[dict]
+    total: Optional[int] = None
+
+class QuotaUpdate(BaseModel):
+    cpu_share: Optional[int] = None  # relative weight, e.g. the dashboard's CPU allocation %
+    cpu_seconds: Optional[float] = None  # CPU-time allowance per task, 0 for none
+    memory_gb: Optional[float] = None  # memory allowance per task, 0 for none
+
+class HealthCheckConfig(BaseModel):
+    interval: float  # seconds between checks
+    action: str = "alert"  # restart, reassign or alert
+    failure_threshold: int = 3  # consecutive failures before the action runs
+
+class AutoscalingUpdate(BaseModel):
+    trigger: Optional[str] = None
+    scale_up_threshold: Optional[float] = None
+    scale_down_threshold: Optional[float] = None
+
+class ChatRequest(BaseModel):
+    message: str
+    agent_id: Optional[int] = None
+    model: Optional[str] = None  # defaults to the agent's llm_base
+    temperature: Optional[float] = None
+    max_tokens: int = DEFAULT_MAX_TOKENS
+
+# Agents and tasks are tenant-scoped, so tokens without a tenant claim are refused
+def get_tenant_user(current_user: TokenData = Depends(get_current_user)):
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=403, detail="Token has no tenant")
+    return current_user
+
+# Settings shared by every tenant (gateway, worker pools) can only be changed by admins
+def get_admin_user(current_user: TokenData = Depends(get_tenant_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return current_user
+
+# Reads come from the registry, which is loaded in the background at startup
+def require_registry():
+    if not agent_registry.loaded:
+        raise HTTPException(status_code=503, detail="Agent registry is loading")
+
+def get_tenant_agent(agent_id: int, current_user: TokenData):
+    require_registry()
+    agent = agent_registry.get(agent_id)
+    if agent is None or agent.get("tenant_id") != current_user.tenant_id:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return agent
+
+# List agents from the in-memory registry, filtered, sorted and paginated
+@router.get("/agents", response_model=AgentList)
+async def get_agents(
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    llm_base: Optional[str] = None,
+    sort: str = Query("id", pattern=f"^-?({'|'.join(SORT_FIELDS)})$"),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False,
+    current_user: TokenData = Depends(get_tenant_user),
+):
+    require_registry()
+    filters = {"tenant_id": current_user.tenant_id, "status": status, "type": type, "llm_base": llm_base}
+    agents = agent_registry.list(sort=sort, limit=limit, offset=offset, **filters)
+    total = agent_registry.count(**filters) if include_total else None
+    return AgentList(agents=agents, total=total)
+
+@router.get("/agents/{agent_id}")
+async def get_agent(agent_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    agent = get_tenant_agent(agent_id, current_user)
+    return dict(agent, current_task=task_dispatcher.current_task(agent_id))
+
+# LLM response cache hit rates for one agent
+@router.get("/agents/{agent_id}/llm-cache")
+async def get_agent_llm_cache_stats(agent_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    return llm_cache.stats(agent_id)
+
+# Resource quota of an agent's process-pool work
+@router.put("/agents/{agent_id}/quota")
+async def update_agent_quota(agent_id: int, update: QuotaUpdate, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    memory_bytes = None if update.memory_gb is None else int(update.memory_gb * 1024 ** 3)
+    resource_governor.set_quota(agent_id, update.cpu_share, update.cpu_seconds, memory_bytes)
+    return resource_governor.usage(agent_id)
+
+# CPU-seconds, peak RSS and quota of an agent
+@router.get("/agents/{agent_id}/usage")
+async def get_agent_usage(agent_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    return resource_governor.usage(agent_id)
+
+# Compute usage (% of the process pool over the last window) and the tenant's vCPU-hours
+@router.get("/resources/usage")
+async def get_resource_usage(current_user: TokenData = Depends(get_tenant_user)):
+    return resource_governor.stats(current_user.tenant_id)
+
+# Probe the agent every `interval` seconds and run the recovery action after repeated failures
+@router.put("/agents/{agent_id}/health-check")
+async def setup_health_check(agent_id: int, config: HealthCheckConfig, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    try:
+        check = health_checker.register(agent_id, config.interval, config.action, config.failure_threshold, current_user.tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return check.to_dict()
+
+@router.get("/agents/{agent_id}/health-check")
+async def get_health_check(agent_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    check = health_checker.checks.get(agent_id)
+    if check is None:
+        raise HTTPException(status_code=404, detail="No health check for this agent")
+    return check.to_dict()
+
+@router.delete("/agents/{agent_id}/health-check")
+async def delete_health_check(agent_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    get_tenant_agent(agent_id, current_user)
+    if health_checker.unregister(agent_id) is None:
+        raise HTTPException(status_code=404, detail="No health check for this agent")
+    return {"message": "Health check removed"}
+
+# Health check counters and recent recovery alerts for the caller's tenant
+@router.get("/health-checks")
+async def get_health_checks(current_user: TokenData = Depends(get_tenant_user)):
+    return health_checker.stats(current_user.tenant_id)
+
+# Status of a task submitted to the dispatcher
+@router.get("/tasks/{task_id}")
+async def get_task(task_id: int, current_user: TokenData = Depends(get_tenant_user)):
+    task = task_dispatcher.status(task_id)
+    if task is None or task["tenant_id"] != current_user.tenant_id:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+# Task counters for the caller's tenant
+@router.get("/tasks")
+async def get_task_stats(current_user: TokenData = Depends(get_tenant_user)):
+    return task_dispatcher.stats(current_user.tenant_id)
+
+# Policies, current readings and recent scaling decisions of the worker pool autoscalers
+@router.get("/autoscaling")
+async def get_autoscaling(current_user: TokenData = Depends(get_tenant_user)):
+    return {name: autoscaler.stats() for name, autoscaler in autoscalers.items()}
+
+@router.put("/autoscaling")
+async def update_autoscaling(update: AutoscalingUpdate, current_user: TokenData = Depends(get_admin_user)):
+    try:
+        configure_autoscalers(update.trigger, update.scale_up_threshold, update.scale_down_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {name: autoscaler.stats() for name, autoscaler in autoscalers.items()}
+
+# Writes go to Supabase first; the registry only changes once the write succeeded
+@router.post("/agents")
+async def create_agent(agent: AgentBase, current_user: TokenData = Depends(get_tenant_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    headers = get_headers()
+    headers["Prefer"] = "return=representation"
+    response = await client.post(
+        "/rest/v1/agents",
+        json=dict(agent.dict(), tenant_id=current_user.tenant_id),
+        headers=headers,
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code != 201:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return agent_registry.upsert(response.json()[0])
+
+@router.patch("/agents/{agent_id}")
+async def update_agent(agent_id: int, agent: AgentUpdate, current_user: TokenData = Depends(get_tenant_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    get_tenant_agent(agent_id, current_user)
+    headers = get_headers()
+    headers["Prefer"] = "return=representation"
+    response = await client.patch(
+        f"/rest/v1/agents?id=eq.{agent_id}",
+        json=agent.dict(exclude_unset=True),
+        headers=headers,
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    rows = response.json()
+    if not rows:
+        agent_registry.remove(agent_id)
+        raise HTTPException(status_code=404, detail="Agent not found")
+    # Keep fields that only live in the registry, such as performance from agent_details
+    return agent_registry.update(agent_id, rows[0])
+
+@router.delete("/agents/{agent_id}")
+async def delete_agent(agent_id: int, current_user: TokenData = Depends(get_tenant_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    get_tenant_agent(agent_id, current_user)
+    response = await client.delete(
+        f"/rest/v1/agents?id=eq.{agent_id}",
+        headers=get_headers(),
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code != 204:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    agent_registry.remove(agent_id)
+    return {"message": "Agent deleted successfully"}
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Stream an LLM reply as server-sent events: a "token" event per chunk of text, then
+# "done" with the time to first token and the total latency in seconds (or "error")
+@router.post("/chat/stream")
+async def stream_chat(chat: ChatRequest, current_user: TokenData = Depends(get_tenant_user)):
+    model = chat.model
+    if chat.agent_id is not None:
+        model = model or get_tenant_agent(chat.agent_id, current_user).get("llm_base")
+    model = model or "GPT-3.5"
+    if model not in MODEL_PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Unknown model {model!r}")
+    try:
+        llm_gateway.provider_for(model)
+    except LookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    params = {"max_tokens": chat.max_tokens}
+    if chat.temperature is not None:
+        params["temperature"] = chat.temperature
+
+    async def events():
+        started = time.perf_counter()
+        ttft = None
+        try:
+            async for chunk in stream_llm_response(chat.message, model, current_user.tenant_id, chat.agent_id, **params):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                yield sse_event("token", {"text": chunk})
+        except httpx.HTTPError as e:
+            yield sse_event("error", {"detail": f"{type(e).__name__}: {e}"})
+            return
+        yield sse_event("done", {"model": model, "ttft": ttft, "latency": time.perf_counter() - started})
+
+    # no-cache and X-Accel-Buffering keep proxies from holding tokens back
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from backend.app.routes.agent import get_admin_user, get_tenant_user
+from backend.app.routes.users import TokenData
+from backend.app.services.llm_service import llm_gateway
+
+router = APIRouter()
+
+class LoadBalancingUpdate(BaseModel):
+    strategy: str
+
+# Gateway queues, latencies, batching and load balancing across provider replicas, with
+# the caller's tenant as the only tenant
+@router.get("/llm/stats")
+async def get_llm_stats(current_user: TokenData = Depends(get_tenant_user)):
+    return llm_gateway.stats(current_user.tenant_id)
+
+# Switch the load balancing strategy of every replicated provider at runtime
+@router.put("/llm/load-balancing")
+async def set_load_balancing(update: LoadBalancingUpdate, current_user: TokenData = Depends(get_admin_user)):
+    try:
+        llm_gateway.set_load_balancing(update.strategy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"strategy": update.strategy, "providers": llm_gateway.stats()["load_balancing"]}
@@ -0,0 +1,64 @@
+import time
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from backend.app.routes.agent import get_tenant_agent, get_tenant_user
+from backend.app.routes.users import TokenData
+from backend.app.services.analytics import agent_team, analytics_store
+from backend.app.services.forecasting import MAX_HORIZON, forecaster
+from backend.app.services.metrics_store import DEFAULT_POINTS, METRICS, metrics_store
+
+router = APIRouter()
+
+class Rating(BaseModel):
+    rating: float = Field(ge=0, le=5)
+
+# Time series of the caller's tenant over [start, end) (epoch seconds; the last day by
+# default), read at the coarsest resolution that gives about `points` buckets and
+# downsampled to `max_points` per series for charts
+@router.get("/metrics")
+async def get_metrics(
+    metric: List[str] = Query(list(METRICS)),
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    points: int = Query(DEFAULT_POINTS, ge=1, le=10000),
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    current_user: TokenData = Depends(get_tenant_user),
+):
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        return metrics_store.query(current_user.tenant_id, metric, start, end, points, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Rate a piece of an agent's work; feeds the avg_rating metric and the analytics
+@router.post("/agents/{agent_id}/rating")
+async def rate_agent(agent_id: int, rating: Rating, current_user: TokenData = Depends(get_tenant_user)):
+    agent = get_tenant_agent(agent_id, current_user)
+    metrics_store.record(current_user.tenant_id, "avg_rating", rating.rating)
+    analytics_store.tenant(current_user.tenant_id).add(time.time(), agent_id, agent_team(agent), rating=rating.rating)
+    return {"message": "Rating recorded"}
+
+# Per-team and per-day aggregates, the tasks/rating correlation and the rating and task
+# duration distributions of the caller's tenant; `days` limits all but the distributions
+# to the last calendar days
+@router.get("/analytics/summary")
+async def get_analytics_summary(days: Optional[int] = Query(None, ge=1), current_user: TokenData = Depends(get_tenant_user)):
+    return analytics_store.summary(current_user.tenant_id, days)
+
+# Daily forecast of a metric of the caller's tenant for the next `horizon` days, with an
+# 80% interval and the last `history` days it was fitted on
+@router.get("/forecast")
+async def get_forecast(
+    metric: str,
+    horizon: int = Query(30, ge=1, le=MAX_HORIZON),
+    history: int = Query(90, ge=0, le=730),
+    current_user: TokenData = Depends(get_tenant_user),
+):
+    try:
+        return forecaster.forecast(current_user.tenant_id, metric, horizon, history)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,22 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from datetime import datetime, timedelta
+from urllib.parse import quote
+import asyncio
+import base64
+import json
 import os
 import httpx
 import jwt
 from dotenv import load_dotenv
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from backend.app.services.supabase_client import AUTH_TIMEOUT, REST_TIMEOUT, get_supabase_client
+from backend.app.utils.cache import MISSING, NOT_FOUND, cache_from_env
+from backend.app.utils.jwt_cache import claims_cache_from_env
+from backend.app.utils.singleflight import SingleFlight
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Supabase configurations
-SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USERS_PAGE_LIMIT = 100
+USERS_MAX_PAGE_LIMIT = 1000
+USERS_STREAM_PAGE_SIZE = int(os.getenv("USERS_STREAM_PAGE_SIZE", "500"))
+USERS_BATCH_MAX_ITEMS = int(os.getenv("USERS_BATCH_MAX_ITEMS", "10000"))
+USERS_BATCH_CHUNK_SIZE = int(os.getenv("USERS_BATCH_CHUNK_SIZE", "500"))
+USERS_BATCH_CONCURRENCY = int(os.getenv("USERS_BATCH_CONCURRENCY", "4"))
+USERS_BATCH_UPDATE_CONCURRENCY = int(os.getenv("USERS_BATCH_UPDATE_CONCURRENCY", "32"))
 
 # Define Pydantic models
 class UserBase(BaseModel):
@@ -49,6 +64,25 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    tenant_id: Optional[str] = None
+    role: Optional[str] = None
+
+class UserBatchUpdate(UserUpdate):
+    id: str
+
+class UserBatchDelete(BaseModel):
+    ids: List[str]
+
+class BatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    user: Optional[User] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
 
 # Create a router instance
 router = APIRouter()
@@ -56,6 +90,29 @@ router = APIRouter()
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
+# Read-through caches for user lookups (tune with USER_CACHE_* / USER_LIST_CACHE_* env vars)
+user_cache = cache_from_env("USER_CACHE", maxsize=10000, ttl=60, negative_ttl=10)
+user_list_cache = cache_from_env("USER_LIST_CACHE", maxsize=256, ttl=15)
+
+# Identical concurrent upstream reads share one in-flight request
+upstream_reads = SingleFlight()
+
+# Verified token claims, keyed by a hash of the token (tune with JWT_CACHE_* env vars)
+token_claims_cache = claims_cache_from_env()
+
+# Bumped by every write. Reads note it before going upstream and only cache, or share,
+# results fetched within one generation, so a read that raced a write cannot put
+# pre-write data back into the cache.
+cache_generation = 0
+
+# Drop cached entries after a successful write; list results may contain any user
+def invalidate_user_cache(*user_ids: str):
+    global cache_generation
+    cache_generation += 1
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+    user_list_cache.clear()
+
 # Helper function to get headers
 def get_headers():
     return {
@@ -64,6 +121,15 @@ def get_headers():
         "Content-Type": "application/json"
     }
 
+# Tenant for the token, from app_metadata: user_metadata is writable by the user
+# themselves (auth.updateUser), so it must not decide tenant isolation
+def tenant_claim(user: dict):
+    return (user.get("app_metadata") or {}).get("tenant_id")
+
+# Role for the token, from app_metadata for the same reason
+def role_claim(user: dict):
+    return (user.get("app_metadata") or {}).get("role")
+
 # Function to create access token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -78,11 +144,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 # Function to verify token
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_claims_cache.decode(token, SECRET_KEY, [ALGORITHM], jwt.decode)
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        token_data = TokenData(email=email)
+        token_data = TokenData(email=email, tenant_id=payload.get("tenant_id"), role=payload.get("role"))
     except jwt.PyJWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     return token_data
@@ -93,14 +159,14 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
 
 # Authentication endpoint
 @router.post("/api/login", response_model=LoginResponse)
-async def login_endpoint(user_data: UserLogin):
+async def login_endpoint(user_data: UserLogin, client: httpx.AsyncClient = Depends(get_supabase_client)):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
-                json={"email": user_data.email, "password": user_data.password},
-                headers=get_headers()
-            )
+        response = await client.post(
+            "/auth/v1/token?grant_type=password",
+            json={"email": user_data.email, "password": user_data.password},
+            headers=get_headers(),
+            timeout=AUTH_TIMEOUT
+        )
 
         print(f"Supabase auth response: {response.status_code}, {response.text}")  # Debugging: Print Supabase response
 
@@ -108,7 +174,12 @@ async def login_endpoint(user_data: UserLogin):
             user_info = response.json()
             access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
             access_token = create_access_token(
-                data={"sub": user_info["user"]["email"]}, expires_delta=access_token_expires
+                data={
+                    "sub": user_info["user"]["email"],
+                    "tenant_id": tenant_claim(user_info["user"]),
+                    "role": role_claim(user_info["user"]),
+                },
+                expires_delta=access_token_expires
             )
             user_info["access_token"] = access_token
             user_info["token_type"] = "bearer"
@@ -122,14 +193,14 @@ async def login_endpoint(user_data: UserLogin):
 
 # Token endpoint
 @router.post("/api/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), client: httpx.AsyncClient = Depends(get_supabase_client)):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SUPABASE_URL}/auth/v1/token?grant_type=password",
-                json={"email": form_data.username, "password": form_data.password},
-                headers=get_headers()
-            )
+        response = await client.post(
+            "/auth/v1/token?grant_type=password",
+            json={"email": form_data.username, "password": form_data.password},
+            headers=get_headers(),
+            timeout=AUTH_TIMEOUT
+        )
 
         print(f"Supabase token response: {response.status_code}, {response.text}")  # Debugging: Print Supabase response
 
@@ -137,7 +208,12 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             user_info = response.json()
             access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
             access_token = create_access_token(
-                data={"sub": user_info["user"]["email"]}, expires_delta=access_token_expires
+                data={
+                    "sub": user_info["user"]["email"],
+                    "tenant_id": tenant_claim(user_info["user"]),
+                    "role": role_claim(user_info["user"]),
+                },
+                expires_delta=access_token_expires
             )
             return Token(access_token=access_token, token_type="bearer")
         else:
@@ -146,69 +222,292 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         print(f"General error ({type(e).__name__}): {e}")
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
 
-# Read all users
+# GET from Supabase, coalesced with identical in-flight reads for the same tenant and auth
+# scope that started after the last write
+async def coalesced_get(client: httpx.AsyncClient, url: str, tenant_id: Optional[str], headers: dict):
+    key = ("GET", url, tenant_id, headers.get("Authorization"), headers.get("Range"), cache_generation)
+    return await upstream_reads.do(key, lambda: client.get(url, headers=headers, timeout=REST_TIMEOUT))
+
+# Keyset pagination cursors are an opaque encoding of the last row's (created_at, id)
+def encode_cursor(row: dict):
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return str(created_at), str(user_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+# PostgREST query for one keyset page, ordered by (created_at, id)
+def users_page_query(limit: int, cursor: Optional[str] = None):
+    query = f"select=*&order=created_at.asc,id.asc&limit={limit}"
+    if cursor:
+        created_at, user_id = decode_cursor(cursor)
+        created_at, user_id = quote(created_at, safe=""), quote(user_id, safe="")
+        query += f'&or=(created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{user_id}"))'
+    return query
+
+# Read a page of users; the cursor for the next page is returned in the X-Next-Cursor header
 @router.get("/users", response_model=List[User])
-async def read_users(current_user: TokenData = Depends(get_current_user)):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/users?select=*",
-            headers=get_headers()
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+async def read_users(
+    response: Response,
+    limit: int = Query(USERS_PAGE_LIMIT, ge=1, le=USERS_MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: TokenData = Depends(get_current_user),
+    client: httpx.AsyncClient = Depends(get_supabase_client),
+):
+    # Fetch one extra row to learn whether another page exists
+    query = users_page_query(limit + 1, cursor)
+    cache_key = (current_user.tenant_id, query)
+    cached = user_list_cache.get(cache_key)
+    if cached is MISSING:
+        generation = cache_generation
+        upstream = await coalesced_get(client, f"/rest/v1/users?{query}", current_user.tenant_id, get_headers())
+        if upstream.status_code != 200:
+            raise HTTPException(status_code=upstream.status_code, detail=upstream.text)
+        rows = upstream.json()
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        cached = (rows[:limit], next_cursor)
+        if generation == cache_generation:
+            user_list_cache.set(cache_key, cached)
+    users, next_cursor = cached
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
+
+# Fetch one page of users using PostgREST Range headers
+async def fetch_users_range(client: httpx.AsyncClient, tenant_id: Optional[str], start: int, page_size: int):
+    headers = get_headers()
+    headers.update({"Range-Unit": "items", "Range": f"{start}-{start + page_size - 1}"})
+    response = await coalesced_get(client, "/rest/v1/users?select=*&order=created_at.asc,id.asc", tenant_id, headers)
+    if response.status_code not in (200, 206):
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return response.json()
+
+# Yield users as NDJSON lines, holding a single page in memory at a time
+async def iter_users_ndjson(client: httpx.AsyncClient, tenant_id: Optional[str], rows: list, page_size: int):
+    start = 0
+    while True:
+        for row in rows:
+            yield json.dumps(User(**row).dict()) + "\n"
+        if len(rows) < page_size:
+            return
+        start += page_size
+        try:
+            rows = await fetch_users_range(client, tenant_id, start, page_size)
+        except HTTPException as e:
+            # Headers are already sent, so report the failure in-band and stop
+            yield json.dumps({"error": e.detail, "status_code": e.status_code}) + "\n"
+            return
+
+# Stream every user as newline-delimited JSON
+@router.get("/users/stream")
+async def stream_users(
+    page_size: int = Query(USERS_STREAM_PAGE_SIZE, ge=1, le=USERS_MAX_PAGE_LIMIT),
+    current_user: TokenData = Depends(get_current_user),
+    client: httpx.AsyncClient = Depends(get_supabase_client),
+):
+    # The first page is fetched up front so upstream errors still map to a status code
+    rows = await fetch_users_range(client, current_user.tenant_id, 0, page_size)
+    return StreamingResponse(
+        iter_users_ndjson(client, current_user.tenant_id, rows, page_size), media_type="application/x-ndjson"
+    )
+
+# Cache hit/miss/eviction counters, for sizing the user caches, and the read collapse ratio
+@router.get("/users/cache/stats")
+async def read_user_cache_stats(current_user: TokenData = Depends(get_current_user)):
+    return {
+        "users": user_cache.stats(),
+        "user_lists": user_list_cache.stats(),
+        "upstream_reads": upstream_reads.stats(),
+    }
 
 # Read specific user by id
 @router.get("/users/{user_id}", response_model=User)
-async def read_user(user_id: str, current_user: TokenData = Depends(get_current_user)):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{SUPABASE_URL}/rest/v1/users?id=eq.{user_id}&select=*",
-            headers=get_headers()
-        )
-        if response.status_code == 200:
-            return response.json()[0]
-        else:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+async def read_user(user_id: str, current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    # Keyed by id alone: the upstream lookup is not tenant-filtered, and writes can
+    # then invalidate one key instead of scanning the cache
+    cache_key = user_id
+    cached = user_cache.get(cache_key)
+    if cached is NOT_FOUND:
+        raise HTTPException(status_code=404, detail="User not found")
+    if cached is not MISSING:
+        return cached
+    generation = cache_generation
+    response = await coalesced_get(client, f"/rest/v1/users?id=eq.{user_id}&select=*", current_user.tenant_id, get_headers())
+    if response.status_code == 200:
+        rows = response.json()
+        if generation != cache_generation:
+            # A write finished while this read was in flight; serve it but don't cache it
+            if not rows:
+                raise HTTPException(status_code=404, detail="User not found")
+            return rows[0]
+        if not rows:
+            user_cache.set_not_found(cache_key)
+            raise HTTPException(status_code=404, detail="User not found")
+        user_cache.set(cache_key, rows[0])
+        return rows[0]
+    else:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
 
 # Create a new user
 @router.post("/users", response_model=User)
-async def create_user(user: UserCreate, current_user: TokenData = Depends(get_current_user)):
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{SUPABASE_URL}/rest/v1/users",
-            json=user.dict(),
-            headers=get_headers()
-        )
-        if response.status_code == 201:
-            return response.json()
-        else:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+async def create_user(user: UserCreate, current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    response = await client.post(
+        "/rest/v1/users",
+        json=user.dict(),
+        headers=get_headers(),
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code == 201:
+        invalidate_user_cache()
+        return response.json()
+    else:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
 
 # Update an existing user
 @router.patch("/users/{user_id}", response_model=User)
-async def update_user(user_id: str, user: UserUpdate, current_user: TokenData = Depends(get_current_user)):
-    async with httpx.AsyncClient() as client:
-        response = await client.patch(
-            f"{SUPABASE_URL}/rest/v1/users?id=eq.{user_id}",
-            json=user.dict(exclude_unset=True),
-            headers=get_headers()
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+async def update_user(user_id: str, user: UserUpdate, current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    response = await client.patch(
+        f"/rest/v1/users?id=eq.{user_id}",
+        json=user.dict(exclude_unset=True),
+        headers=get_headers(),
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code == 200:
+        invalidate_user_cache(user_id)
+        return response.json()
+    else:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
 
 # Delete a user
 @router.delete("/users/{user_id}")
-async def delete_user(user_id: str, current_user: TokenData = Depends(get_current_user)):
-    async with httpx.AsyncClient() as client:
+async def delete_user(user_id: str, current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    response = await client.delete(
+        f"/rest/v1/users?id=eq.{user_id}",
+        headers=get_headers(),
+        timeout=REST_TIMEOUT
+    )
+    if response.status_code == 204:
+        invalidate_user_cache(user_id)
+        return {"message": "User deleted successfully"}
+    else:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+
+# Split (index, item) pairs into chunks of at most `size`
+def chunked(items: list, size: int):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# Reject oversized batches before doing any upstream work
+def check_batch_size(count: int):
+    if count > USERS_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {USERS_BATCH_MAX_ITEMS} items"
+        )
+
+# Run one coroutine per chunk, at most `concurrency` at a time, and collect
+# per-item results in request order
+async def run_batch(chunks: list, send_chunk, concurrency: int = USERS_BATCH_CONCURRENCY):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk):
+        async with semaphore:
+            try:
+                return await send_chunk(chunk)
+            except httpx.HTTPError as e:
+                return [BatchItemResult(index=i, status_code=502, error=f"{type(e).__name__}: {e}") for i, _ in chunk]
+
+    results = [result for chunk_results in await asyncio.gather(*(run(c) for c in chunks)) for result in chunk_results]
+    results.sort(key=lambda r: r.index)
+    succeeded = sum(1 for r in results if r.error is None)
+    return BatchResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+# Map a chunk's PostgREST response onto its items; rows come back in request order.
+# Items without a row of their own are reported as failed rather than dropped.
+def chunk_results(chunk: list, response: httpx.Response, ok_status: int):
+    if response.status_code != ok_status:
+        return [BatchItemResult(index=i, status_code=response.status_code, error=response.text) for i, _ in chunk]
+    rows = response.json()
+    return [
+        BatchItemResult(index=i, status_code=ok_status, user=rows[n]) if n < len(rows)
+        else BatchItemResult(index=i, status_code=502, error="No row returned for item")
+        for n, (i, _) in enumerate(chunk)
+    ]
+
+# Create many users with one multi-row insert per chunk
+@router.post("/users:batch", response_model=BatchResult)
+async def create_users_batch(users: List[UserCreate], current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    check_batch_size(len(users))
+    headers = get_headers()
+    headers["Prefer"] = "return=representation"
+
+    async def send_chunk(chunk):
+        response = await client.post(
+            "/rest/v1/users",
+            json=[user.dict() for _, user in chunk],
+            headers=headers,
+            timeout=REST_TIMEOUT
+        )
+        return chunk_results(chunk, response, 201)
+
+    result = await run_batch(chunked(list(enumerate(users)), USERS_BATCH_CHUNK_SIZE), send_chunk)
+    if result.succeeded:
+        invalidate_user_cache()
+    return result
+
+# Update many users with one PATCH per user, USERS_BATCH_UPDATE_CONCURRENCY at a time.
+# An upsert would insert unknown ids and trips NOT NULL columns on partial updates.
+@router.patch("/users:batch", response_model=BatchResult)
+async def update_users_batch(users: List[UserBatchUpdate], current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    check_batch_size(len(users))
+    headers = get_headers()
+    headers["Prefer"] = "return=representation"
+
+    async def send_chunk(chunk):
+        [(index, user)] = chunk
+        response = await client.patch(
+            f"/rest/v1/users?id=eq.{quote(user.id, safe='')}",
+            json=user.dict(exclude_unset=True, exclude={"id"}),
+            headers=headers,
+            timeout=REST_TIMEOUT
+        )
+        if response.status_code == 200 and not response.json():
+            return [BatchItemResult(index=index, status_code=404, error="User not found")]
+        return chunk_results(chunk, response, 200)
+
+    result = await run_batch(chunked(list(enumerate(users)), 1), send_chunk, USERS_BATCH_UPDATE_CONCURRENCY)
+    if result.succeeded:
+        invalidate_user_cache(*(users[item.index].id for item in result.results if item.error is None))
+    return result
+
+# Delete many users with one `id=in.(...)` request per chunk
+@router.delete("/users:batch", response_model=BatchResult)
+async def delete_users_batch(batch: UserBatchDelete, current_user: TokenData = Depends(get_current_user), client: httpx.AsyncClient = Depends(get_supabase_client)):
+    check_batch_size(len(batch.ids))
+    headers = get_headers()
+    headers["Prefer"] = "return=representation"
+
+    async def send_chunk(chunk):
+        ids = ",".join(quote(f'"{user_id}"', safe='"') for _, user_id in chunk)
         response = await client.delete(
-            f"{SUPABASE_URL}/rest/v1/users?id=eq.{user_id}",
-            headers=get_headers()
+            f"/rest/v1/users?id=in.({ids})",
+            headers=headers,
+            timeout=REST_TIMEOUT
         )
-        if response.status_code == 204:
-            return {"message": "User deleted successfully"}
-        else:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
+        if response.status_code != 200:
+            return [BatchItemResult(index=i, status_code=response.status_code, error=response.text) for i, _ in chunk]
+        deleted = {row["id"]: row for row in response.json()}
+        return [
+            BatchItemResult(index=i, status_code=200, user=deleted[user_id]) if user_id in deleted
+            else BatchItemResult(index=i, status_code=404, error="User not found")
+            for i, user_id in chunk
+        ]
+
+    result = await run_batch(chunked(list(enumerate(batch.ids)), USERS_BATCH_CHUNK_SIZE), send_chunk)
+    if result.succeeded:
+        invalidate_user_cache(*(batch.ids[item.index] for item in result.results if item.error is None))
+    return result
@@ -0,0 +1,243 @@
+# In-memory agent registry with secondary indexes for filtered, sorted listing
+
+import asyncio
+import heapq
+import itertools
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+
+# Fields with an equality index (value -> set of agent ids)
+INDEXED_FIELDS = ("tenant_id", "status", "type", "llm_base")
+# Fields with a sorted index of (sort key, agent id), built on first use
+SORT_FIELDS = ("id", "name", "performance", "created_at")
+# Sort indexes built up front by load(), so the default listing never waits for one
+PRELOADED_SORT_FIELDS = ("id",)
+
+
+# None sorts after every real value, in both directions
+NONE_KEY = (1, 0)
+
+def sort_key(value):
+    return NONE_KEY if value is None else (0, value)
+
+def descending_key(value):
+    return (0, 0) if value is None else (1, value)
+
+agent_id_of = itemgetter(1)
+
+def build_sort_index(agents: dict, field):
+    return sorted((sort_key(a.get(field)), agent_id) for agent_id, a in agents.items())
+
+
+class AgentRegistry:
+    def __init__(self):
+        self._agents = {}  # id -> agent dict
+        self._indexes = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._sorted = {}  # field -> sorted list of (sort key, agent id), for fields listed so far
+        self.loaded = False
+        self._pending = None  # writes made while a background load is running
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __contains__(self, agent_id):
+        return agent_id in self._agents
+
+    def get(self, agent_id):
+        return self._agents.get(agent_id)
+
+    # Insert or replace an agent, keeping every index consistent
+    def upsert(self, agent: dict):
+        if self._pending is not None:
+            self._pending.append(("upsert", agent))
+        agent_id = agent["id"]
+        if agent_id in self._agents:
+            self._unindex(self._agents[agent_id])
+        self._agents[agent_id] = agent
+        for field in INDEXED_FIELDS:
+            self._indexes[field][agent.get(field)].add(agent_id)
+        for field, entries in self._sorted.items():
+            insort(entries, (sort_key(agent.get(field)), agent_id))
+        return agent
+
+    # Merge `changes` into an existing agent
+    def update(self, agent_id, changes: dict):
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            return None
+        return self.upsert({**agent, **changes, "id": agent_id})
+
+    def remove(self, agent_id):
+        if self._pending is not None:
+            self._pending.append(("remove", agent_id))
+        agent = self._agents.pop(agent_id, None)
+        if agent is not None:
+            self._unindex(agent)
+        return agent
+
+    def clear(self):
+        self.__init__()
+
+    # Replace the whole registry at once; building the indexes in bulk is much faster
+    # than repeated upserts
+    def load(self, agents):
+        self._swap(self._build(agents))
+
+    # Load in a worker thread so the event loop keeps serving requests. Writes made in
+    # the meantime are replayed on top of the loaded data.
+    async def load_in_background(self, agents):
+        self._pending = []
+        try:
+            built = await asyncio.to_thread(self._build, agents)
+        except BaseException:
+            self._pending = None
+            raise
+        pending, self._pending = self._pending, None
+        self._swap(built)
+        for operation, argument in pending:
+            getattr(self, operation)(argument)
+
+    @staticmethod
+    def _build(agents):
+        by_id = {}
+        indexes = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        for agent in agents:
+            agent_id = agent["id"]
+            by_id[agent_id] = agent
+            for field in INDEXED_FIELDS:
+                indexes[field][agent.get(field)].add(agent_id)
+        return by_id, indexes, {field: build_sort_index(by_id, field) for field in PRELOADED_SORT_FIELDS}
+
+    def _swap(self, built):
+        self._agents, self._indexes, self._sorted = built
+        self.loaded = True
+
+    # Sorted index for a field, built the first time the field is used for sorting
+    def _sort_index(self, field):
+        entries = self._sorted.get(field)
+        if entries is None:
+            entries = self._sorted[field] = build_sort_index(self._agents, field)
+        return entries
+
+    def _unindex(self, agent):
+        agent_id = agent["id"]
+        for field in INDEXED_FIELDS:
+            ids = self._indexes[field][agent.get(field)]
+            ids.discard(agent_id)
+            if not ids:
+                del self._indexes[field][agent.get(field)]
+        for field, entries in self._sorted.items():
+            entry = (sort_key(agent.get(field)), agent_id)
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    # Index sets matching the filters, smallest first; None means no filter applied
+    def _filter_sets(self, filters: dict):
+        sets = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"Cannot filter on {field!r}")
+            sets.append(self._indexes[field].get(value, set()))
+        return sorted(sets, key=len) or None
+
+    # Values of an indexed field held by at least one agent
+    def distinct(self, field):
+        return list(self._indexes[field])
+
+    def count(self, **filters):
+        sets = self._filter_sets(filters)
+        if sets is None:
+            return len(self._agents)
+        return len(set.intersection(*sets)) if len(sets) > 1 else len(sets[0])
+
+    # Filtered, sorted, paginated listing. `sort` is a field name, prefixed with "-" for descending.
+    #
+    # Walking the sort index visits about wanted * total / matches entries; sorting the
+    # intersection of the filter sets costs about the size of the smallest set. The walk is
+    # tried when the independence estimate of `matches` says it is cheaper, with the
+    # intersection cost as its budget, so filters that overlap far less than expected fall
+    # back to the intersection instead of scanning the whole index.
+    def list(self, sort: str = "id", limit: int = 50, offset: int = 0, **filters):
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort on {field!r}")
+        sets = self._filter_sets(filters)
+        wanted = offset + limit
+        if sets is None:
+            ids = list(islice(self._walk(field, descending), offset, wanted))
+        else:
+            ids = None
+            total = len(self._agents)
+            budget = len(sets[0])
+            matches = budget
+            for other in sets[1:]:
+                matches = matches * len(other) / max(total, 1)
+            if matches and wanted * total / matches < budget:
+                ids = self._list_by_walk(field, descending, sets, limit, offset, budget)
+            if ids is None:
+                ids = self._list_by_candidates(field, descending, sets, limit, offset)
+        return [self._agents[agent_id] for agent_id in ids]
+
+    # Walk at most `budget` index entries, filtering with C-level set lookups; None when the
+    # budget ran out before the page was filled
+    def _list_by_walk(self, field, descending, sets, limit, offset, budget=None):
+        walked = self._walk(field, descending)
+        if budget is not None:
+            walked = islice(walked, budget)
+        for ids in sets:
+            walked = filter(ids.__contains__, walked)
+        page = list(islice(walked, offset, offset + limit))
+        if len(page) < limit and budget is not None and budget < len(self._agents):
+            return None
+        return page
+
+    # Intersect the filter sets and take the top `offset + limit` by sort key
+    def _list_by_candidates(self, field, descending, sets, limit, offset):
+        candidates = set.intersection(*sets) if len(sets) > 1 else sets[0]
+        if descending:
+            top = heapq.nlargest(offset + limit, ((descending_key(self._agents[i].get(field)), i) for i in candidates))
+        else:
+            top = heapq.nsmallest(offset + limit, ((sort_key(self._agents[i].get(field)), i) for i in candidates))
+        return [agent_id for _, agent_id in top[offset:]]
+
+    # Agent ids in sort order; descending order reverses the real values but keeps None last
+    def _walk(self, field, descending):
+        entries = self._sort_index(field)
+        if not descending:
+            return map(agent_id_of, entries)
+        split = bisect_left(entries, (NONE_KEY,))
+        return map(agent_id_of, map(entries.__getitem__, itertools.chain(
+            range(split - 1, -1, -1), range(len(entries) - 1, split - 1, -1),
+        )))
+
+
+# Load agents (and their performance from agent_details) from Supabase in pages
+async def fetch_agents(client, headers: dict, page_size: int = 1000, timeout=None):
+    async def fetch_all(table: str):
+        rows, start = [], 0
+        while True:
+            page_headers = dict(headers, **{"Range-Unit": "items", "Range": f"{start}-{start + page_size - 1}"})
+            response = await client.get(f"/rest/v1/{table}?select=*&order=id.asc", headers=page_headers, timeout=timeout)
+            response.raise_for_status()
+            page = response.json()
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+
+    agents = await fetch_all("agents")
+    # agent_details has its own ids; it is joined to agents on (tenant_id, name)
+    performance = {(d["tenant_id"], d["name"]): d.get("performance") for d in await fetch_all("agent_details")}
+    for agent in agents:
+        agent.setdefault("performance", performance.get((agent["tenant_id"], agent["name"])))
+    return agents
+
+
+# Shared registry used by routes/agent.py and loaded in the app lifespan
+agent_registry = AgentRegistry()
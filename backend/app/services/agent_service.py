@@ -1,4 +1,349 @@
-# Placeholder for agent service logic
+# Agent service logic: agent creation and the asyncio task execution engine
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict, defaultdict, deque
 
 def create_agent(agent_name, agent_type):
     return f"Agent '{agent_name}' of type '{agent_type}' created successfully."
+
+
+class TaskRecord:
+    __slots__ = ("id", "agent_id", "tenant_id", "description", "priority", "status", "result", "error",
+                 "submitted_at", "started_at", "finished_at", "fn", "future")
+
+    def __init__(self, task_id, agent_id, tenant_id, fn, priority, description):
+        self.id = task_id
+        self.agent_id = agent_id
+        self.tenant_id = tenant_id
+        self.fn = fn
+        self.priority = priority
+        self.description = description
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None  # asyncio.Task while running
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "agent_id": self.agent_id,
+            "tenant_id": self.tenant_id,
+            "description": self.description,
+            "priority": self.priority,
+            "status": self.status,
+            "error": self.error,
+            "wait_seconds": None if self.started_at is None else self.started_at - self.submitted_at,
+            "run_seconds": None if self.finished_at is None or self.started_at is None else self.finished_at - self.started_at,
+        }
+
+
+# Priority task dispatcher feeding a pool of worker coroutines.
+#
+# Each tenant has its own priority heap (lower number runs first) and workers take
+# tenants in round-robin order, so one busy tenant cannot starve the others. A task
+# whose agent already has `per_agent_limit` running tasks is parked until one of them
+# finishes; a tenant with `per_tenant_limit` running tasks is skipped until it has a
+# free slot. When `max_queued` tasks are waiting, submit() blocks (backpressure).
+class TaskDispatcher:
+    def __init__(self, workers=8, max_queued=10000, per_agent_limit=1, per_tenant_limit=64, history_size=10000,
+                 wait_window=60.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.per_agent_limit = per_agent_limit
+        self.per_tenant_limit = per_tenant_limit
+        self.history_size = history_size
+        self._ids = itertools.count(1)
+        self._tenant_queues = defaultdict(list)  # tenant -> heap of (priority, seq, record)
+        self._ready_tenants = deque()  # tenants with queued work, round-robin order
+        self._in_ready = set()
+        self._parked = defaultdict(deque)  # agent -> records waiting on the per-agent limit
+        self._running_by_agent = defaultdict(list)
+        self._running_by_tenant = defaultdict(int)
+        self._active = {}  # task id -> queued or running record
+        self._history = OrderedDict()  # task id -> finished record, bounded by history_size
+        self._queued = 0
+        self._queued_by_tenant = defaultdict(int)
+        self._completed_by_tenant = defaultdict(int)
+        self._failed_by_tenant = defaultdict(int)
+        self._changed = asyncio.Condition()
+        self._worker_tasks = []
+        self._retiring = 0  # workers asked to exit by resize()
+        self.wait_window = wait_window
+        self._waits = deque(maxlen=4096)  # (started_at, seconds queued) of recent tasks
+        self.completed = 0
+        self.failed = 0
+        self.finish_listeners = []  # called with every finished record, e.g. to record metrics
+
+    # Tasks may be submitted before start(); they wait in their queues until workers exist
+    async def start(self):
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    # Running tasks are cancelled and their agent/tenant slots released; queued tasks
+    # stay queued and run after the next start()
+    async def stop(self):
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._retiring = 0
+        running = [record for record in self._active.values() if record.status == "running"]
+        for record in running:
+            record.future.cancel()
+        await asyncio.gather(*(record.future for record in running), return_exceptions=True)
+        for record in running:
+            record.status = "cancelled"
+            self._release(record)
+        # A fresh condition lets the dispatcher be started again on another event loop
+        self._changed = asyncio.Condition()
+
+    @property
+    def queued(self):
+        return self._queued
+
+    # Change the number of workers while running. Extra workers exit as soon as they are
+    # idle or finish their current task; nothing running is interrupted.
+    async def resize(self, workers):
+        async with self._changed:
+            self.workers = workers
+            if not self._worker_tasks:
+                return  # not started; start() creates `workers` workers
+            live = len(self._worker_tasks) - self._retiring
+            if workers > live:
+                # Cancel pending retirements first, then add workers
+                keep = min(self._retiring, workers - live)
+                self._retiring -= keep
+                self._worker_tasks += [asyncio.create_task(self._worker()) for _ in range(workers - live - keep)]
+            elif workers < live:
+                self._retiring += live - workers
+                self._changed.notify_all()
+
+    # Inputs for the autoscaler: queued tasks per worker, busy workers as a percentage,
+    # and the 95th percentile queueing time (ms) of tasks started within `wait_window`
+    def load(self):
+        running = sum(self._running_by_tenant.values())
+        oldest = time.monotonic() - self.wait_window
+        waits = sorted(wait for started, wait in self._waits if started >= oldest)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queued / max(1, self.workers),
+            "utilization": 100.0 * min(running, self.workers) / max(1, self.workers),
+            "p95_wait": 1000 * waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+    async def submit(self, agent_id, tenant_id, fn, priority=0, description=None, block=True):
+        async with self._changed:
+            if self._queued >= self.max_queued:
+                if not block:
+                    raise asyncio.QueueFull()
+                await self._changed.wait_for(lambda: self._queued < self.max_queued)
+            record = TaskRecord(next(self._ids), agent_id, tenant_id, fn, priority, description)
+            self._active[record.id] = record
+            self._queued += 1
+            self._queued_by_tenant[tenant_id] += 1
+            self._push(record)
+            self._changed.notify_all()
+        return record.id
+
+    async def cancel(self, task_id):
+        async with self._changed:
+            record = self._active.get(task_id)
+            if record is None:
+                return False
+            if record.status == "running":
+                record.future.cancel()
+                return True
+            # Queued records are dropped lazily when they reach the front of their heap
+            record.status = "cancelled"
+            self._dequeued(record)
+            self._finish(record)
+            # Wake submitters blocked on a full queue
+            self._changed.notify_all()
+            return True
+
+    def status(self, task_id):
+        record = self._active.get(task_id) or self._history.get(task_id)
+        return None if record is None else record.to_dict()
+
+    # Description of the task an agent is running right now (the "Current Task" column)
+    def current_task(self, agent_id):
+        running = self._running_by_agent.get(agent_id)
+        return running[0].description if running else None
+
+    # Seconds the agent's longest-running task has been running, or None if it is idle
+    def running_seconds(self, agent_id):
+        running = self._running_by_agent.get(agent_id)
+        return time.monotonic() - min(record.started_at for record in running) if running else None
+
+    # Cancel every task the agent is running; its queued tasks start afresh afterwards
+    def cancel_running(self, agent_id):
+        running = list(self._running_by_agent.get(agent_id, ()))
+        for record in running:
+            record.future.cancel()
+        return len(running)
+
+    # Hand the agent's queued tasks to another agent of the same tenant
+    async def reassign(self, agent_id, to_agent_id):
+        async with self._changed:
+            moved = 0
+            for record in self._active.values():
+                if record.agent_id == agent_id and record.status == "queued":
+                    record.agent_id = to_agent_id
+                    moved += 1
+            # Tasks parked behind the old agent's running ones can compete again
+            for record in self._parked.pop(agent_id, ()):
+                if record.status != "cancelled":
+                    self._push(record)
+            self._changed.notify_all()
+            return moved
+
+    # Dispatcher-wide counters, or the counters of one tenant
+    def stats(self, tenant_id=None):
+        if tenant_id is not None:
+            return {
+                "queued": self._queued_by_tenant.get(tenant_id, 0),
+                "running": self._running_by_tenant.get(tenant_id, 0),
+                "completed": self._completed_by_tenant.get(tenant_id, 0),
+                "failed": self._failed_by_tenant.get(tenant_id, 0),
+            }
+        return {
+            "queued": self._queued,
+            "running": sum(self._running_by_tenant.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+            "workers": self.workers,
+        }
+
+    def _dequeued(self, record):
+        self._queued -= 1
+        self._queued_by_tenant[record.tenant_id] -= 1
+        if not self._queued_by_tenant[record.tenant_id]:
+            del self._queued_by_tenant[record.tenant_id]
+
+    def _push(self, record):
+        heapq.heappush(self._tenant_queues[record.tenant_id], (record.priority, record.id, record))
+        if record.tenant_id not in self._in_ready and self._running_by_tenant[record.tenant_id] < self.per_tenant_limit:
+            self._ready_tenants.append(record.tenant_id)
+            self._in_ready.add(record.tenant_id)
+
+    # Pick the next runnable record, visiting tenants in round-robin order
+    def _next_runnable(self):
+        for _ in range(len(self._ready_tenants)):
+            tenant = self._ready_tenants.popleft()
+            self._in_ready.discard(tenant)
+            heap = self._tenant_queues[tenant]
+            record = None
+            while heap:
+                _, _, candidate = heapq.heappop(heap)
+                if candidate.status == "cancelled":
+                    continue
+                if len(self._running_by_agent[candidate.agent_id]) >= self.per_agent_limit:
+                    self._parked[candidate.agent_id].append(candidate)
+                    continue
+                record = candidate
+                break
+            if not heap:
+                del self._tenant_queues[tenant]
+            elif self._running_by_tenant[tenant] + 1 < self.per_tenant_limit:
+                self._ready_tenants.append(tenant)
+                self._in_ready.add(tenant)
+            if record is not None:
+                return record
+        return None
+
+    # True (and the worker removed) if this worker should exit after a resize() down
+    def _retire(self):
+        if not self._retiring:
+            return False
+        self._retiring -= 1
+        self._worker_tasks.remove(asyncio.current_task())
+        return True
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                if self._retire():
+                    return
+                record = self._next_runnable()
+                while record is None:
+                    await self._changed.wait()
+                    if self._retire():
+                        return
+                    record = self._next_runnable()
+                self._dequeued(record)
+                record.status = "running"
+                record.started_at = time.monotonic()
+                self._waits.append((record.started_at, record.started_at - record.submitted_at))
+                self._running_by_agent[record.agent_id].append(record)
+                self._running_by_tenant[record.tenant_id] += 1
+                record.future = asyncio.ensure_future(record.fn())
+                # A queue slot was freed for blocked submitters
+                self._changed.notify_all()
+            try:
+                # shield() tells a cancelled task (cancel()) apart from a stopped worker (stop())
+                record.result = await asyncio.shield(record.future)
+                record.status = "completed"
+                self.completed += 1
+                self._completed_by_tenant[record.tenant_id] += 1
+            except asyncio.CancelledError:
+                if not record.future.cancelled():
+                    raise
+                record.status = "cancelled"
+            except Exception as e:
+                record.status = "failed"
+                record.error = f"{type(e).__name__}: {e}"
+                self.failed += 1
+                self._failed_by_tenant[record.tenant_id] += 1
+            async with self._changed:
+                self._release(record)
+                self._changed.notify_all()
+
+    def _release(self, record):
+        running = self._running_by_agent[record.agent_id]
+        running.remove(record)
+        if not running:
+            del self._running_by_agent[record.agent_id]
+        self._running_by_tenant[record.tenant_id] -= 1
+        if not self._running_by_tenant[record.tenant_id]:
+            del self._running_by_tenant[record.tenant_id]
+        # Parked work for this agent can compete again
+        parked = self._parked.get(record.agent_id)
+        while parked:
+            waiting = parked.popleft()
+            if waiting.status != "cancelled":
+                self._push(waiting)
+                break
+        if parked is not None and not parked:
+            del self._parked[record.agent_id]
+        # The tenant has a free slot again
+        tenant = record.tenant_id
+        if self._tenant_queues.get(tenant) and tenant not in self._in_ready:
+            self._ready_tenants.append(tenant)
+            self._in_ready.add(tenant)
+        self._finish(record)
+
+    def _finish(self, record):
+        record.finished_at = time.monotonic()
+        record.fn = None
+        record.future = None
+        self._active.pop(record.id, None)
+        self._history[record.id] = record
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        for listener in self.finish_listeners:
+            listener(record)
+
+
+# Shared dispatcher, started and stopped in the app lifespan
+task_dispatcher = TaskDispatcher(
+    workers=int(os.getenv("TASK_WORKERS", "8")),
+    max_queued=int(os.getenv("TASK_MAX_QUEUED", "10000")),
+    per_agent_limit=int(os.getenv("TASK_PER_AGENT_LIMIT", "1")),
+    per_tenant_limit=int(os.getenv("TASK_PER_TENANT_LIMIT", "64")),
+)
@@ -0,0 +1,261 @@
+# Columnar analytics over task and rating events for the Analytics & Reporting tab.
+#
+# Events are appended in batches as NumPy columns. Each batch is folded into running
+# per-agent, per-team and per-day aggregates (tasks, successes, duration, rating sum and
+# count) and a rating histogram with np.bincount, so a dashboard request reads arrays the
+# size of the number of groups instead of re-scanning every event. Per-(agent, day) and
+# per-(team, day) sums serve the same groupings over a window of the last days. Group keys are mapped
+# to dense codes with a pandas Index, also one vectorized lookup per batch.
+#
+# Single events (one finished task, one rating) are buffered and ingested as a batch once
+# `batch_size` are waiting or a query needs them.
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.app.services.agent_registry import agent_registry
+
+DAY = 86400
+RATING_BINS = np.linspace(0, 5, 11)  # half-star bins
+DURATION_BINS = np.array([0, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800, np.inf])  # seconds
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "4096"))
+# Keep the raw event columns (about 30 bytes per event, never trimmed) for frame(); off by
+# default as the aggregates work without them
+ANALYTICS_KEEP_EVENTS = os.getenv("ANALYTICS_KEEP_EVENTS", "false").lower() in ("1", "true", "yes")
+
+DAY_MASK = 0xFFFFFFFF  # (group code, day) keys are code << 32 | day
+COLUMNS = ("timestamp", "agent_id", "team", "duration", "success", "rating")
+
+
+class _Keys:
+    def __init__(self):
+        self.index = pd.Index([])
+
+    def __len__(self):
+        return len(self.index)
+
+    # Dense codes for `values`, adding unseen keys
+    def codes(self, values):
+        if not len(self.index):
+            self.index = pd.Index(pd.unique(values))
+        codes = self.index.get_indexer(values)
+        new = codes < 0
+        if new.any():
+            self.index = self.index.append(pd.Index(pd.unique(values[new])))
+            codes = self.index.get_indexer(values)
+        return codes
+
+
+class _Groups:
+    FIELDS = ("tasks", "successes", "duration", "rating_sum", "ratings")
+
+    def __init__(self):
+        self.keys = _Keys()
+        self.sums = {field: np.zeros(0) for field in self.FIELDS}
+
+    def add(self, keys, tasks, successes, durations, ratings, rated):
+        codes = self.keys.codes(keys)
+        size = len(self.keys)
+        for field, weights in (("tasks", tasks), ("successes", successes), ("duration", durations),
+                               ("rating_sum", ratings), ("ratings", rated)):
+            total = np.bincount(codes, weights, minlength=size)
+            current = self.sums[field]
+            total[:len(current)] += current
+            self.sums[field] = total
+        return codes
+
+    # Sums per group of (group code, day) keys for the days from `since` on, for `size` groups
+    def window(self, since, size):
+        keys = self.keys.index.to_numpy(np.int64)
+        keep = (keys & DAY_MASK) >= since
+        return {field: np.bincount(keys[keep] >> 32, sums[keep], minlength=size) for field, sums in self.sums.items()}
+
+    def frame(self, sums=None):
+        sums = self.sums if sums is None else sums
+        tasks, ratings = sums["tasks"], sums["ratings"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "tasks": tasks.astype(np.int64),
+                "tasks_completed": sums["successes"].astype(np.int64),
+                "success_rate": np.where(tasks > 0, sums["successes"] / tasks, np.nan),
+                "avg_duration": np.where(tasks > 0, sums["duration"] / tasks, np.nan),
+                "avg_rating": np.where(ratings > 0, sums["rating_sum"] / ratings, np.nan),
+                "ratings": ratings.astype(np.int64),
+            }, index=self.keys.index)
+
+
+def pearson(x, y):
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if len(x) < 2 or x.std() == 0 or y.std() == 0:
+        return {"r": None, "n": int(len(x))}
+    return {"r": float(np.corrcoef(x, y)[0, 1]), "n": int(len(x))}
+
+
+class TaskAnalytics:
+    def __init__(self, batch_size=ANALYTICS_BATCH_SIZE, keep_events=ANALYTICS_KEEP_EVENTS):
+        self.batch_size = batch_size
+        self.keep_events = keep_events
+        self.agents = _Groups()
+        self.teams = _Groups()
+        self.days = _Groups()
+        self.agent_days = _Groups()
+        self.team_days = _Groups()
+        self.agent_team = np.zeros(0, dtype=np.int64)  # team code of each agent code, latest event wins
+        self.rating_histogram = np.zeros(len(RATING_BINS) - 1, dtype=np.int64)
+        self.duration_histogram = np.zeros(len(DURATION_BINS) - 1, dtype=np.int64)
+        self.events = 0
+        self._chunks = []
+        self._pending = []
+
+    # Append a batch of events. `duration` and `success` are NaN/False for pure rating
+    # events, `rating` is NaN for tasks that were not rated.
+    def append(self, timestamp, agent_id, team, duration=None, success=None, rating=None):
+        timestamp = np.asarray(timestamp, dtype=np.float64)
+        size = len(timestamp)
+        if not size:
+            return
+        agent_id = np.asarray(agent_id, dtype=np.int64)
+        team = np.asarray(team, dtype=object)
+        duration = np.full(size, np.nan) if duration is None else np.asarray(duration, dtype=np.float64)
+        success = np.zeros(size, dtype=bool) if success is None else np.asarray(success, dtype=bool)
+        rating = np.full(size, np.nan) if rating is None else np.asarray(rating, dtype=np.float64)
+
+        is_task = ~np.isnan(duration)
+        rated = ~np.isnan(rating)
+        tasks = is_task.astype(np.float64)
+        columns = (tasks, (success & is_task).astype(np.float64), np.where(is_task, duration, 0.0),
+                   np.where(rated, rating, 0.0), rated.astype(np.float64))
+        agent_codes = self.agents.add(agent_id, *columns)
+        team_codes = self.teams.add(team, *columns)
+        day = (timestamp // DAY).astype(np.int64)
+        self.days.add(day, *columns)
+        self.agent_days.add(agent_codes.astype(np.int64) << 32 | day, *columns)
+        self.team_days.add(team_codes.astype(np.int64) << 32 | day, *columns)
+
+        agent_team = np.full(len(self.agents.keys), -1, dtype=np.int64)
+        agent_team[:len(self.agent_team)] = self.agent_team
+        agent_team[agent_codes] = team_codes  # an agent that moved teams within the batch gets one of them
+        self.agent_team = agent_team
+        self.rating_histogram += np.histogram(rating[rated], RATING_BINS)[0]
+        self.duration_histogram += np.histogram(duration[is_task], DURATION_BINS)[0]
+        self.events += size
+        if self.keep_events:
+            self._chunks.append((timestamp, agent_id, team_codes.astype(np.int32), duration.astype(np.float32),
+                                 success, rating.astype(np.float32)))
+
+    # Buffer one event; the buffer is ingested as a batch
+    def add(self, timestamp, agent_id, team, duration=None, success=False, rating=None):
+        self._pending.append((timestamp, agent_id, team, np.nan if duration is None else duration, success,
+                              np.nan if rating is None else rating))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.append(*zip(*pending))
+
+    # Groupings of every event, or of the events from day number `since` on
+    def by_agent(self, since=None):
+        self.flush()
+        frame = self.agents.frame(None if since is None else self.agent_days.window(since, len(self.agents.keys)))
+        frame["team"] = self.teams.keys.index[self.agent_team] if len(frame) else []
+        return frame.rename_axis("agent_id")
+
+    def by_team(self, since=None):
+        self.flush()
+        frame = self.teams.frame(None if since is None else self.team_days.window(since, len(self.teams.keys)))
+        frame["agents"] = np.bincount(self.agent_team[self.agent_team >= 0], minlength=len(frame))
+        return frame.rename_axis("team")
+
+    def by_day(self, since=None):
+        self.flush()
+        frame = self.days.frame()
+        if since is not None:
+            frame = frame[self.days.keys.index.to_numpy(np.int64) >= since]
+        frame.index = pd.to_datetime(frame.index.to_numpy(dtype=np.int64) * DAY, unit="s")
+        return frame.rename_axis("date").sort_index()
+
+    # Pearson correlation between tasks completed and average rating across agents or days
+    def correlation(self, by="day", since=None):
+        frame = self.by_day(since) if by == "day" else self.by_agent(since)
+        return pearson(frame["tasks_completed"].to_numpy(np.float64), frame["avg_rating"].to_numpy(np.float64))
+
+    def distributions(self):
+        self.flush()
+        return {
+            "rating": {"bins": RATING_BINS.tolist(), "counts": self.rating_histogram.tolist()},
+            # the open-ended last duration bin is given as None
+            "duration": {"bins": DURATION_BINS[:-1].tolist() + [None], "counts": self.duration_histogram.tolist()},
+        }
+
+    # Every event as a DataFrame, for ad-hoc reports
+    def frame(self):
+        self.flush()
+        if not self.keep_events:
+            raise ValueError("Raw events are not kept (ANALYTICS_KEEP_EVENTS)")
+        if not self._chunks:
+            return pd.DataFrame(columns=COLUMNS)
+        columns = [np.concatenate(parts) for parts in zip(*self._chunks)]
+        self._chunks = [tuple(columns)]  # later calls start from one chunk
+        frame = pd.DataFrame(dict(zip(COLUMNS, columns)))
+        frame["team"] = pd.Categorical.from_codes(frame["team"], self.teams.keys.index)
+        return frame
+
+
+class AnalyticsStore:
+    def __init__(self, clock=time.time, **options):
+        self.clock = clock
+        self.options = options
+        self.tenants = {}
+
+    def tenant(self, tenant_id):
+        analytics = self.tenants.get(tenant_id)
+        if analytics is None:
+            analytics = self.tenants[tenant_id] = TaskAnalytics(**self.options)
+        return analytics
+
+    # Teams, days and correlations over the last `days` calendar days (today included),
+    # or over every event; the event count and the distributions are always all-time
+    def summary(self, tenant_id, days=None):
+        analytics = self.tenant(tenant_id)
+        analytics.flush()
+        since = None if days is None else int(self.clock() // DAY) - days + 1
+        return {
+            "events": analytics.events,
+            "teams": records(analytics.by_team(since)),
+            "days": records(analytics.by_day(since)),
+            "correlation": {"day": analytics.correlation("day", since), "agent": analytics.correlation("agent", since)},
+            "distributions": analytics.distributions(),
+        }
+
+
+# JSON-friendly rows; NaN becomes None
+def records(frame):
+    frame = frame.reset_index()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.strftime("%Y-%m-%d")
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+# Team an agent reports under on the dashboard; agents without one are grouped by type
+def agent_team(agent):
+    return agent.get("team") or agent.get("type") or "Unassigned"
+
+
+# Shared store fed by finished tasks (a TaskDispatcher finish listener) and ratings
+analytics_store = AnalyticsStore()
+
+
+def record_task_event(record):
+    if record.status not in ("completed", "failed") or record.tenant_id is None or record.started_at is None:
+        return
+    analytics_store.tenant(record.tenant_id).add(
+        time.time(), record.agent_id, agent_team(agent_registry.get(record.agent_id) or {}),
+        record.finished_at - record.started_at, record.status == "completed",
+    )
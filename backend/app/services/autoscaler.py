@@ -0,0 +1,184 @@
+# Autoscaling of the agent worker pools: the task dispatcher's workers and the process
+# pool tiers. Every `interval` seconds each controller reads its pool's load and resizes it
+# when the policy's trigger has stayed past a threshold.
+#
+# Triggers (units match TaskDispatcher.load() and AgentProcessPool.load()):
+#   queue_depth  queued tasks per worker
+#   utilization  busy workers, percent
+#   p95_wait     95th percentile time tasks waited for a worker, ms
+#
+# Hysteresis comes from separate up/down thresholds plus `sustain` consecutive readings
+# past them; cooldowns space out changes, scale-downs more than scale-ups. Scale-ups are
+# proportional to the overshoot (at most doubling); scale-downs shed at most a quarter.
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+from backend.app.services.agent_service import task_dispatcher
+from backend.app.services.process_pool import process_pool
+
+TRIGGERS = ("queue_depth", "utilization", "p95_wait")
+DEFAULT_THRESHOLDS = {"queue_depth": (2.0, 0.1), "utilization": (80.0, 30.0), "p95_wait": (500.0, 50.0)}
+
+
+class ScalingPolicy:
+    def __init__(self, trigger="utilization", scale_up_threshold=None, scale_down_threshold=None, min_workers=1,
+                 max_workers=32, sustain=3, up_cooldown=30.0, down_cooldown=120.0):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.sustain = sustain
+        self.up_cooldown = up_cooldown
+        self.down_cooldown = down_cooldown
+        self.configure(trigger, scale_up_threshold, scale_down_threshold)
+
+    # Switch trigger and/or thresholds; thresholds not given fall back to the trigger's defaults
+    def configure(self, trigger=None, scale_up_threshold=None, scale_down_threshold=None):
+        trigger = trigger or self.trigger
+        if trigger not in TRIGGERS:
+            raise ValueError(f"Unknown scaling trigger {trigger!r}")
+        up, down = DEFAULT_THRESHOLDS[trigger]
+        if trigger == getattr(self, "trigger", None):
+            up, down = self.scale_up_threshold, self.scale_down_threshold
+        up = up if scale_up_threshold is None else scale_up_threshold
+        down = down if scale_down_threshold is None else scale_down_threshold
+        if down >= up:
+            raise ValueError("scale_down_threshold must be below scale_up_threshold")
+        self.trigger = trigger
+        self.scale_up_threshold = up
+        self.scale_down_threshold = down
+
+    def to_dict(self):
+        return {
+            "trigger": self.trigger,
+            "scale_up_threshold": self.scale_up_threshold,
+            "scale_down_threshold": self.scale_down_threshold,
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "sustain": self.sustain,
+            "up_cooldown": self.up_cooldown,
+            "down_cooldown": self.down_cooldown,
+        }
+
+
+# `load()` returns the pool's readings (with "workers"); `resize(n)` is a coroutine
+class Autoscaler:
+    def __init__(self, name, load, resize, policy: ScalingPolicy, interval=5.0, clock=time.monotonic, history=100):
+        self.name = name
+        self.load = load
+        self.resize = resize
+        self.policy = policy
+        self.interval = interval
+        self.clock = clock
+        self.decisions = deque(maxlen=history)
+        self.last_reading = None
+        self._above = 0
+        self._below = 0
+        self._changed_at = float("-inf")
+        self._task = None
+
+    def reset(self):
+        self._above = self._below = 0
+
+    # One control step: read the load, maybe resize. Returns the decision, if any.
+    async def evaluate(self):
+        policy = self.policy
+        reading = self.load()
+        self.last_reading = reading
+        value, workers = reading[policy.trigger], reading["workers"]
+        if value > policy.scale_up_threshold:
+            self._above, self._below = self._above + 1, 0
+        elif value < policy.scale_down_threshold:
+            self._above, self._below = 0, self._below + 1
+        else:
+            self._above = self._below = 0
+        since_change = self.clock() - self._changed_at
+        target = workers
+        if self._above >= policy.sustain and since_change >= policy.up_cooldown:
+            # Proportional step, at most doubling, like a horizontal pod autoscaler
+            target = max(workers + 1, min(2 * workers, math.ceil(workers * value / policy.scale_up_threshold)))
+        elif self._below >= policy.sustain and since_change >= policy.down_cooldown:
+            # Shed at most a quarter of the workers per step
+            target = max(workers - max(1, workers // 4), math.ceil(workers * value / policy.scale_up_threshold))
+        target = max(policy.min_workers, min(policy.max_workers, target))
+        if target == workers:
+            return None
+        await self.resize(target)
+        self._changed_at = self.clock()
+        self.reset()
+        decision = {
+            "at": time.time(),
+            "pool": self.name,
+            "trigger": policy.trigger,
+            "value": value,
+            "from": workers,
+            "to": target,
+            "direction": "up" if target > workers else "down",
+        }
+        self.decisions.append(decision)
+        print(f"Autoscaler {self.name}: {policy.trigger}={value:.1f}, workers {workers} -> {target}")
+        return decision
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.evaluate()
+            except Exception as e:
+                print(f"Autoscaler {self.name} step failed ({type(e).__name__}): {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            "policy": self.policy.to_dict(),
+            "reading": self.last_reading,
+            "decisions": list(self.decisions),
+        }
+
+
+def _policy_from_env(prefix, max_workers):
+    return ScalingPolicy(
+        trigger=os.getenv("AUTOSCALER_TRIGGER", "utilization"),
+        min_workers=int(os.getenv(f"{prefix}_MIN", "1")),
+        max_workers=int(os.getenv(f"{prefix}_MAX", str(max_workers))),
+        sustain=int(os.getenv("AUTOSCALER_SUSTAIN", "3")),
+        up_cooldown=float(os.getenv("AUTOSCALER_UP_COOLDOWN", "30")),
+        down_cooldown=float(os.getenv("AUTOSCALER_DOWN_COOLDOWN", "120")),
+    )
+
+
+def _process_tier(tier):
+    async def resize(size):
+        await process_pool.resize(tier, size)
+    return resize
+
+
+# One controller per pool, started in the app lifespan when AUTOSCALER_ENABLED is set
+AUTOSCALER_ENABLED = os.getenv("AUTOSCALER_ENABLED", "true").lower() in ("1", "true", "yes")
+AUTOSCALER_INTERVAL = float(os.getenv("AUTOSCALER_INTERVAL", "5"))
+autoscalers = {
+    "tasks": Autoscaler("tasks", task_dispatcher.load, task_dispatcher.resize,
+                        _policy_from_env("AUTOSCALER_TASK_WORKERS", 64), AUTOSCALER_INTERVAL),
+    "cpu": Autoscaler("cpu", lambda: process_pool.load("cpu"), _process_tier("cpu"),
+                      _policy_from_env("AUTOSCALER_CPU_WORKERS", 2 * (os.cpu_count() or 1)), AUTOSCALER_INTERVAL),
+    "general": Autoscaler("general", lambda: process_pool.load("general"), _process_tier("general"),
+                          _policy_from_env("AUTOSCALER_GENERAL_WORKERS", 4), AUTOSCALER_INTERVAL),
+}
+
+
+# Apply the dashboard's trigger and thresholds to every pool
+def configure_autoscalers(trigger=None, scale_up_threshold=None, scale_down_threshold=None):
+    for autoscaler in autoscalers.values():
+        autoscaler.policy.configure(trigger, scale_up_threshold, scale_down_threshold)
+        autoscaler.reset()
@@ -0,0 +1,298 @@
+# Daily forecasts of the metrics store's series for the Forecasting tab.
+#
+# Each (tenant, metric) series is modelled with damped additive Holt-Winters smoothing
+# (level, trend and a weekly season) over its complete days. Fitting is vectorized: the
+# series that need a fit are stacked into one matrix, repeated once per (alpha, beta,
+# gamma) candidate of the grid, and smoothed together one day at a time, so a refresh of
+# every tenant and metric is one pass of NumPy operations over all of them. Each series
+# keeps the candidate with the lowest one-step-ahead squared error.
+#
+# Fitted models are cached with the version of the series they saw. A request for an
+# unchanged series reuses the model and its forecasts; when only new days were added the
+# cached state is carried forward over them with the same parameters, and the grid is
+# searched again every `refit_every` days or when past days changed.
+
+import asyncio
+import itertools
+import math
+import os
+
+import numpy as np
+
+from backend.app.services.metrics_store import DAY, METRICS, metrics_store, reduce
+
+SEASON = 7  # days
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.05, 0.1, 0.2)
+GAMMAS = (0.0, 0.05, 0.1, 0.3)
+GRID = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+DAMPING = float(os.getenv("FORECAST_DAMPING", "0.98"))
+FORECAST_REFIT_EVERY = int(os.getenv("FORECAST_REFIT_EVERY", "30"))  # days
+FORECAST_REFRESH_INTERVAL = float(os.getenv("FORECAST_REFRESH_INTERVAL", "3600"))
+# Rows (series x candidates) smoothed together; bounds the working set of a full fit
+FORECAST_BATCH_ROWS = int(os.getenv("FORECAST_BATCH_ROWS", "65536"))
+MAX_HORIZON = 366
+Z_80 = 1.2816  # half-width of an 80% interval in standard deviations
+BOUNDS = {"avg_rating": (0.0, 5.0)}  # other metrics are counts or costs, bounded below by 0
+
+
+class SmoothingState:
+    def __init__(self, rows):
+        self.level = np.zeros(rows)
+        self.trend = np.zeros(rows)
+        self.season = np.zeros((rows, SEASON))
+        self.sse = np.zeros(rows)
+        self.n = np.zeros(rows, dtype=np.int64)  # one-step errors summed into sse
+        self.started = np.zeros(rows, dtype=bool)
+
+    def take(self, rows):
+        state = SmoothingState(0)
+        for name, value in vars(self).items():
+            setattr(state, name, value[rows].copy())
+        return state
+
+    @staticmethod
+    def stack(states):
+        state = SmoothingState(0)
+        for name in vars(state):
+            setattr(state, name, np.concatenate([getattr(s, name) for s in states]))
+        return state
+
+
+# Damped additive Holt-Winters over the rows of `y` (rows x days from `first_day` on, NaN
+# for days without data), each row with its own (alpha, beta, gamma) from `params`.
+# Continues from `state` when given; a row starts at its first observed day.
+def smooth(y, first_day, params, state=None, phi=DAMPING):
+    rows, days = y.shape
+    alpha, beta, gamma = params[:, 0], params[:, 1], params[:, 2]
+    state = SmoothingState(rows) if state is None else state
+    level, trend, season, sse, n, started = state.level, state.trend, state.season, state.sse, state.n, state.started
+    for step in range(days):
+        value = y[:, step]
+        observed = ~np.isnan(value)
+        update = observed & started
+        slot = (first_day + step) % SEASON
+        current = season[:, slot]
+        error = np.where(update, value - (level + phi * trend + current), 0.0)
+        sse += error * error
+        n += update
+        new_level = alpha * (value - current) + (1 - alpha) * (level + phi * trend)
+        trend = np.where(update, beta * (new_level - level) + (1 - beta) * phi * trend, trend)
+        season[:, slot] = np.where(update, gamma * (value - new_level) + (1 - gamma) * current, current)
+        level = np.where(update, new_level, np.where(observed & ~started, value, level))
+        started |= observed
+    state.level, state.trend = level, trend
+    return state
+
+
+class Model:
+    def __init__(self, params, state, first_day, y, version, today):
+        self.params = params  # (alpha, beta, gamma)
+        self.state = state  # one-row SmoothingState as of the end of `y`
+        self.first_day = first_day  # day number of y[0]
+        self.y = y  # daily values the model has seen, NaN for missing days
+        self.version = version
+        self.today = today
+        self.days_since_fit = 0
+        self.forecasts = {}  # (horizon, history days) -> result
+
+
+class Forecaster:
+    def __init__(self, store=metrics_store, grid=GRID, refit_every=FORECAST_REFIT_EVERY, batch_rows=FORECAST_BATCH_ROWS):
+        self.store = store
+        self.grid = grid
+        self.refit_every = refit_every
+        self.batch_rows = batch_rows
+        self.models = {}  # (tenant_id, metric) -> Model
+        self.fits = 0  # series fitted with a grid search
+        self.updates = 0  # series carried forward over new days
+        self._task = None
+
+    # Complete daily values of a series up to `today`: (day number of the first, values).
+    # Days without samples count as 0 for summed metrics and as missing otherwise.
+    def history(self, tenant_id, metric, today):
+        series = self.store._series.get((tenant_id, metric))
+        if series is None:
+            return today, np.zeros(0)
+        rollup = series.rollups[-1]
+        times, sums, _, maxs, counts = rollup.read((today - rollup.capacity) * DAY, today * DAY)
+        if not len(times):
+            return today, np.zeros(0)
+        days = (times // DAY).astype(np.int64)
+        first_day = int(days[0])
+        y = np.full(today - first_day, 0.0 if METRICS[metric] == "sum" else np.nan)
+        y[days - first_day] = reduce(METRICS[metric], sums, counts, maxs)
+        return first_day, y
+
+    # Bring the models of `keys` (every series of the store by default) up to date: series
+    # that only gained days are carried forward, the others are fitted together.
+    def refresh(self, keys=None):
+        today, refit, carry = self._plan(keys)
+        return self._install(today, self._smooth(today, refit, carry))
+
+    # The same with the smoothing in a worker thread. Histories and model states are
+    # snapshotted on the event loop first and the results installed back on it, so the
+    # thread never touches the metrics store or self.models. The per-day loop over small
+    # arrays holds the GIL most of the time; the thread only lets the loop interleave
+    # requests with a long refresh instead of stalling until it ends.
+    async def refresh_in_thread(self, keys=None):
+        today, refit, carry = self._plan(keys)
+        return self._install(today, await asyncio.to_thread(self._smooth, today, refit, carry))
+
+    # Snapshot of the series that need work: (key, first_day, y, version) to fit, and
+    # (key, first_day, y, version, new_days, model, params, state) to carry forward
+    def _plan(self, keys):
+        today = int(self.store.clock() // DAY)
+        keys = list(self.store._series) if keys is None else keys
+        refit, carry = [], []
+        for key in keys:
+            series = self.store._series.get(key)
+            model = self.models.get(key)
+            if series is None or key[1] not in METRICS:
+                continue
+            if model is not None and model.version == series.version and model.today == today:
+                continue
+            first_day, y = self.history(*key, today)
+            if not len(y):
+                self.models.pop(key, None)
+                continue
+            new_days = self._new_days(model, first_day, y)
+            if new_days == 0:
+                model.version = series.version  # only today's partial day changed
+                continue
+            if new_days is None or model.days_since_fit + new_days >= self.refit_every:
+                refit.append((key, first_day, y, series.version))
+            else:
+                carry.append((key, first_day, y, series.version, new_days, model, model.params, model.state.take([0])))
+        return today, refit, carry
+
+    # Days `y` adds to what `model` saw, or None when a day the model saw has changed
+    def _new_days(self, model, first_day, y):
+        if model is None or first_day < model.first_day:
+            return None
+        seen_end = model.first_day + len(model.y)
+        if first_day + len(y) < seen_end:
+            return None
+        overlap = seen_end - first_day
+        if overlap > 0 and not np.array_equal(y[:overlap], model.y[first_day - model.first_day:], equal_nan=True):
+            return None
+        return len(y) - max(overlap, 0)
+
+    # (key, first_day, y, version, new_days, base model or None, params, state) for every
+    # planned series; reads only the snapshots
+    def _smooth(self, today, refit, carry):
+        return (self._fit(refit, today) if refit else []) + (self._carry(carry, today) if carry else [])
+
+    # Grid search over every (series, candidate) pair, a batch of series at a time
+    def _fit(self, pending, today):
+        candidates = len(self.grid)
+        per_batch = max(1, self.batch_rows // candidates)
+        fitted = []
+        for offset in range(0, len(pending), per_batch):
+            batch = pending[offset:offset + per_batch]
+            start = min(first_day for _, first_day, _, _ in batch)
+            y = np.full((len(batch), today - start), np.nan)
+            for row, (_, first_day, values, _) in enumerate(batch):
+                y[row, first_day - start:] = values
+            state = smooth(np.repeat(y, candidates, axis=0), start, np.tile(self.grid, (len(batch), 1)))
+            sse = state.sse.reshape(len(batch), candidates)
+            best = np.arange(len(batch)) * candidates + sse.argmin(axis=1)
+            for row, (key, first_day, values, version) in enumerate(batch):
+                fitted.append((key, first_day, values, version, None, None, self.grid[best[row] % candidates], state.take([best[row]])))
+        return fitted
+
+    # Continue the snapshotted states over the new days with their fitted parameters
+    def _carry(self, pending, today):
+        longest = max(entry[4] for entry in pending)
+        y = np.full((len(pending), longest), np.nan)
+        for row, (_, _, values, _, new_days, *_) in enumerate(pending):
+            if new_days:
+                y[row, longest - new_days:] = values[-new_days:]
+        state = smooth(y, today - longest, np.array([entry[6] for entry in pending]),
+                       SmoothingState.stack([entry[7] for entry in pending]))
+        return [(key, first_day, values, version, new_days, model, params, state.take([row]))
+                for row, (key, first_day, values, version, new_days, model, params, _) in enumerate(pending)]
+
+    # Install smoothed models, skipping any whose series was refreshed meanwhile
+    def _install(self, today, results):
+        for key, first_day, values, version, new_days, base, params, state in results:
+            current = self.models.get(key)
+            if base is None:
+                if current is not None and (current.today, current.version) >= (today, version):
+                    continue
+                self.models[key] = Model(params, state, first_day, values, version, today)
+                self.fits += 1
+            elif current is base:
+                base.state = state
+                base.first_day, base.y, base.version, base.today = first_day, values, version, today
+                base.days_since_fit += new_days
+                base.forecasts = {}
+                self.updates += 1
+        return len(results)
+
+    # Daily forecast of one series for the next `horizon` days with an 80% interval, and
+    # the history it was fitted on (the last `history_days` days)
+    def forecast(self, tenant_id, metric, horizon, history_days=90):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}")
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"horizon must be between 1 and {MAX_HORIZON} days")
+        key = (tenant_id, metric)
+        self.refresh([key])
+        model = self.models.get(key)
+        if model is None:
+            return {"metric": metric, "history": [], "forecast": [], "model": None}
+        cached = model.forecasts.get((horizon, history_days))
+        if cached is None:
+            cached = model.forecasts[(horizon, history_days)] = self._predict(model, metric, horizon, history_days)
+        return cached
+
+    def _predict(self, model, metric, horizon, history_days):
+        state = model.state
+        steps = np.arange(1, horizon + 1)
+        damping = np.cumsum(DAMPING ** steps)
+        slots = (model.today + steps - 1) % SEASON
+        values = state.level[0] + damping * state.trend[0] + state.season[0, slots]
+        sigma = math.sqrt(state.sse[0] / state.n[0]) if state.n[0] else 0.0
+        width = Z_80 * sigma * np.sqrt(steps)
+        low, high = BOUNDS.get(metric, (0.0, math.inf))
+        days = model.first_day + np.arange(len(model.y))
+        recent = slice(max(0, len(model.y) - history_days), None)
+        alpha, beta, gamma = model.params
+        return {
+            "metric": metric,
+            "history": [{"t": float(day * DAY), "value": float(value)}
+                        for day, value in zip(days[recent], model.y[recent]) if not np.isnan(value)],
+            "forecast": [
+                {"t": float((model.today + step - 1) * DAY), "value": float(v), "lower": float(lo), "upper": float(hi)}
+                for step, v, lo, hi in zip(steps, np.clip(values, low, high), np.clip(values - width, low, high), np.clip(values + width, low, high))
+            ],
+            "model": {"alpha": float(alpha), "beta": float(beta), "gamma": float(gamma), "damping": DAMPING,
+                      "sigma": sigma, "observations": int(np.count_nonzero(~np.isnan(model.y)))},
+        }
+
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_in_thread()
+            except Exception as e:
+                print(f"Forecast refresh failed ({type(e).__name__}): {e}")
+
+    def start(self, interval):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {"models": len(self.models), "fits": self.fits, "updates": self.updates}
+
+
+# Shared forecaster over the metrics store; the lifespan refreshes every series in the
+# background so requests mostly find fitted models
+forecaster = Forecaster()
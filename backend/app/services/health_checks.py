@@ -0,0 +1,250 @@
+# Agent health checks and recovery.
+#
+# Checks are kept on a hierarchical timer wheel driven by one coroutine that wakes every
+# `tick` seconds, instead of one sleeping task per agent, so tens of thousands of checks
+# cost a few slot lookups per tick. Each check's first run is spread over its interval and
+# later runs are jittered by +-`jitter`, so checks registered together do not fire
+# together. At most `max_concurrency` probes run at once; due checks wait in a FIFO.
+# A check is rescheduled only after its probe finished, so a slow agent is never probed
+# twice at the same time.
+#
+# After `failure_threshold` consecutive failures (False, an exception or a timeout) the
+# check's recovery action runs and the count starts again:
+#   restart   cancel the agent's running tasks so its queue starts afresh
+#   reassign  move the agent's queued tasks to an idle active agent of the same type
+#   alert     record an alert for the tenant
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+
+from backend.app.services.agent_registry import agent_registry
+from backend.app.services.agent_service import task_dispatcher
+from backend.app.utils.timer_wheel import TimerWheel
+
+RECOVERY_ACTIONS = ("restart", "reassign", "alert")
+UNHEALTHY_STATUSES = ("Error", "Failed", "Offline")
+HEALTH_TASK_TIMEOUT = float(os.getenv("HEALTH_TASK_TIMEOUT", "600"))
+
+
+class HealthCheck:
+    __slots__ = ("agent_id", "tenant_id", "interval", "action", "failure_threshold", "consecutive_failures",
+                 "checks", "failures", "recoveries", "healthy", "last_checked", "last_error", "due_at", "timer")
+
+    def __init__(self, agent_id, tenant_id, interval, action, failure_threshold):
+        self.agent_id = agent_id
+        self.tenant_id = tenant_id
+        self.interval = interval
+        self.action = action
+        self.failure_threshold = failure_threshold
+        self.consecutive_failures = 0
+        self.checks = 0
+        self.failures = 0
+        self.recoveries = 0
+        self.healthy = None  # None until the first probe
+        self.last_checked = None
+        self.last_error = None
+        self.due_at = None
+        self.timer = None
+
+    def to_dict(self):
+        return {
+            "agent_id": self.agent_id,
+            "interval": self.interval,
+            "action": self.action,
+            "failure_threshold": self.failure_threshold,
+            "consecutive_failures": self.consecutive_failures,
+            "checks": self.checks,
+            "failures": self.failures,
+            "recoveries": self.recoveries,
+            "healthy": self.healthy,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class HealthChecker:
+    # `probe(check)` returns whether the agent is healthy; `recover(check)` runs its action
+    def __init__(self, probe, recover, tick=0.1, wheel_size=64, levels=4, max_concurrency=256, jitter=0.1,
+                 timeout=5.0, clock=time.monotonic, seed=None):
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be in [0, 1)")
+        self.probe = probe
+        self.recover = recover
+        self.tick = tick
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.timeout = timeout
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.wheel = TimerWheel(wheel_size, levels, self._tick_of(clock()))
+        self.checks = {}  # agent id -> HealthCheck
+        self.alerts = deque(maxlen=1000)
+        self._due = deque()
+        self._inflight = set()
+        self._task = None
+        self._stopping = False
+        self.probes = 0
+        self.lateness = deque(maxlen=4096)  # seconds between a check's due time and its probe starting
+
+    def _tick_of(self, now):
+        return int(now / self.tick)
+
+    def register(self, agent_id, interval, action="alert", failure_threshold=3, tenant_id=None):
+        if action not in RECOVERY_ACTIONS:
+            raise ValueError(f"Unknown recovery action {action!r}")
+        if interval <= 0 or failure_threshold < 1:
+            raise ValueError("interval and failure_threshold must be positive")
+        self.unregister(agent_id)
+        check = self.checks[agent_id] = HealthCheck(agent_id, tenant_id, interval, action, failure_threshold)
+        self._schedule(check, self.random.uniform(0, interval))
+        return check
+
+    def unregister(self, agent_id):
+        check = self.checks.pop(agent_id, None)
+        if check is not None and check.timer is not None:
+            check.timer.cancel()
+        return check
+
+    def _schedule(self, check, delay):
+        check.due_at = self.clock() + delay
+        # Round up so a check never runs early
+        check.timer = self.wheel.schedule(-int(-check.due_at // self.tick), check)
+
+    # One scheduler step: expire due timers and start probes up to the concurrency limit
+    def poll(self):
+        due = self.wheel.advance(self._tick_of(self.clock()))
+        self._due.extend(due)
+        self._launch()
+        return len(due)
+
+    def _launch(self):
+        while not self._stopping and self._due and len(self._inflight) < self.max_concurrency:
+            check = self._due.popleft()
+            if self.checks.get(check.agent_id) is not check:
+                continue  # unregistered or replaced while waiting
+            task = asyncio.ensure_future(self._check(check))
+            self._inflight.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self._inflight.discard(task)
+        self._launch()
+
+    async def _check(self, check):
+        started = self.clock()
+        self.lateness.append(started - check.due_at)
+        self.probes += 1
+        try:
+            try:
+                healthy, error = await asyncio.wait_for(self.probe(check), self.timeout), None
+            except asyncio.TimeoutError:
+                healthy, error = False, f"Timed out after {self.timeout}s"
+            except Exception as e:
+                healthy, error = False, f"{type(e).__name__}: {e}"
+            check.checks += 1
+            check.healthy = bool(healthy)
+            check.last_checked = time.time()
+            check.last_error = None if healthy else error or "Unhealthy"
+            if healthy:
+                check.consecutive_failures = 0
+                return
+            check.failures += 1
+            check.consecutive_failures += 1
+            if check.consecutive_failures >= check.failure_threshold:
+                check.consecutive_failures = 0
+                check.recoveries += 1
+                try:
+                    await self.recover(check)
+                except Exception as e:
+                    print(f"Recovery '{check.action}' of agent {check.agent_id} failed ({type(e).__name__}): {e}")
+        finally:
+            # Also when cancelled by stop(), so the check runs again after the next start()
+            if self.checks.get(check.agent_id) is check:
+                self._schedule(check, check.interval * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def _run(self):
+        while True:
+            # Wake on tick boundaries, where timers fall due
+            await asyncio.sleep(self.tick - self.clock() % self.tick)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Health check scheduler step failed ({type(e).__name__}): {e}")
+
+    def start(self):
+        self._stopping = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Stop scheduling and cancel probes in flight; registered checks are kept
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+
+    def alert(self, check, message):
+        self.alerts.append({"at": time.time(), "agent_id": check.agent_id, "tenant_id": check.tenant_id, "message": message})
+        print(f"Health alert for agent {check.agent_id}: {message}")
+
+    def stats(self, tenant_id=None):
+        checks = [check for check in self.checks.values() if tenant_id is None or check.tenant_id == tenant_id]
+        lateness = sorted(self.lateness)
+        return {
+            "checks": len(checks),
+            "unhealthy": sum(check.healthy is False for check in checks),
+            "running": len(self._inflight),
+            "waiting": len(self._due),
+            "probes": self.probes,
+            "p99_lateness": lateness[int(len(lateness) * 0.99)] if lateness else 0.0,
+            "alerts": [alert for alert in self.alerts if tenant_id is None or alert["tenant_id"] == tenant_id],
+        }
+
+
+# Unhealthy: gone from the registry, in a failed status, or stuck on one task too long
+async def probe_agent(check):
+    agent = agent_registry.get(check.agent_id)
+    if agent is None or agent.get("status") in UNHEALTHY_STATUSES:
+        return False
+    running = task_dispatcher.running_seconds(check.agent_id)
+    return running is None or running < HEALTH_TASK_TIMEOUT
+
+
+async def recover_agent(check):
+    failures = f"{check.failure_threshold} consecutive failed health checks ({check.last_error})"
+    if check.action == "restart":
+        cancelled = task_dispatcher.cancel_running(check.agent_id)
+        health_checker.alert(check, f"Restarted after {failures}; {cancelled} running tasks cancelled")
+    elif check.action == "reassign":
+        agent = agent_registry.get(check.agent_id)
+        candidates = [] if agent is None else [
+            other for other in agent_registry.list(limit=100, tenant_id=agent["tenant_id"], type=agent.get("type"), status="Active")
+            if other["id"] != check.agent_id
+        ]
+        if not candidates:
+            health_checker.alert(check, f"No active agent to take over its tasks after {failures}")
+            return
+        # Prefer an agent that is idle right now
+        target = min(candidates, key=lambda other: task_dispatcher.running_seconds(other["id"]) is not None)
+        moved = await task_dispatcher.reassign(check.agent_id, target["id"])
+        health_checker.alert(check, f"{moved} queued tasks reassigned to agent {target['id']} after {failures}")
+    else:
+        health_checker.alert(check, failures)
+
+
+# Shared checker, started and stopped in the app lifespan
+health_checker = HealthChecker(
+    probe_agent, recover_agent,
+    tick=float(os.getenv("HEALTH_CHECK_TICK", "0.1")),
+    max_concurrency=int(os.getenv("HEALTH_CHECK_CONCURRENCY", "256")),
+    jitter=float(os.getenv("HEALTH_CHECK_JITTER", "0.1")),
+    timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "5")),
+)
@@ -0,0 +1,196 @@
+# Exact-match cache of LLM responses: an in-memory LRU tier in front of a SQLite tier
+# that survives restarts. Only deterministic requests (temperature 0) are cached.
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from backend.app.utils.cache import MISSING, TTLCache
+
+# Request parameters that change the response and therefore belong in the key
+KEY_PARAMS = ("temperature", "top_p", "max_tokens", "frequency_penalty", "presence_penalty", "stop")
+
+
+# Sampling at temperature 0 is greedy, so the same request gives the same response
+def is_deterministic(params: dict):
+    temperature = params.get("temperature")
+    return temperature is not None and float(temperature) == 0.0
+
+
+# Canonical hash of everything that affects the response
+def cache_key(model: str, prompt: str, params: dict):
+    stop = params.get("stop")
+    if isinstance(stop, str):
+        stop = [stop]
+    canonical = {name: params.get(name) for name in KEY_PARAMS}
+    canonical.update(model=model, prompt=prompt, stop=stop)
+    for name in ("temperature", "top_p", "frequency_penalty", "presence_penalty"):
+        if canonical[name] is not None:
+            canonical[name] = float(canonical[name])
+    raw = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# On-disk tier. Expired rows are purged every `purge_interval` seconds (and never served),
+# and the least recently used rows are evicted to stay within the entry count and size.
+class SQLiteResponseStore:
+    def __init__(self, path, max_entries=100_000, max_bytes=512 * 1024 * 1024, ttl=7 * 24 * 3600.0,
+                 purge_interval=60.0, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.clock = clock
+        self._connection = None
+        self._count = 0  # running totals, recounted after each TTL purge
+        self._bytes = 0
+        self._purged_at = float("-inf")
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    # Opened on first use, so importing the service never touches the disk
+    def _db(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS llm_responses_accessed ON llm_responses (accessed_at)")
+            self._recount(connection)
+            self._connection = connection
+        return self._connection
+
+    def get(self, key):
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT response, created_at, size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return MISSING
+            now = self.clock()
+            if now - row[1] > self.ttl:
+                db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._count -= 1
+                self._bytes -= row[2]
+                return MISSING
+            db.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        raw = json.dumps(value)
+        with self._lock:
+            db = self._db()
+            now = self.clock()
+            old = db.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, raw, len(raw), now, now),
+            )
+            self._count += old is None
+            self._bytes += len(raw) - (old[0] if old else 0)
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        if now - self._purged_at >= self.purge_interval:
+            self.evictions += db.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+            self._recount(db)
+            self._purged_at = now
+        while self._count > self.max_entries or self._bytes > self.max_bytes:
+            # Drop the least recently used tenth, or whatever is over the entry limit
+            excess = max(self._count - self.max_entries, self._count // 10, 1)
+            victims = db.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at LIMIT ?", (excess,)).fetchall()
+            db.executemany("DELETE FROM llm_responses WHERE key = ?", [(key,) for key, _ in victims])
+            self.evictions += len(victims)
+            self._count -= len(victims)
+            self._bytes -= sum(size for _, size in victims)
+
+    def _recount(self, db):
+        self._count, self._bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class LLMResponseCache:
+    def __init__(self, memory: TTLCache, store: SQLiteResponseStore = None, enabled=True):
+        self.memory = memory
+        self.store = store
+        self.enabled = enabled
+        self._agents = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0})
+
+    def bypass(self, agent_id=None):
+        self._agents[agent_id]["bypassed"] += 1
+
+    # Cached response for `key`, checking memory first, then disk (off the event loop)
+    async def get(self, key, agent_id=None):
+        counters = self._agents[agent_id]
+        value = self.memory.get(key)
+        if value is not MISSING:
+            counters["memory_hits"] += 1
+            return value
+        if self.store is not None:
+            value = await asyncio.to_thread(self.store.get, key)
+            if value is not MISSING:
+                counters["disk_hits"] += 1
+                self.memory.set(key, value)
+                return value
+        counters["misses"] += 1
+        return MISSING
+
+    async def set(self, key, value):
+        self.memory.set(key, value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, value)
+
+    # Hit-rate metrics for one agent, or for every agent seen so far
+    def stats(self, agent_id=MISSING):
+        if agent_id is not MISSING:
+            return _with_hit_ratio(self._agents.get(agent_id, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}))
+        return {
+            "memory": self.memory.stats(),
+            "disk_evictions": 0 if self.store is None else self.store.evictions,
+            "agents": {agent: _with_hit_ratio(counters) for agent, counters in self._agents.items()},
+        }
+
+
+def _with_hit_ratio(counters):
+    hits = counters["memory_hits"] + counters["disk_hits"]
+    lookups = hits + counters["misses"]
+    return dict(counters, hit_ratio=hits / lookups if lookups else 0.0)
+
+
+# Build the cache from LLM_CACHE_* environment variables; LLM_CACHE_PATH="" keeps it in memory
+def llm_cache_from_env():
+    path = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+    store = None
+    if path:
+        store = SQLiteResponseStore(
+            path,
+            max_entries=int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "100000")),
+            max_bytes=int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+            ttl=float(os.getenv("LLM_CACHE_DISK_TTL", str(7 * 24 * 3600))),
+        )
+    return LLMResponseCache(
+        memory=TTLCache(
+            maxsize=int(os.getenv("LLM_CACHE_MAXSIZE", "10000")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+        ),
+        store=store,
+        enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+    )
@@ -1,4 +1,533 @@
-# Placeholder for LLM service logic
+# LLM service logic: an async gateway in front of the model providers.
+#
+# Every call goes through per-tenant and per-model limits before it reaches the provider:
+# a request-rate bucket per tenant (access_permissions.api_rate_limit, per minute),
+# request and token buckets per model, and concurrency caps per tenant and per model.
+# At capacity, calls queue rather than fail.
 
-def get_llm_response(prompt):
-    return f"Response for the prompt: {prompt}"
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from typing import Optional
+
+import httpx
+
+from backend.app.services.load_balancer import STRATEGIES, BalancedProvider, LoadBalancer
+from backend.app.services.llm_cache import cache_key, is_deterministic, llm_cache_from_env
+from backend.app.services.similarity_cache import similarity_cache_from_env
+from backend.app.utils.batching import MicroBatcher
+from backend.app.utils.cache import MISSING, TTLCache
+from backend.app.utils.rate_limit import per_minute
+from backend.app.utils.singleflight import SingleFlight
+
+# Provider serving each model base offered in the agent wizard
+MODEL_PROVIDERS = {
+    "GPT-3.5": "openai", "GPT-4": "openai",
+    "Claude": "anthropic", "Anthropic-100k": "anthropic",
+    "PaLM": "google", "Chinchilla": "google",
+    "Jurassic-2": "ai21", "Cohere": "cohere", "Bedrock": "bedrock",
+    "Llama": "local", "Alpaca": "local", "Vicuna": "local", "Falcon": "local", "MPT": "local",
+    "Dolly": "local", "StableLM": "local", "RedPajama-INCITE": "local", "OpenAssistant": "local",
+}
+# Provider-side model ids, where they differ from the model base name
+MODEL_IDS = {
+    "GPT-3.5": "gpt-3.5-turbo", "GPT-4": "gpt-4", "Claude": "claude-3-haiku-20240307",
+    "Anthropic-100k": "claude-3-5-sonnet-20240620", "PaLM": "chat-bison",
+}
+
+DEFAULT_MAX_TOKENS = 256
+LLM_MODEL_CONCURRENCY = int(os.getenv("LLM_MODEL_CONCURRENCY", "16"))
+LLM_MODEL_RPM = int(os.getenv("LLM_MODEL_RPM", "0"))
+LLM_MODEL_TPM = int(os.getenv("LLM_MODEL_TPM", "0"))
+LLM_TENANT_CONCURRENCY = int(os.getenv("LLM_TENANT_CONCURRENCY", "8"))
+LLM_TENANT_RATE_LIMIT_TTL = float(os.getenv("LLM_TENANT_RATE_LIMIT_TTL", "60"))
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "10"))
+# Requests to providers that accept batches are collected for up to LLM_BATCH_MAX_WAIT_MS
+# or LLM_BATCH_MAX_SIZE requests, whichever comes first (0 turns batching off)
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "32"))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "5"))
+# How calls are spread over the replicas of a provider (see load_balancer.STRATEGIES)
+LLM_LOAD_BALANCING = os.getenv("LLM_LOAD_BALANCING", "p2c")
+# Per-model overrides, e.g. {"GPT-4": {"concurrency": 8, "rpm": 500, "tpm": 40000}}
+LLM_MODEL_LIMITS = json.loads(os.getenv("LLM_MODEL_LIMITS", "{}"))
+# USD per 1000 tokens by model, for cost metrics, e.g. {"GPT-4": 0.03}
+LLM_PRICES = json.loads(os.getenv("LLM_PRICES", "{}"))
+
+
+# Rough token count for rate limiting before the provider reports real usage
+def estimate_tokens(text: str):
+    return max(1, len(text) // 4)
+
+
+# Client for an OpenAI-compatible chat completions API, with its own connection pool.
+# With `batching`, the gateway may send several prompts in one legacy /completions call,
+# which servers such as vLLM accept as a prompt list.
+class OpenAICompatibleProvider:
+    def __init__(self, base_url, api_key=None, max_connections=100, timeout=60.0, transport=None, batching=False):
+        self.supports_batching = batching
+        self.client_options = dict(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.client = httpx.AsyncClient(**self.client_options)
+
+    # The pool is reopened after aclose(), e.g. when the app lifespan runs again
+    def _client(self):
+        if self.client.is_closed:
+            self.client = httpx.AsyncClient(**self.client_options)
+        return self.client
+
+    async def complete(self, model: str, prompt: str, params: dict):
+        response = await self._client().post(
+            "/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], **params},
+        )
+        response.raise_for_status()
+        body = response.json()
+        usage = body.get("usage") or {}
+        return {
+            "text": body["choices"][0]["message"]["content"],
+            "prompt_tokens": usage.get("prompt_tokens", estimate_tokens(prompt)),
+            "completion_tokens": usage.get("completion_tokens", 0),
+        }
+
+    async def complete_batch(self, model: str, prompts: list, params: dict):
+        response = await self._client().post("/completions", json={"model": model, "prompt": prompts, **params})
+        response.raise_for_status()
+        body = response.json()
+        texts = [None] * len(prompts)
+        for choice in body["choices"]:
+            texts[choice["index"]] = choice["text"]
+        return [
+            {"text": text, "prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text or "")}
+            for prompt, text in zip(prompts, texts)
+        ]
+
+    # Text deltas from a server-sent events response (stream=True)
+    async def stream(self, model: str, prompt: str, params: dict):
+        async with self._client().stream(
+            "POST",
+            "/chat/completions",
+            json={"model": model, "messages": [{"role": "user", "content": prompt}], **params, "stream": True},
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Local stand-in for a provider: answers after `latency` (+/- `jitter`) seconds; streamed
+# answers send their first word after `latency` and the others `token_interval` apart
+class FakeProvider:
+    def __init__(self, latency=0.05, jitter=0.0, seed=None, token_interval=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_interval = token_interval
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def complete(self, model: str, prompt: str, params: dict):
+        self.calls += 1
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+        finally:
+            self.inflight -= 1
+        text = f"Response for the prompt: {prompt}"
+        return {"text": text, "prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+
+    async def stream(self, model: str, prompt: str, params: dict):
+        self.calls += 1
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+            for i, word in enumerate(f"Response for the prompt: {prompt}".split(" ")):
+                if i:
+                    await asyncio.sleep(self.token_interval)
+                yield word if i == 0 else " " + word
+        finally:
+            self.inflight -= 1
+
+    async def aclose(self):
+        pass
+
+
+# Fake model server that runs `slots` forward passes at a time. A pass over a batch of n
+# prompts takes `latency + n * per_item` seconds, so batching trades a little latency for
+# far more throughput, the way a GPU-backed server does.
+class FakeBatchedProvider(FakeProvider):
+    supports_batching = True
+
+    def __init__(self, latency=0.05, per_item=0.001, slots=4, seed=None):
+        super().__init__(latency=latency, seed=seed)
+        self.per_item = per_item
+        self.slots = asyncio.Semaphore(slots)
+        self.batch_sizes = []
+
+    async def complete_batch(self, model: str, prompts: list, params: dict):
+        self.calls += 1
+        self.batch_sizes.append(len(prompts))
+        async with self.slots:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            try:
+                await asyncio.sleep(self.latency + len(prompts) * self.per_item)
+            finally:
+                self.inflight -= 1
+        texts = [f"Response for the prompt: {prompt}" for prompt in prompts]
+        return [
+            {"text": text, "prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+            for prompt, text in zip(prompts, texts)
+        ]
+
+    async def complete(self, model: str, prompt: str, params: dict):
+        return (await self.complete_batch(model, [prompt], params))[0]
+
+
+# Providers from LLM_<PROVIDER>_BASE_URL / LLM_<PROVIDER>_API_KEY (LLM_<PROVIDER>_BATCHING
+# for servers that take prompt lists). A comma-separated BASE_URL lists replicas, which are
+# load balanced with LLM_LOAD_BALANCING. LLM_PROVIDER=fake serves every model from a
+# FakeProvider with LLM_FAKE_LATENCY seconds of latency.
+def providers_from_env():
+    if os.getenv("LLM_PROVIDER") == "fake":
+        fake = FakeProvider(latency=float(os.getenv("LLM_FAKE_LATENCY", "0.05")))
+        return {name: fake for name in set(MODEL_PROVIDERS.values())}
+    providers = {}
+    for name in set(MODEL_PROVIDERS.values()):
+        base_urls = [url.strip() for url in os.getenv(f"LLM_{name.upper()}_BASE_URL", "").split(",") if url.strip()]
+        replicas = {
+            url: OpenAICompatibleProvider(
+                url,
+                os.getenv(f"LLM_{name.upper()}_API_KEY"),
+                batching=os.getenv(f"LLM_{name.upper()}_BATCHING", "false").lower() in ("1", "true", "yes"),
+            )
+            for url in base_urls
+        }
+        if len(replicas) == 1:
+            providers[name] = replicas[base_urls[0]]
+        elif replicas:
+            providers[name] = BalancedProvider(LoadBalancer(replicas, strategy=LLM_LOAD_BALANCING))
+    return providers
+
+
+# Tenant request limits (requests per minute) from access_permissions.api_rate_limit
+def supabase_rate_limits(client: httpx.AsyncClient, headers: dict):
+    async def lookup(tenant_id):
+        response = await client.get(
+            f"/rest/v1/access_permissions?tenant_id=eq.{tenant_id}&select=api_rate_limit&order=created_at.desc&limit=1",
+            headers=headers,
+        )
+        response.raise_for_status()
+        rows = response.json()
+        return rows[0]["api_rate_limit"] if rows else None
+    return lookup
+
+
+class _Limits:
+    def __init__(self, concurrency, rpm=0, tpm=0):
+        self.concurrency = asyncio.Semaphore(concurrency) if concurrency else None
+        self.rpm = rpm
+        self.requests = per_minute(rpm, LLM_BURST_SECONDS)
+        self.tokens = per_minute(tpm, LLM_BURST_SECONDS)
+        self.queued = 0
+        self.inflight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def stats(self):
+        return {"queued": self.queued, "inflight": self.inflight, "completed": self.completed, "failed": self.failed}
+
+
+# Recent per-model latencies in seconds: time to first token (streamed calls) and total
+class _Timings:
+    def __init__(self, window=1000):
+        self.ttft = deque(maxlen=window)
+        self.latency = deque(maxlen=window)
+
+    def stats(self):
+        return {"ttft": _percentiles(self.ttft), "latency": _percentiles(self.latency)}
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+class LLMGateway:
+    def __init__(self, providers: Optional[dict] = None, model_concurrency=LLM_MODEL_CONCURRENCY,
+                 tenant_concurrency=LLM_TENANT_CONCURRENCY, model_limits: Optional[dict] = None,
+                 tenant_rate_limit=None, batch_max_size=LLM_BATCH_MAX_SIZE, batch_max_wait=LLM_BATCH_MAX_WAIT_MS / 1000):
+        self.providers = providers_from_env() if providers is None else providers
+        self.model_concurrency = model_concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.model_limits = LLM_MODEL_LIMITS if model_limits is None else model_limits
+        # async tenant_id -> requests per minute (None or 0 for unlimited)
+        self.tenant_rate_limit = tenant_rate_limit
+        self._rate_limits = TTLCache(maxsize=10000, ttl=LLM_TENANT_RATE_LIMIT_TTL)
+        self._lookups = SingleFlight()
+        self._models = {}
+        self._tenants = {}
+        self._timings = {}
+        self.on_usage = None  # called with (model, tenant_id, tokens) after each call, e.g. to record metrics
+        # Shared by every model; batches are keyed by model and request parameters
+        self.batcher = MicroBatcher(self._run_batch, batch_max_size, batch_max_wait) if batch_max_size > 1 else None
+
+    def _model(self, model):
+        limits = self._models.get(model)
+        if limits is None:
+            overrides = self.model_limits.get(model, {})
+            limits = self._models[model] = _Limits(
+                overrides.get("concurrency", self.model_concurrency),
+                overrides.get("rpm", LLM_MODEL_RPM),
+                overrides.get("tpm", LLM_MODEL_TPM),
+            )
+        return limits
+
+    # Tenant limits; the request bucket is rebuilt when api_rate_limit changes
+    async def _tenant(self, tenant_id):
+        rpm = None
+        if self.tenant_rate_limit is not None and tenant_id is not None:
+            rpm = self._rate_limits.get(tenant_id)
+            if rpm is MISSING:
+                try:
+                    rpm = await self._lookups.do(tenant_id, lambda: self.tenant_rate_limit(tenant_id))
+                except httpx.HTTPError as e:
+                    # Keep the last known limit rather than failing the call
+                    print(f"Rate limit lookup failed for tenant {tenant_id} ({type(e).__name__}): {e}")
+                    limits = self._tenants.get(tenant_id)
+                    rpm = None if limits is None else limits.rpm
+                self._rate_limits.set(tenant_id, rpm)
+        limits = self._tenants.get(tenant_id)
+        if limits is None:
+            limits = self._tenants[tenant_id] = _Limits(self.tenant_concurrency, rpm)
+        elif limits.rpm != rpm:
+            limits.rpm = rpm
+            limits.requests = per_minute(rpm, LLM_BURST_SECONDS)
+        return limits
+
+    def provider_for(self, model):
+        provider = self.providers.get(MODEL_PROVIDERS.get(model))
+        if provider is None:
+            raise LookupError(f"No provider configured for model {model!r}")
+        return provider
+
+    # Hold a place in `model`'s and `tenant_id`'s limits for the duration of the block:
+    # rate buckets first, so no concurrency slot is held while waiting for tokens. The
+    # block sets usage["tokens"] so unused reserved tokens are given back. Batched prompts
+    # pass the rate buckets without taking concurrency slots; the batch takes one model
+    # slot when it is dispatched (see _run_batch).
+    @asynccontextmanager
+    async def _admitted(self, model, prompt, tenant_id, max_tokens, hold_slots=True):
+        tenant, limits = await self._tenant(tenant_id), self._model(model)
+        reserved = estimate_tokens(prompt) + max_tokens
+        usage = {"tokens": reserved}
+        queued = True
+        tenant.queued += 1
+        limits.queued += 1
+        try:
+            for bucket, amount in ((tenant.requests, 1), (limits.requests, 1), (limits.tokens, reserved)):
+                if bucket is not None:
+                    await bucket.acquire(amount)
+            async with AsyncExitStack() as slots:
+                for semaphore in (tenant.concurrency, limits.concurrency):
+                    if semaphore is not None and hold_slots:
+                        await slots.enter_async_context(semaphore)
+                queued = False
+                tenant.queued -= 1
+                limits.queued -= 1
+                tenant.inflight += 1
+                limits.inflight += 1
+                try:
+                    yield usage
+                except BaseException:
+                    tenant.failed += 1
+                    limits.failed += 1
+                    raise
+                finally:
+                    tenant.inflight -= 1
+                    limits.inflight -= 1
+        finally:
+            if queued:
+                tenant.queued -= 1
+                limits.queued -= 1
+        tenant.completed += 1
+        limits.completed += 1
+        if limits.tokens is not None and usage["tokens"] < reserved:
+            limits.tokens.refund(reserved - usage["tokens"])
+
+    def _timing(self, model):
+        timings = self._timings.get(model)
+        if timings is None:
+            timings = self._timings[model] = _Timings()
+        return timings
+
+    # Complete `prompt` with `model` on behalf of `tenant_id`. Returns a dict with the
+    # response text and token usage.
+    async def complete(self, model: str, prompt: str, tenant_id: Optional[str] = None, max_tokens: int = DEFAULT_MAX_TOKENS, **params):
+        provider = self.provider_for(model)
+        params = dict(params, max_tokens=max_tokens)
+        batched = self.batcher is not None and getattr(provider, "supports_batching", False)
+        async with self._admitted(model, prompt, tenant_id, max_tokens, hold_slots=not batched) as usage:
+            started = time.perf_counter()
+            if batched:
+                result = await self.batcher.submit((model, json.dumps(params, sort_keys=True)), prompt)
+            else:
+                result = await provider.complete(MODEL_IDS.get(model, model), prompt, params)
+            latency = time.perf_counter() - started
+            usage["tokens"] = result["prompt_tokens"] + result["completion_tokens"]
+        self._timing(model).latency.append(latency)
+        if self.on_usage is not None:
+            self.on_usage(model, tenant_id, usage["tokens"])
+        return dict(result, model=model, latency=latency)
+
+    # One model concurrency slot per dispatched batch, so batches can fill beyond the
+    # per-model and per-tenant caps
+    async def _run_batch(self, key, prompts):
+        model, params = key
+        semaphore = self._model(model).concurrency
+        async with semaphore if semaphore is not None else nullcontext():
+            return await self.provider_for(model).complete_batch(MODEL_IDS.get(model, model), prompts, json.loads(params))
+
+    # Same limits as complete(), but yields the response text as it is generated
+    async def stream(self, model: str, prompt: str, tenant_id: Optional[str] = None, max_tokens: int = DEFAULT_MAX_TOKENS, **params):
+        provider = self.provider_for(model)
+        timings = self._timing(model)
+        async with self._admitted(model, prompt, tenant_id, max_tokens) as usage:
+            started = time.perf_counter()
+            chunks = []
+            async for chunk in provider.stream(MODEL_IDS.get(model, model), prompt, dict(params, max_tokens=max_tokens)):
+                if not chunks:
+                    timings.ttft.append(time.perf_counter() - started)
+                chunks.append(chunk)
+                yield chunk
+            timings.latency.append(time.perf_counter() - started)
+            usage["tokens"] = estimate_tokens(prompt) + estimate_tokens("".join(chunks))
+        if self.on_usage is not None:
+            self.on_usage(model, tenant_id, usage["tokens"])
+
+    def balancers(self):
+        return {name: provider.balancer for name, provider in self.providers.items() if isinstance(provider, BalancedProvider)}
+
+    # Switch every load-balanced provider to `strategy` at runtime
+    def set_load_balancing(self, strategy):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy {strategy!r}")
+        for balancer in self.balancers().values():
+            balancer.set_strategy(strategy)
+
+    # Every tenant's counters, or only `tenant_id`'s
+    def stats(self, tenant_id=None):
+        tenants = self._tenants if tenant_id is None else {tenant_id: self._tenants[tenant_id]} if tenant_id in self._tenants else {}
+        return {
+            "models": {model: limits.stats() for model, limits in self._models.items()},
+            "tenants": {tenant: limits.stats() for tenant, limits in tenants.items()},
+            "timings": {model: timings.stats() for model, timings in self._timings.items()},
+            "batching": None if self.batcher is None else self.batcher.stats(),
+            "load_balancing": {name: balancer.stats() for name, balancer in self.balancers().items()},
+        }
+
+    async def aclose(self):
+        for provider in set(self.providers.values()):
+            await provider.aclose()
+
+
+# Shared gateway; the lifespan points its tenant rate limits at Supabase
+llm_gateway = LLMGateway()
+
+# Exact-match response cache for deterministic requests (tune with LLM_CACHE_* env vars)
+llm_cache = llm_cache_from_env()
+# Optional near-duplicate cache (LLM_SIMILARITY_CACHE_ENABLED), consulted after an exact miss
+similar_prompts = similarity_cache_from_env()
+# Identical deterministic requests in flight at the same time share one provider call
+llm_completions = SingleFlight()
+
+
+# Cached text for a deterministic request: an exact match, else a near-duplicate prompt
+# of the same tenant, agent, model and parameters
+async def _cached_text(key, scope, prompt, agent_id):
+    cached = await llm_cache.get(key, agent_id)
+    if cached is not MISSING:
+        return cached["text"]
+    if similar_prompts is not None:
+        match = similar_prompts.lookup(scope, prompt)
+        if match is not MISSING:
+            return match[0]
+    return MISSING
+
+
+async def _remember(key, scope, prompt, response):
+    await llm_cache.set(key, {field: response[field] for field in ("text", "model", "prompt_tokens", "completion_tokens")})
+    if similar_prompts is not None:
+        similar_prompts.add(scope, prompt, response["text"])
+
+
+# Response text for `prompt`. Deterministic requests (temperature 0) are answered from the
+# caches when possible; `agent_id` also attributes cache hits and misses.
+async def get_llm_response(prompt, model="GPT-3.5", tenant_id=None, agent_id=None, **params):
+    params.setdefault("max_tokens", DEFAULT_MAX_TOKENS)
+    if not llm_cache.enabled or not is_deterministic(params):
+        llm_cache.bypass(agent_id)
+        response = await llm_gateway.complete(model, prompt, tenant_id=tenant_id, **params)
+        return response["text"]
+    key = cache_key(model, prompt, params)
+    scope = (tenant_id, agent_id, cache_key(model, "", params))
+    cached = await _cached_text(key, scope, prompt, agent_id)
+    if cached is not MISSING:
+        return cached
+
+    async def complete():
+        response = await llm_gateway.complete(model, prompt, tenant_id=tenant_id, **params)
+        await _remember(key, scope, prompt, response)
+        return response
+
+    return (await llm_completions.do(key, complete))["text"]
+
+
+# Like get_llm_response(), but yields the text in chunks as the provider generates it.
+# A cached response comes as a single chunk; a streamed deterministic response is cached
+# once it is complete.
+async def stream_llm_response(prompt, model="GPT-3.5", tenant_id=None, agent_id=None, **params):
+    params.setdefault("max_tokens", DEFAULT_MAX_TOKENS)
+    cacheable = llm_cache.enabled and is_deterministic(params)
+    if cacheable:
+        key = cache_key(model, prompt, params)
+        scope = (tenant_id, agent_id, cache_key(model, "", params))
+        cached = await _cached_text(key, scope, prompt, agent_id)
+        if cached is not MISSING:
+            yield cached
+            return
+    else:
+        llm_cache.bypass(agent_id)
+    chunks = []
+    async for chunk in llm_gateway.stream(model, prompt, tenant_id=tenant_id, **params):
+        chunks.append(chunk)
+        yield chunk
+    if cacheable:
+        text = "".join(chunks)
+        await _remember(key, scope, prompt, {
+            "text": text, "model": model, "prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text),
+        })
@@ -0,0 +1,186 @@
+# Client-side load balancing of LLM calls across replicas of the same provider.
+#
+# Strategies:
+#   round_robin        each healthy endpoint in turn
+#   least_outstanding  the endpoint with the fewest requests in flight
+#   ewma               lowest EWMA latency x (outstanding + 1), scanning every endpoint
+#   p2c                power of two choices: the less loaded of two random endpoints
+#
+# Endpoints that fail `eject_after` times in a row, whose recent error rate is above
+# `max_error_rate`, or whose EWMA latency is more than `outlier_factor` times the median,
+# are ejected for `ejection_time` seconds (longer on each repeat ejection). At most
+# `max_ejected_fraction` of the endpoints are out at once.
+
+import random
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+STRATEGIES = ("round_robin", "least_outstanding", "ewma", "p2c")
+
+
+class Endpoint:
+    def __init__(self, name, provider):
+        self.name = name
+        self.provider = provider
+        self.outstanding = 0
+        self.ewma = None  # seconds; None until the first response
+        self.requests = 0
+        self.samples = 0  # calls finished since the last ejection
+        self.error_rate = 0.0  # EWMA of failures (1) and successes (0)
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = float("-inf")
+
+    def stats(self, now):
+        return {
+            "outstanding": self.outstanding,
+            "ewma_ms": None if self.ewma is None else self.ewma * 1000,
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": self.error_rate,
+            "ejections": self.ejections,
+            "ejected": self.ejected_until > now,
+        }
+
+
+# Failures that say something about the endpoint rather than about the request
+def is_endpoint_failure(error: Exception):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+
+class LoadBalancer:
+    def __init__(self, providers: dict, strategy="p2c", ewma_alpha=0.3, eject_after=5, max_error_rate=0.2,
+                 error_alpha=0.05, ejection_time=30.0, outlier_factor=4.0, min_samples=20, max_ejected_fraction=0.5,
+                 clock=time.monotonic, seed=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy {strategy!r}")
+        self.endpoints = [Endpoint(name, provider) for name, provider in providers.items()]
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.eject_after = eject_after
+        self.max_error_rate = max_error_rate
+        self.error_alpha = error_alpha
+        self.ejection_time = ejection_time
+        self.outlier_factor = outlier_factor
+        self.min_samples = min_samples
+        self.max_ejected_fraction = max_ejected_fraction
+        self.clock = clock
+        self.random = random.Random(seed)
+        self._next = 0
+
+    def set_strategy(self, strategy):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy {strategy!r}")
+        self.strategy = strategy
+
+    def pick(self):
+        now = self.clock()
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now] or self.endpoints
+        if self.strategy == "round_robin" or len(healthy) == 1:
+            self._next += 1
+            return healthy[self._next % len(healthy)]
+        if self.strategy == "least_outstanding":
+            # Start the scan at a rotating offset so ties are spread out
+            self._next += 1
+            start = self._next % len(healthy)
+            return min(healthy[start:] + healthy[:start], key=lambda endpoint: endpoint.outstanding)
+        if self.strategy == "ewma":
+            # Endpoints without a sample yet are assumed average, so they get probed
+            # without every request piling onto them
+            known = [endpoint.ewma for endpoint in healthy if endpoint.ewma is not None]
+            prior = statistics.fmean(known) if known else 0.0
+            return min(healthy, key=lambda endpoint: (
+                (prior if endpoint.ewma is None else endpoint.ewma) * (endpoint.outstanding + 1), endpoint.outstanding
+            ))
+        first, second = self.random.sample(healthy, 2)
+        return min((first, second), key=lambda endpoint: (endpoint.outstanding, endpoint.ewma or 0.0))
+
+    # Pick an endpoint and account for the call made on it inside the block
+    @asynccontextmanager
+    async def endpoint(self):
+        endpoint = self.pick()
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        started = self.clock()
+        try:
+            yield endpoint
+        except Exception as e:
+            if is_endpoint_failure(e):
+                self._failed(endpoint)
+            raise
+        else:
+            self._succeeded(endpoint, self.clock() - started)
+        finally:
+            endpoint.outstanding -= 1
+
+    def _succeeded(self, endpoint, latency):
+        endpoint.consecutive_failures = 0
+        endpoint.samples += 1
+        endpoint.error_rate -= self.error_alpha * endpoint.error_rate
+        if endpoint.ewma is None:
+            endpoint.ewma = latency
+        else:
+            endpoint.ewma += self.ewma_alpha * (latency - endpoint.ewma)
+        if self.outlier_factor and endpoint.samples >= self.min_samples and len(self.endpoints) >= 3:
+            peers = [other.ewma for other in self.endpoints if other.ewma is not None]
+            if len(peers) >= 3 and endpoint.ewma > self.outlier_factor * statistics.median(peers):
+                self._eject(endpoint)
+
+    def _failed(self, endpoint):
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        endpoint.samples += 1
+        endpoint.error_rate += self.error_alpha * (1 - endpoint.error_rate)
+        if endpoint.consecutive_failures >= self.eject_after or (
+            self.max_error_rate and endpoint.samples >= self.min_samples and endpoint.error_rate > self.max_error_rate
+        ):
+            self._eject(endpoint)
+
+    def _eject(self, endpoint):
+        now = self.clock()
+        if endpoint.ejected_until > now:
+            return
+        ejected = sum(other.ejected_until > now for other in self.endpoints)
+        if ejected + 1 > self.max_ejected_fraction * len(self.endpoints):
+            return
+        endpoint.ejections += 1
+        endpoint.ejected_until = now + self.ejection_time * min(endpoint.ejections, 10)
+        endpoint.consecutive_failures = 0
+        # Come back with a clean latency record rather than the one that got it ejected
+        endpoint.ewma = None
+        endpoint.error_rate = 0.0
+        endpoint.samples = 0
+
+    def stats(self):
+        now = self.clock()
+        return {"strategy": self.strategy, "endpoints": {endpoint.name: endpoint.stats(now) for endpoint in self.endpoints}}
+
+
+# Provider interface over a LoadBalancer, so the gateway can treat replicas as one provider
+class BalancedProvider:
+    def __init__(self, balancer: LoadBalancer):
+        self.balancer = balancer
+        self.supports_batching = all(getattr(endpoint.provider, "supports_batching", False) for endpoint in balancer.endpoints)
+
+    async def complete(self, model: str, prompt: str, params: dict):
+        async with self.balancer.endpoint() as endpoint:
+            return await endpoint.provider.complete(model, prompt, params)
+
+    async def complete_batch(self, model: str, prompts: list, params: dict):
+        async with self.balancer.endpoint() as endpoint:
+            return await endpoint.provider.complete_batch(model, prompts, params)
+
+    async def stream(self, model: str, prompt: str, params: dict):
+        async with self.balancer.endpoint() as endpoint:
+            async for chunk in endpoint.provider.stream(model, prompt, params):
+                yield chunk
+
+    async def aclose(self):
+        for endpoint in self.balancer.endpoints:
+            await endpoint.provider.aclose()
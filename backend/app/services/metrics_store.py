@@ -0,0 +1,314 @@
+# In-process time-series store for agent metrics.
+#
+# Each (tenant, metric) series keeps its latest `raw_capacity` samples in a ring buffer and
+# rolls every sample up into 1m, 1h and 1d buckets (sum, min, max, count) as it is
+# recorded. Every resolution is a fixed-size ring indexed by bucket number, so a series
+# takes the same memory however long it runs: a slot whose stored bucket number is not
+# the one being written is reset, which drops the bucket that fell out of retention.
+#
+# Range queries read the coarsest resolution that still gives `points` buckets over the
+# range and reaches back to its start, so a year-long chart reads ~365 daily buckets
+# instead of every sample.
+#
+# Daily rollups of changed days are upserted into agent_metrics in one batched request
+# every `flush_interval` seconds; rows already there are merged in on startup.
+
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from backend.app.services.agent_registry import agent_registry
+from backend.app.services.llm_service import LLM_PRICES
+from backend.app.utils.downsample import lttb
+
+# metric -> how buckets are reduced to one value
+METRICS = {
+    "tasks_completed": "sum",
+    "avg_rating": "mean",
+    "active_agents": "max",
+    "total_agents": "max",
+    "llm_calls": "sum",
+    "llm_tokens": "sum",
+    "llm_cost": "sum",
+}
+# (seconds per bucket, buckets kept)
+RESOLUTIONS = ((60, 1440), (3600, 720), (86400, 730))
+RAW_CAPACITY = int(os.getenv("METRICS_RAW_CAPACITY", "1024"))
+DEFAULT_POINTS = 60
+DAY = 86400
+# agent_metrics column for each persisted metric
+COLUMNS = {
+    "total_agents": "total_agents",
+    "active_agents": "active_agents",
+    "tasks_completed": "tasks_completed",
+    "avg_rating": "avg_rating",
+    "llm_calls": "llm_calls",
+    "llm_cost": "llm_cost",
+}
+FLOAT_COLUMNS = ("avg_rating", "llm_cost")
+
+
+def reduce(aggregate, sums, counts, maxima):
+    if aggregate == "sum":
+        return sums
+    if aggregate == "max":
+        return maxima
+    return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+
+class Rollup:
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.ids = np.full(capacity, -1, dtype=np.int64)  # bucket number held by each slot
+        self.sums = np.zeros(capacity)
+        self.mins = np.zeros(capacity)
+        self.maxs = np.zeros(capacity)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.step)
+        slot = bucket % self.capacity
+        if self.ids[slot] != bucket:
+            if self.ids[slot] > bucket:
+                return False  # older than the retention
+            self.ids[slot] = bucket
+            self.sums[slot] = self.counts[slot] = 0
+            self.mins[slot] = math.inf
+            self.maxs[slot] = -math.inf
+        self.sums[slot] += value
+        self.counts[slot] += 1
+        self.mins[slot] = min(self.mins[slot], value)
+        self.maxs[slot] = max(self.maxs[slot], value)
+        return True
+
+    def read(self, start, end):
+        buckets = np.arange(int(start // self.step), math.ceil(end / self.step))
+        slots = buckets % self.capacity
+        held = self.ids[slots] == buckets
+        slots = slots[held]
+        return buckets[held] * self.step, self.sums[slots], self.mins[slots], self.maxs[slots], self.counts[slots]
+
+    def bucket(self, timestamp):
+        slot = int(timestamp // self.step) % self.capacity
+        if self.ids[slot] != int(timestamp // self.step):
+            return None
+        return self.sums[slot], self.mins[slot], self.maxs[slot], int(self.counts[slot])
+
+
+class Series:
+    def __init__(self, raw_capacity=RAW_CAPACITY, resolutions=RESOLUTIONS):
+        self.times = np.full(raw_capacity, np.nan)
+        self.values = np.zeros(raw_capacity)
+        self.head = 0  # next raw slot to write
+        self.rollups = [Rollup(step, capacity) for step, capacity in resolutions]
+        self.version = 0  # bumped on every change, for caches of derived data
+
+    def add(self, timestamp, value):
+        self.version += 1
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % len(self.times)
+        for rollup in self.rollups:
+            rollup.add(timestamp, value)
+
+    # Timestamp of the oldest raw sample still held; -inf until the ring has wrapped
+    def raw_since(self):
+        oldest = self.times[self.head]
+        return -math.inf if np.isnan(oldest) else oldest
+
+    def read_raw(self, start, end):
+        order = np.roll(np.arange(len(self.times)), -self.head)
+        times, values = self.times[order], self.values[order]
+        held = (times >= start) & (times < end)
+        times, values = times[held], values[held]
+        return times, values, values, values, np.ones(len(values), dtype=np.int64)
+
+
+class MetricsStore:
+    def __init__(self, raw_capacity=RAW_CAPACITY, resolutions=RESOLUTIONS, clock=time.time):
+        self.raw_capacity = raw_capacity
+        self.resolutions = resolutions
+        self.clock = clock
+        self._series = {}  # (tenant_id, metric) -> Series
+        self._dirty = set()  # (tenant_id, day number) with rollups not yet persisted
+        self.last_flush = None
+        # async rows -> None, upserting daily rows into agent_metrics; None to keep metrics in memory
+        self.writer = None
+        self._task = None
+
+    def series(self, tenant_id, metric):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}")
+        series = self._series.get((tenant_id, metric))
+        if series is None:
+            series = self._series[(tenant_id, metric)] = Series(self.raw_capacity, self.resolutions)
+        return series
+
+    def record(self, tenant_id, metric, value, timestamp=None):
+        timestamp = self.clock() if timestamp is None else timestamp
+        self.series(tenant_id, metric).add(timestamp, value)
+        if metric in COLUMNS and tenant_id is not None:
+            self._dirty.add((tenant_id, int(timestamp // DAY)))
+
+    # Step in seconds of the resolution a query over [start, end) reads; 0 for raw samples
+    def resolution(self, tenant_id, metrics, start, end, points=DEFAULT_POINTS):
+        now = self.clock()
+        span = max(end - start, 1)
+        # The bucket holding `start` may have just aged out; it mostly lies before the range
+        covering = [step for step, capacity in self.resolutions if int(start // step) >= int(now // step) - capacity]
+        enough = [step for step in covering if span / step >= points]
+        if enough:
+            return enough[-1]
+        raw = [self._series.get((tenant_id, metric)) for metric in metrics]
+        if all(series is None or series.raw_since() <= start for series in raw):
+            return 0
+        return covering[0] if covering else self.resolutions[-1][0]
+
+    # Buckets of each metric over [start, end) at the resolution chosen by resolution(),
+    # thinned to `max_points` with LTTB when there are more. `version` changes whenever
+    # any of the series does.
+    def query(self, tenant_id, metrics, start, end, points=DEFAULT_POINTS, max_points=None):
+        step = self.resolution(tenant_id, metrics, start, end, points)
+        result = {"resolution": step, "version": 0, "series": {}}
+        for metric in metrics:
+            if metric not in METRICS:
+                raise ValueError(f"Unknown metric {metric!r}")
+            series = self._series.get((tenant_id, metric))
+            if series is None:
+                result["series"][metric] = []
+                continue
+            result["version"] += series.version
+            if step:
+                rollup = next(rollup for rollup in series.rollups if rollup.step == step)
+                times, sums, mins, maxs, counts = rollup.read(start, end)
+            else:
+                times, sums, mins, maxs, counts = series.read_raw(start, end)
+            values = reduce(METRICS[metric], sums, counts, maxs)
+            if max_points is not None and len(times) > max_points:
+                keep = lttb(times, values, max_points)
+                times, values, mins, maxs, counts = times[keep], values[keep], mins[keep], maxs[keep], counts[keep]
+            result["series"][metric] = [
+                {"t": float(t), "value": float(v), "min": float(lo), "max": float(hi), "count": int(n)}
+                for t, v, lo, hi, n in zip(times, values, mins, maxs, counts)
+            ]
+        return result
+
+    # agent_metrics rows for the days changed since the last flush
+    def _daily_rows(self, days):
+        rows = []
+        for tenant_id, day in days:
+            row = {"tenant_id": tenant_id, "date": datetime.fromtimestamp(day * DAY, timezone.utc).date().isoformat()}
+            for metric, column in COLUMNS.items():
+                series = self._series.get((tenant_id, metric))
+                bucket = None if series is None else series.rollups[-1].bucket(day * DAY)
+                value = 0.0
+                if bucket is not None:
+                    sums, _, maxs, counts = bucket
+                    value = float(reduce(METRICS[metric], np.array([sums]), np.array([counts]), np.array([maxs]))[0])
+                row[column] = value if column in FLOAT_COLUMNS else round(value)
+            rows.append(row)
+        return rows
+
+    # Upsert the daily rollups changed since the last flush in one request; on failure
+    # they stay dirty and go out with the next flush
+    async def flush(self):
+        if self.writer is None or not self._dirty:
+            return 0
+        days, self._dirty = self._dirty, set()
+        rows = self._daily_rows(sorted(days))
+        try:
+            await self.writer(rows)
+        except httpx.HTTPError as e:
+            self._dirty |= days
+            print(f"Metrics not persisted ({type(e).__name__}): {e}")
+            return 0
+        self.last_flush = self.clock()
+        return len(rows)
+
+    # Merge persisted agent_metrics rows into the daily rollups, e.g. on startup. A row
+    # counts as one sample, so a restored avg_rating is weighted like one rating.
+    def load(self, rows):
+        for row in rows:
+            day = datetime.fromisoformat(row["date"]).replace(tzinfo=timezone.utc).timestamp()
+            for metric, column in COLUMNS.items():
+                if row.get(column) is not None:
+                    series = self.series(row["tenant_id"], metric)
+                    series.rollups[-1].add(day, row[column])
+                    series.version += 1
+
+    # Sample the agent counts of every tenant in the registry
+    def sample_agents(self, registry=agent_registry):
+        now = self.clock()
+        for tenant_id in registry.distinct("tenant_id"):
+            self.record(tenant_id, "total_agents", registry.count(tenant_id=tenant_id), now)
+            self.record(tenant_id, "active_agents", registry.count(tenant_id=tenant_id, status="Active"), now)
+
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if agent_registry.loaded:
+                    self.sample_agents()
+                await self.flush()
+            except Exception as e:
+                print(f"Metrics step failed ({type(e).__name__}): {e}")
+
+    def start(self, interval):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    # Stop sampling and push what is still dirty
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self):
+        return {"series": len(self._series), "unflushed_days": len(self._dirty), "last_flush": self.last_flush}
+
+
+# Batched upsert into agent_metrics, one row per tenant and date
+def supabase_metrics_writer(client: httpx.AsyncClient, headers: dict):
+    async def write(rows):
+        response = await client.post(
+            "/rest/v1/agent_metrics?on_conflict=tenant_id,date",
+            json=rows,
+            headers=dict(headers, Prefer="resolution=merge-duplicates"),
+        )
+        response.raise_for_status()
+    return write
+
+
+# agent_metrics rows from `since` (a date) on, for MetricsStore.load()
+async def fetch_agent_metrics(client: httpx.AsyncClient, headers: dict, since, timeout=None):
+    columns = ",".join(["tenant_id", "date", *COLUMNS.values()])
+    response = await client.get(f"/rest/v1/agent_metrics?date=gte.{since.isoformat()}&select={columns}", headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+# Shared store fed by the task dispatcher, the LLM gateway and the rating endpoint; the
+# lifespan hooks record_task() and record_llm_call() up
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "60"))
+metrics_store = MetricsStore()
+
+
+def record_task(record):
+    if record.status == "completed" and record.tenant_id is not None:
+        metrics_store.record(record.tenant_id, "tasks_completed", 1)
+
+
+def record_llm_call(model, tenant_id, tokens):
+    if tenant_id is None:
+        return
+    metrics_store.record(tenant_id, "llm_calls", 1)
+    metrics_store.record(tenant_id, "llm_tokens", tokens)
+    metrics_store.record(tenant_id, "llm_cost", tokens / 1000 * LLM_PRICES.get(model, 0.0))
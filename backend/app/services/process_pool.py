@@ -0,0 +1,208 @@
+# Process-pool tier for CPU-bound agent work, so parsing/scoring/aggregation never runs
+# on the event loop or in Gradio's thread pool
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Agent types whose work goes to the CPU tier; every other type uses the general tier
+CPU_AGENT_TYPES = ("Analytical",)
+# Arrays at least this large come back through shared memory instead of being pickled
+SHARED_MEMORY_MIN_BYTES = int(os.getenv("PROCESS_POOL_SHARED_MEMORY_MIN_BYTES", str(64 * 1024)))
+
+
+# Zero-copy handle to an array produced in a worker. `array` is a view of the shared
+# segment; call close() (or use `with`) once done with it, or copy() to keep the data.
+class SharedArray:
+    def __init__(self, name, shape, dtype):
+        self._shm = shared_memory.SharedMemory(name=name)
+        # The mapping stays valid after unlink, and nothing leaks if close() is never called
+        self._shm.unlink()
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+
+    def __enter__(self):
+        return self.array
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def copy(self):
+        return self.array.copy()
+
+    # Views taken from `array` must not outlive close()
+    def close(self):
+        if self._shm is not None:
+            self.array = None
+            self._shm.close()
+            self._shm = None
+
+    def __del__(self):
+        self.close()
+
+
+# What a worker sends back in place of a large array
+class _SharedArrayRef:
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+def _export(value):
+    if isinstance(value, np.ndarray) and value.nbytes >= SHARED_MEMORY_MIN_BYTES:
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+        # The parent unlinks the segment; stop this worker's tracker from doing it too
+        resource_tracker.unregister(shm._name, "shared_memory")
+        ref = _SharedArrayRef(shm.name, value.shape, value.dtype.str)
+        shm.close()
+        return ref
+    if isinstance(value, tuple):
+        return tuple(_export(v) for v in value)
+    if isinstance(value, list):
+        return [_export(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _export(v) for k, v in value.items()}
+    return value
+
+
+def _import(value):
+    if isinstance(value, _SharedArrayRef):
+        return SharedArray(value.name, value.shape, value.dtype)
+    if isinstance(value, tuple):
+        return tuple(_import(v) for v in value)
+    if isinstance(value, list):
+        return [_import(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _import(v) for k, v in value.items()}
+    return value
+
+
+# Runs in the worker process; the start time lets the parent measure queueing
+def _call(fn, args, kwargs):
+    started = time.time()
+    return started, _export(fn(*args, **kwargs))
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class AgentProcessPool:
+    def __init__(self, cpu_workers=None, general_workers=1, max_tasks_per_child=None, wait_window=60.0):
+        self.sizes = {"cpu": cpu_workers or os.cpu_count() or 1, "general": general_workers}
+        self.max_tasks_per_child = max_tasks_per_child
+        self.wait_window = wait_window
+        self._executors = {}
+        self._retired = set()  # shutdowns of executors replaced by resize()
+        self._inflight = {tier: 0 for tier in self.sizes}
+        self._waits = {tier: deque(maxlen=4096) for tier in self.sizes}  # (started, seconds queued)
+        self.submitted = 0
+        self.cancelled = 0
+
+    def tier(self, agent_type):
+        return "cpu" if agent_type in CPU_AGENT_TYPES else "general"
+
+    # Start every worker up front so the first request does not pay for process start-up
+    async def start(self):
+        for tier, size in self.sizes.items():
+            self._executors[tier] = await self._new_executor(size)
+
+    async def _new_executor(self, size):
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(max_workers=size, max_tasks_per_child=self.max_tasks_per_child)
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(size)))
+        return executor
+
+    async def stop(self):
+        executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+        await asyncio.gather(*self._retired)
+
+    # Change the number of processes in `tier`. ProcessPoolExecutor cannot be resized, so a
+    # warmed-up executor of the new size takes over new work; the old one finishes what was
+    # already submitted to it and shuts down in the background.
+    async def resize(self, tier, size):
+        if size == self.sizes[tier]:
+            return
+        self.sizes[tier] = size
+        old = self._executors.get(tier)
+        if old is None:
+            return  # not started; start() uses the new size
+        self._executors[tier] = await self._new_executor(size)
+        retiring = asyncio.ensure_future(asyncio.to_thread(old.shutdown, wait=True))
+        self._retired.add(retiring)
+        retiring.add_done_callback(self._retired.discard)
+
+    # Autoscaler inputs for `tier`, in the units TaskDispatcher.load() uses
+    def load(self, tier):
+        size = self.sizes[tier]
+        inflight = self._inflight[tier]
+        oldest = time.time() - self.wait_window
+        waits = sorted(wait for started, wait in self._waits[tier] if started >= oldest)
+        return {
+            "workers": size,
+            "queue_depth": max(0, inflight - size) / size,
+            "utilization": 100.0 * min(inflight, size) / size,
+            "p95_wait": 1000 * waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+    # Run `fn(*args, **kwargs)` in the tier for `agent_type`. `fn` and its arguments must be
+    # picklable (module-level functions). Large numpy arrays in the result arrive as
+    # SharedArray handles. Cancelling the caller drops the task if it has not started;
+    # a task already running finishes in its worker and its result is discarded.
+    async def run(self, agent_type, fn, *args, **kwargs):
+        tier = self.tier(agent_type)
+        executor = self._executors.get(tier)
+        if executor is None:
+            raise RuntimeError("Process pool is not started")
+        self.submitted += 1
+        self._inflight[tier] += 1
+        submitted = time.time()
+        future = executor.submit(_call, fn, args, kwargs)
+        try:
+            started, result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            if not future.cancel():
+                future.add_done_callback(_discard)
+            raise
+        finally:
+            self._inflight[tier] -= 1
+        self._waits[tier].append((started, max(0.0, started - submitted)))
+        return _import(result)
+
+    def stats(self):
+        return {"workers": dict(self.sizes), "inflight": dict(self._inflight), "submitted": self.submitted, "cancelled": self.cancelled}
+
+
+# Free the shared segments of a result nobody is waiting for any more
+def _discard(future):
+    if not future.cancelled() and future.exception() is None:
+        _close_all(_import(future.result()[1]))
+
+
+def _close_all(value):
+    if isinstance(value, SharedArray):
+        value.close()
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _close_all(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _close_all(v)
+
+
+# Shared pool, started and stopped in the app lifespan
+process_pool = AgentProcessPool(
+    cpu_workers=int(os.getenv("PROCESS_POOL_CPU_WORKERS", "0")) or None,
+    general_workers=int(os.getenv("PROCESS_POOL_GENERAL_WORKERS", "1")),
+)
@@ -0,0 +1,272 @@
+# Per-agent resource quotas for work run in the process pool.
+#
+# In the worker, each task runs under soft rlimits: RLIMIT_CPU for its CPU-time allowance,
+# RLIMIT_AS for its memory allowance on top of the worker's baseline address space, and
+# RLIMIT_FSIZE for the largest file it may write. Going over raises QuotaExceeded in the
+# task instead of killing the worker, and the limits are lifted again afterwards. A task
+# stuck inside C code notices the CPU limit once it returns to Python.
+#
+# In the parent, agents share each tier's processes in proportion to their CPU share with
+# weighted fair queuing: a task is tagged with the agent's virtual finish time (its CPU-
+# seconds per share, counting an estimate for tasks not yet finished) and the lowest tag
+# gets the next free process.
+# CPU-seconds and peak RSS are accounted per agent and per tenant, and a tenant that has
+# used resource_management.max_compute_usage vCPU-hours gets no more work.
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import resource
+import signal
+import time
+from collections import defaultdict, deque
+
+import httpx
+
+from backend.app.services.process_pool import AgentProcessPool, process_pool
+from backend.app.utils.cache import MISSING, TTLCache
+
+DEFAULT_CPU_SHARE = int(os.getenv("AGENT_DEFAULT_CPU_SHARE", "10"))
+DEFAULT_TASK_CPU_SECONDS = float(os.getenv("AGENT_TASK_CPU_SECONDS", "0"))  # 0 for no limit
+DEFAULT_MEMORY_BYTES = int(os.getenv("AGENT_MEMORY_BYTES", "0"))
+COMPUTE_USAGE_WINDOW = float(os.getenv("COMPUTE_USAGE_WINDOW", "300"))
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def _on_sigxcpu(signum, frame):
+    raise QuotaExceeded("CPU time quota exceeded")
+
+
+def _cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _address_space():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[0]) * resource.getpagesize()
+
+
+# Peak RSS since _reset_peak_rss(); Linux resets VmHWM on writing 5 to clear_refs
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Only soft limits change, so they can be raised again after the task
+def _set_soft_limit(limit, value):
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = hard if value == resource.RLIM_INFINITY else min(value, hard)
+    resource.setrlimit(limit, (value, hard))
+
+
+# Runs in the worker process. Returns (result, usage, error) so usage is reported for
+# failed tasks too.
+def run_limited(limits, fn, args, kwargs):
+    handlers = signal.signal(signal.SIGXCPU, _on_sigxcpu), signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    _reset_peak_rss()
+    started = _cpu_time()
+    result = error = None
+    try:
+        if limits.get("cpu_seconds"):
+            _set_soft_limit(resource.RLIMIT_CPU, math.ceil(started + limits["cpu_seconds"]))
+        if limits.get("memory_bytes"):
+            _set_soft_limit(resource.RLIMIT_AS, _address_space() + limits["memory_bytes"])
+        if limits.get("file_bytes"):
+            _set_soft_limit(resource.RLIMIT_FSIZE, limits["file_bytes"])
+        try:
+            result = fn(*args, **kwargs)
+        except MemoryError:
+            error = QuotaExceeded("Memory quota exceeded")
+        except Exception as e:
+            error = e
+    finally:
+        for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS, resource.RLIMIT_FSIZE):
+            _set_soft_limit(limit, resource.RLIM_INFINITY)
+        signal.signal(signal.SIGXCPU, handlers[0])
+        signal.signal(signal.SIGXFSZ, handlers[1])
+    return result, {"cpu_seconds": _cpu_time() - started, "peak_rss": _peak_rss()}, error
+
+
+class AgentQuota:
+    __slots__ = ("cpu_share", "cpu_seconds", "memory_bytes")
+
+    def __init__(self, cpu_share=DEFAULT_CPU_SHARE, cpu_seconds=DEFAULT_TASK_CPU_SECONDS, memory_bytes=DEFAULT_MEMORY_BYTES):
+        self.cpu_share = cpu_share
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+
+    def to_dict(self):
+        return {"cpu_share": self.cpu_share, "cpu_seconds": self.cpu_seconds, "memory_bytes": self.memory_bytes}
+
+
+class AgentUsage:
+    __slots__ = ("cpu_seconds", "peak_rss", "tasks", "quota_exceeded", "vtime")
+
+    def __init__(self):
+        self.cpu_seconds = 0.0
+        self.peak_rss = 0
+        self.tasks = 0
+        self.quota_exceeded = 0
+        self.vtime = 0.0  # virtual finish time of the agent's latest task, for fair queuing
+
+    def to_dict(self):
+        return {"cpu_seconds": self.cpu_seconds, "peak_rss": self.peak_rss, "tasks": self.tasks, "quota_exceeded": self.quota_exceeded}
+
+
+class ResourceGovernor:
+    def __init__(self, pool: AgentProcessPool, usage_window=COMPUTE_USAGE_WINDOW, clock=time.monotonic):
+        self.pool = pool
+        self.usage_window = usage_window
+        self.clock = clock
+        # async tenant_id -> (max vCPU-hours, max storage GB), or None for no limits
+        self.tenant_limits = None
+        self._tenant_limits = TTLCache(maxsize=10000, ttl=60)
+        self._quotas = {}
+        self._usage = defaultdict(AgentUsage)
+        self._tenant_cpu = defaultdict(float)
+        self._running = defaultdict(int)  # tier -> tasks holding a process
+        self._waiting = defaultdict(list)  # tier -> heap of (tag, seq, future)
+        self._vclock = defaultdict(float)  # tier -> tag of the task dispatched last
+        self._seq = itertools.count()
+        self._recent = deque(maxlen=100_000)  # (finished, cpu_seconds) for compute usage %
+
+    def quota(self, agent_id):
+        return self._quotas.get(agent_id) or AgentQuota()
+
+    def set_quota(self, agent_id, cpu_share=None, cpu_seconds=None, memory_bytes=None):
+        quota = self._quotas.setdefault(agent_id, AgentQuota())
+        if cpu_share is not None:
+            quota.cpu_share = max(1, cpu_share)
+        if cpu_seconds is not None:
+            quota.cpu_seconds = cpu_seconds
+        if memory_bytes is not None:
+            quota.memory_bytes = memory_bytes
+        return quota
+
+    async def _limits_for(self, tenant_id):
+        if self.tenant_limits is None or tenant_id is None:
+            return None
+        limits = self._tenant_limits.get(tenant_id)
+        if limits is MISSING:
+            try:
+                limits = await self.tenant_limits(tenant_id)
+            except httpx.HTTPError as e:
+                print(f"Resource limit lookup failed for tenant {tenant_id} ({type(e).__name__}): {e}")
+                return None
+            self._tenant_limits.set(tenant_id, limits)
+        return limits
+
+    # Wait for a process in `tier`; the lowest tag goes first
+    async def _acquire(self, tier, tag):
+        if self._running[tier] < self.pool.sizes[tier] and not self._waiting[tier]:
+            self._running[tier] += 1
+            self._vclock[tier] = tag
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting[tier], (tag, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(tier)  # handed a slot just as we were cancelled
+            raise
+
+    def _release(self, tier):
+        waiting = self._waiting[tier]
+        while waiting:
+            tag, _, future = heapq.heappop(waiting)
+            if not future.done():
+                self._vclock[tier] = tag
+                future.set_result(None)
+                return
+        self._running[tier] -= 1
+
+    # Run `fn(*args, **kwargs)` for `agent_id` in the process pool under the agent's quota.
+    # Raises QuotaExceeded when the task goes over its limits or the tenant is out of compute.
+    async def run(self, agent_id, agent_type, tenant_id, fn, *args, **kwargs):
+        limits = await self._limits_for(tenant_id)
+        max_compute, max_storage = limits or (None, None)
+        if max_compute and self._tenant_cpu[tenant_id] >= max_compute * 3600:
+            raise QuotaExceeded(f"Tenant {tenant_id} has used its {max_compute} vCPU-hours")
+        quota, usage = self.quota(agent_id), self._usage[agent_id]
+        tier = self.pool.tier(agent_type)
+        # Charge an estimate up front (corrected once the task reports its CPU time). An idle
+        # agent does not bank credit: it starts from the virtual clock, not from its old tag.
+        estimate = usage.cpu_seconds / usage.tasks if usage.tasks else 1.0
+        usage.vtime = max(usage.vtime, self._vclock[tier]) + estimate / quota.cpu_share
+        await self._acquire(tier, usage.vtime)
+        try:
+            result, used, error = await self.pool.run(agent_type, run_limited, {
+                "cpu_seconds": quota.cpu_seconds,
+                "memory_bytes": quota.memory_bytes,
+                "file_bytes": int(max_storage * 1024 ** 3) if max_storage else 0,
+            }, fn, args, kwargs)
+        finally:
+            self._release(tier)
+        usage.tasks += 1
+        usage.cpu_seconds += used["cpu_seconds"]
+        usage.peak_rss = max(usage.peak_rss, used["peak_rss"])
+        usage.vtime += (used["cpu_seconds"] - estimate) / quota.cpu_share
+        self._tenant_cpu[tenant_id] += used["cpu_seconds"]
+        self._recent.append((self.clock(), used["cpu_seconds"]))
+        if error is not None:
+            if isinstance(error, QuotaExceeded):
+                usage.quota_exceeded += 1
+            raise error
+        return result
+
+    def usage(self, agent_id):
+        usage = self._usage.get(agent_id) or AgentUsage()
+        return dict(usage.to_dict(), quota=self.quota(agent_id).to_dict())
+
+    # CPU used over the last `usage_window` seconds as a percentage of the pool's processes
+    def compute_usage(self):
+        oldest = self.clock() - self.usage_window
+        while self._recent and self._recent[0][0] < oldest:
+            self._recent.popleft()
+        capacity = self.usage_window * sum(self.pool.sizes.values())
+        return 100.0 * sum(cpu for _, cpu in self._recent) / capacity
+
+    def stats(self, tenant_id=None):
+        stats = {"compute_usage": self.compute_usage(), "running": dict(self._running)}
+        if tenant_id is not None:
+            stats["tenant_cpu_hours"] = self._tenant_cpu.get(tenant_id, 0.0) / 3600
+        return stats
+
+
+# Tenant limits from resource_management: (max_compute_usage vCPU-hours, max_storage_usage GB)
+def supabase_resource_limits(client: httpx.AsyncClient, headers: dict):
+    async def lookup(tenant_id):
+        response = await client.get(
+            f"/rest/v1/resource_management?tenant_id=eq.{tenant_id}&select=max_compute_usage,max_storage_usage&order=created_at.desc&limit=1",
+            headers=headers,
+        )
+        response.raise_for_status()
+        rows = response.json()
+        return (rows[0]["max_compute_usage"], rows[0]["max_storage_usage"]) if rows else None
+    return lookup
+
+
+# Shared governor over the shared process pool; the lifespan points its tenant limits at Supabase
+resource_governor = ResourceGovernor(process_pool)
@@ -0,0 +1,143 @@
+# Near-duplicate prompt cache: MinHash signatures over character shingles, indexed with
+# LSH banding, so "How do I reset my password?" can reuse the answer cached for
+# "how can I reset my password". Fingerprints are computed locally; no embedding service.
+
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+from backend.app.utils.cache import MISSING
+
+# Mersenne prime for the (a * x + b) mod p hash family; keeps a * x within 64 bits
+_PRIME = (1 << 31) - 1
+_WORDS = re.compile(r"\w+")
+
+
+def shingles(text: str, size=5):
+    normalized = " ".join(_WORDS.findall(text.lower()))
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, shingle_size=5, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str):
+        # crc32 rather than hash(), which is randomized per process and made matches vary between runs
+        values = np.fromiter((zlib.crc32(s.encode()) & 0x7FFFFFFF for s in shingles(text, self.shingle_size)), dtype=np.uint64)
+        return ((self.a * values + self.b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+# Bounded near-duplicate index. Entries live in a ring of `max_entries` slots (the oldest
+# is overwritten when full) and are only visible to lookups in the same scope, e.g.
+# (tenant_id, agent_id, model/params).
+class SimilarityCache:
+    def __init__(self, threshold=0.7, max_entries=1_000_000, num_perm=64, bands=16, ttl=None,
+                 shingle_size=5, clock=time.monotonic):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ttl = ttl
+        self.clock = clock
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._values = []
+        self._scopes = []
+        self._created = []
+        self._buckets = [{} for _ in range(bands)]  # band -> (scope, band bytes) -> [slot]
+        self._next = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def _band_keys(self, scope, signature):
+        return [(scope, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _reserve(self, slot):
+        if slot < len(self._signatures):
+            return
+        capacity = min(self.max_entries, max(1024, len(self._signatures) * 2))
+        grown = np.zeros((capacity, self._signatures.shape[1]), dtype=np.uint32)
+        grown[:len(self._signatures)] = self._signatures
+        self._signatures = grown
+
+    def add(self, scope, text: str, value):
+        signature = self.hasher.signature(text)
+        slot = self._next
+        self._next = (self._next + 1) % self.max_entries
+        if slot < len(self._values):
+            # Overwriting the oldest entry: take it out of its buckets first
+            for band, key in enumerate(self._band_keys(self._scopes[slot], self._signatures[slot])):
+                members = self._buckets[band][key]
+                members.remove(slot)
+                if not members:
+                    del self._buckets[band][key]
+            self._values[slot] = value
+            self._scopes[slot] = scope
+            self._created[slot] = self.clock()
+        else:
+            self._reserve(slot)
+            self._values.append(value)
+            self._scopes.append(scope)
+            self._created.append(self.clock())
+        self._signatures[slot] = signature
+        for band, key in enumerate(self._band_keys(scope, signature)):
+            self._buckets[band].setdefault(key, []).append(slot)
+
+    # Best cached (value, similarity) in `scope` at or above the threshold, else MISSING
+    def lookup(self, scope, text: str):
+        signature = self.hasher.signature(text)
+        candidates = set()
+        for band, key in enumerate(self._band_keys(scope, signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        if self.ttl is not None:
+            oldest = self.clock() - self.ttl
+            candidates = [slot for slot in candidates if self._created[slot] >= oldest]
+        if not candidates:
+            self.misses += 1
+            return MISSING
+        slots = np.fromiter(candidates, dtype=np.int64)
+        similarity = (self._signatures[slots] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return self._values[slots[best]], float(similarity[best])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Disabled unless LLM_SIMILARITY_CACHE_ENABLED is set; tune with LLM_SIMILARITY_CACHE_* env vars
+def similarity_cache_from_env():
+    if os.getenv("LLM_SIMILARITY_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    ttl = float(os.getenv("LLM_SIMILARITY_CACHE_TTL", "0"))
+    return SimilarityCache(
+        threshold=float(os.getenv("LLM_SIMILARITY_CACHE_THRESHOLD", "0.7")),
+        max_entries=int(os.getenv("LLM_SIMILARITY_CACHE_MAX_ENTRIES", "1000000")),
+        num_perm=int(os.getenv("LLM_SIMILARITY_CACHE_NUM_PERM", "64")),
+        bands=int(os.getenv("LLM_SIMILARITY_CACHE_BANDS", "16")),
+        ttl=ttl or None,
+    )
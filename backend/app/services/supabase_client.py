@@ -0,0 +1,70 @@
+# Shared, pooled HTTP client for the Supabase REST/auth API
+
+import importlib.util
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Supabase connection pool configuration
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "100"))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+SUPABASE_POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_REST_TIMEOUT = float(os.getenv("SUPABASE_REST_TIMEOUT", "10"))
+# Sign-up/sign-in hash passwords upstream, so they get a longer budget than table reads
+SUPABASE_AUTH_TIMEOUT = float(os.getenv("SUPABASE_AUTH_TIMEOUT", "20"))
+
+# Per-call timeouts, passed as `timeout=` on individual requests
+AUTH_TIMEOUT = httpx.Timeout(SUPABASE_AUTH_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT)
+REST_TIMEOUT = httpx.Timeout(SUPABASE_REST_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT)
+
+
+# HTTP/2 needs `h2` (installed by httpx[http2]); fall back to HTTP/1.1 keep-alive without it
+def http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_supabase_client(
+    base_url: Optional[str] = None,
+    max_connections: int = SUPABASE_POOL_MAX_CONNECTIONS,
+    max_keepalive_connections: int = SUPABASE_POOL_MAX_KEEPALIVE,
+    keepalive_expiry: float = SUPABASE_POOL_KEEPALIVE_EXPIRY,
+    http2: bool = SUPABASE_HTTP2,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        base_url=SUPABASE_URL if base_url is None else base_url,
+        limits=limits,
+        http2=http2 and http2_available(),
+        timeout=REST_TIMEOUT,
+        transport=transport,
+    )
+
+
+# FastAPI lifespan: open the pool on startup and drain it on shutdown
+@asynccontextmanager
+async def supabase_lifespan(app: FastAPI):
+    app.state.supabase_client = create_supabase_client()
+    try:
+        yield
+    finally:
+        await app.state.supabase_client.aclose()
+
+
+# Dependency to get the shared Supabase client
+def get_supabase_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.supabase_client
@@ -5,9 +5,17 @@ from pydantic import BaseModel
 from typing import Optional
 import os
 from datetime import datetime, timedelta
+from backend.app.utils.jwt_cache import claims_cache_from_env
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Verified token claims, keyed by a hash of the token
+token_claims_cache = claims_cache_from_env()
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -59,7 +67,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_claims_cache.decode(token, SECRET_KEY, [ALGORITHM], jwt.decode)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -0,0 +1,86 @@
+# Micro-batching: concurrent callers with the same key are collected for up to `max_wait`
+# seconds (or until `max_batch` arrive) and served by one call to `run_batch`
+
+import asyncio
+
+
+class _Batch:
+    __slots__ = ("items", "futures", "timer")
+
+    def __init__(self):
+        self.items = []
+        self.futures = []
+        self.timer = None
+
+
+class MicroBatcher:
+    # `run_batch(key, items)` returns one result per item, in order
+    def __init__(self, run_batch, max_batch=32, max_wait=0.005):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = {}  # key -> _Batch still collecting
+        self._running = set()  # batch tasks, kept referenced until done
+        self.requests = 0
+        self.batched = 0  # requests handed to run_batch
+        self.batches = 0
+        self.full_batches = 0  # flushed by size rather than by the timer
+
+    async def submit(self, key, item):
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch()
+            batch.timer = loop.call_later(self.max_wait, self._flush, key)
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        self.requests += 1
+        if len(batch.items) >= self.max_batch:
+            self.full_batches += 1
+            self._flush(key)
+        # A cancelled caller only drops its own future; the batch still runs for the others
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        self.batches += 1
+        self.batched += len(batch.items)
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key, batch):
+        try:
+            results = await self.run_batch(key, batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(f"Batch of {len(batch.items)} returned {len(results)} results")
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    # Send whatever is collecting now, e.g. before shutdown
+    def flush_all(self):
+        for key in list(self._pending):
+            self._flush(key)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "full_batches": self.full_batches,
+            "collecting": sum(len(batch.items) for batch in self._pending.values()),
+            "mean_batch_size": self.batched / self.batches if self.batches else 0.0,
+        }
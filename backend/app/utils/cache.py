@@ -0,0 +1,90 @@
+# Bounded in-process cache with TTL expiry, LRU eviction and negative entries
+
+import os
+import time
+from collections import OrderedDict
+
+# Returned by TTLCache.get when nothing usable is cached
+MISSING = object()
+# Stored by TTLCache.set_not_found to remember that the upstream had no record
+NOT_FOUND = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0, negative_ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.timer = timer
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self.timer()
+
+    def get(self, key, default=MISSING):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self.timer():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (self.timer() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set_not_found(self, key):
+        self.set(key, NOT_FOUND, ttl=self.negative_ttl)
+
+    def invalidate(self, key):
+        return self._entries.pop(key, None) is not None
+
+    # Drop every tuple key that starts with `prefix`, e.g. ("list", tenant_id)
+    def invalidate_prefix(self, prefix):
+        stale = [key for key in self._entries if key[:len(prefix)] == prefix]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Build a cache whose size and TTLs can be tuned from the environment
+def cache_from_env(prefix, maxsize, ttl, negative_ttl=None):
+    return TTLCache(
+        maxsize=int(os.getenv(f"{prefix}_MAXSIZE", maxsize)),
+        ttl=float(os.getenv(f"{prefix}_TTL", ttl)),
+        negative_ttl=float(os.getenv(f"{prefix}_NEGATIVE_TTL", ttl if negative_ttl is None else negative_ttl)),
+    )
@@ -0,0 +1,33 @@
+# Largest-Triangle-Three-Buckets (Steinarsson, 2013): picks `threshold` points of a line
+# that keep its visual shape. The first and last points are always kept; the points in
+# between are split into threshold - 2 buckets, and each bucket keeps the point forming
+# the largest triangle with the point kept before it and the mean of the next bucket.
+
+import numpy as np
+
+
+# Indices of the points to keep, in order; every index when there are no more than `threshold`
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if threshold >= size:
+        return np.arange(size)
+    if threshold < 3:
+        return np.array([0, size - 1][:threshold], dtype=np.int64)
+    inner_x, inner_y = x[1:-1], y[1:-1]
+    edges = np.linspace(0, size - 2, threshold - 1).astype(np.int64)  # bucket b is inner[edges[b]:edges[b + 1]]
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    next_x = np.append(np.add.reduceat(inner_x, starts)[1:] / sizes[1:], x[-1])
+    next_y = np.append(np.add.reduceat(inner_y, starts)[1:] / sizes[1:], y[-1])
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        lo, hi = starts[bucket], edges[bucket + 1]
+        ax, ay = x[kept], y[kept]
+        area = np.abs((ax - next_x[bucket]) * (inner_y[lo:hi] - ay) - (ax - inner_x[lo:hi]) * (next_y[bucket] - ay))
+        kept = lo + 1 + int(area.argmax())
+        keep[bucket + 1] = kept
+    return keep
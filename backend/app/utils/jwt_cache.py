@@ -0,0 +1,62 @@
+# Cache of verified JWT claims, so repeat requests with the same token skip jwt.decode
+
+import hashlib
+import os
+import time
+
+from backend.app.utils.cache import MISSING, TTLCache
+
+
+def _digest(value: str):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class ClaimsCache:
+    def __init__(self, maxsize=4096, max_ttl=300.0, enabled=True, clock=time.time):
+        self.cache = TTLCache(maxsize=maxsize, ttl=max_ttl)
+        self.max_ttl = max_ttl
+        self.enabled = enabled
+        self.clock = clock
+        self.secret_fingerprint = None
+
+    # Entries were verified with one key; a different key invalidates all of them
+    def _check_secret(self, secret: str):
+        fingerprint = _digest(secret)
+        if fingerprint != self.secret_fingerprint:
+            self.cache.clear()
+            self.secret_fingerprint = fingerprint
+
+    # Return the cached claims for `token`, or verify it with `decode` and cache the result.
+    # Verification errors from `decode` propagate and are never cached.
+    def decode(self, token: str, secret: str, algorithms: list, decode):
+        if not self.enabled:
+            return decode(token, secret, algorithms=algorithms)
+        self._check_secret(secret)
+        key = _digest(token)
+        claims = self.cache.get(key)
+        if claims is not MISSING:
+            # Wall-clock check as well, so an entry never outlives the token's exp
+            if claims.get("exp") is None or claims["exp"] > self.clock():
+                return claims
+            self.cache.invalidate(key)
+        claims = decode(token, secret, algorithms=algorithms)
+        ttl = self.max_ttl
+        if claims.get("exp") is not None:
+            ttl = min(ttl, claims["exp"] - self.clock())
+        if ttl > 0:
+            self.cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def claims_cache_from_env():
+    return ClaimsCache(
+        maxsize=int(os.getenv("JWT_CACHE_MAXSIZE", "4096")),
+        max_ttl=float(os.getenv("JWT_CACHE_MAX_TTL", "300")),
+        enabled=os.getenv("JWT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+    )
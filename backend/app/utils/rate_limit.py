@@ -0,0 +1,55 @@
+# Token-bucket rate limiting for asyncio callers that should queue instead of fail
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    # `rate` tokens are added per second, up to `capacity` (the largest burst)
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+        self.waits = 0  # acquisitions that had to wait for tokens
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount=1):
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    # Wait until `amount` tokens are available and take them. Waiters are served in
+    # arrival order; a request larger than the bucket waits for a full bucket.
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            if self.tokens < amount:
+                self.waits += 1
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    # Give back tokens that were reserved but not used
+    def refund(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+# Bucket for a per-minute limit that allows bursts of `burst_seconds` worth of tokens;
+# None for a limit of 0 (unlimited)
+def per_minute(limit, burst_seconds=10.0):
+    if not limit:
+        return None
+    rate = limit / 60
+    return TokenBucket(rate, capacity=max(1.0, rate * burst_seconds))
@@ -0,0 +1,51 @@
+# Single-flight coalescing: concurrent callers with the same key share one in-flight call
+
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+        self._waiters = {}  # key -> number of callers awaiting the task
+        self.calls = 0  # callers that asked for a result
+        self.executions = 0  # upstream calls actually made
+
+    async def do(self, key, fn):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        self._waiters[key] += 1
+        try:
+            # shield() so one cancelled caller does not cancel the call for everyone else
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                # The last interested caller went away; stop the upstream call and
+                # let the next caller start a fresh one
+                if self._waiters[key] == 0:
+                    del self._inflight[key]
+                    del self._waiters[key]
+                    task.cancel()
+            raise
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiter has already received it
+            task.exception()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "inflight": len(self._inflight),
+            "collapse_ratio": 1 - self.executions / self.calls if self.calls else 0.0,
+        }
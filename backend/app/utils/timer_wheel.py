@@ -0,0 +1,89 @@
+# Hierarchical timer wheel (Varghese & Lauck): `levels` wheels of `size` slots, each slot
+# of level n spanning size**n ticks. Scheduling and cancelling are O(1); advancing one tick
+# expires one level-0 slot and, every size**n ticks, re-files one level-n slot into the
+# levels below. Deadlines beyond size**levels ticks wait in an overflow list that is
+# re-filed once per turn of the top wheel.
+
+
+class Timer:
+    __slots__ = ("deadline", "item", "cancelled")
+
+    def __init__(self, deadline, item):
+        self.deadline = deadline  # tick
+        self.item = item
+        self.cancelled = False
+
+    # Cancelled timers stay in their slot and are dropped when it is expired or re-filed
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, size=64, levels=4, now=0):
+        self.size = size
+        self.levels = levels
+        self.now = now  # current tick
+        self._spans = [size ** level for level in range(levels + 1)]
+        self._slots = [[[] for _ in range(size)] for _ in range(levels)]
+        self._overflow = []
+        self._due = []  # scheduled at or before the current tick
+        self.pending = 0  # timers scheduled and not yet expired, cancelled ones included
+
+    def schedule(self, deadline, item):
+        timer = Timer(deadline, item)
+        self._file(timer)
+        self.pending += 1
+        return timer
+
+    def _file(self, timer):
+        delta = timer.deadline - self.now
+        if delta <= 0:
+            self._due.append(timer)
+            return
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                self._slots[level][(timer.deadline // self._spans[level]) % self.size].append(timer)
+                return
+        self._overflow.append(timer)
+
+    # Move to tick `now` and return the items of the timers that expired on the way
+    def advance(self, now):
+        expired = []
+        self._collect(self._due, expired)
+        self._due = []
+        if not self.pending:
+            self.now = max(self.now, now)
+        while self.now < now:
+            self.now += 1
+            tick = self.now
+            if tick % self._spans[self.levels] == 0 and self._overflow:
+                overflow, self._overflow = self._overflow, []
+                self._refile(overflow)
+            # Higher levels first: a re-filed timer may land in a lower slot due this tick
+            for level in range(self.levels - 1, 0, -1):
+                if tick % self._spans[level] == 0:
+                    slots = self._slots[level]
+                    index = (tick // self._spans[level]) % self.size
+                    if slots[index]:
+                        timers, slots[index] = slots[index], []
+                        self._refile(timers)
+            slots = self._slots[0]
+            index = tick % self.size
+            if slots[index]:
+                timers, slots[index] = slots[index], []
+                self._collect(timers, expired)
+            if self._due:
+                self._collect(self._due, expired)
+                self._due = []
+        return expired
+
+    def _refile(self, timers):
+        for timer in timers:
+            if timer.cancelled:
+                self.pending -= 1
+            else:
+                self._file(timer)
+
+    def _collect(self, timers, expired):
+        self.pending -= len(timers)
+        expired.extend(timer.item for timer in timers if not timer.cancelled)
@@ -0,0 +1,67 @@
+# Benchmark: memory of 1M agents as __dict__ objects, __slots__ Agents and an AgentTable
+#
+#   python -m backend.benchmarks.bench_agent_model --agents 1000000
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from backend.app.models.agent_model import Agent, AgentTable
+
+TYPES = ["Conversational", "Analytical", "Generative", "Retrieval-based"]
+STATUSES = ["Active", "Idle", "Inactive", "Failed"]
+LLMS = ["GPT-3.5", "GPT-4", "Claude", "PaLM", "Llama", "Falcon"]
+
+
+# The previous Agent model: a plain class with a per-instance __dict__
+class DictAgent:
+    def __init__(self, name, agent_type, **fields):
+        self.name = name
+        self.agent_type = agent_type
+        for field, value in fields.items():
+            setattr(self, field, value)
+
+
+def records(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": i, "tenant_id": "00000000-0000-0000-0000-000000000001", "name": f"Agent {i}",
+            "type": rng.choice(TYPES), "status": rng.choice(STATUSES), "llm_base": rng.choice(LLMS),
+            "performance": rng.uniform(1, 5), "learning_rate": 0.01, "temperature": 0.7, "max_tokens": 512,
+        }
+
+
+def measure(label, build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<26}{current / 2**20:>10.1f} MiB{elapsed:>10.1f} s")
+    return result
+
+
+def main(args):
+    print(f"{args.agents} agents")
+
+    def dict_agents():
+        return [DictAgent(r.pop("name"), r.pop("type"), **r) for r in records(args.agents)]
+
+    measure("__dict__ Agent objects", dict_agents)
+    measure("__slots__ Agent objects", lambda: [Agent.from_record(r) for r in records(args.agents)])
+    table = measure("AgentTable (columnar)", lambda: AgentTable.from_records(records(args.agents)))
+
+    started = time.perf_counter()
+    mask = table.mask(agent_type="Analytical", status="Active", performance=(4.0, None))
+    by_llm = table.aggregate("performance", by="llm_base", mask=mask)
+    print(f"vectorized filter + group-by over {len(table)} rows: {(time.perf_counter() - started) * 1000:.1f} ms")
+    print({llm: round(summary["mean"], 3) for llm, summary in by_llm.items()})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent model memory benchmark")
+    parser.add_argument("--agents", type=int, default=1_000_000)
+    main(parser.parse_args())
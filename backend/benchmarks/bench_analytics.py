@@ -0,0 +1,116 @@
+# Benchmark: ingest throughput and query latency of the task analytics engine
+#
+#   python -m backend.benchmarks.bench_analytics --events 10000000
+#
+# Compares the incrementally maintained aggregates with recomputing them per request,
+# either with a pandas groupby over every event or with the pure-Python dict loop the
+# charts would otherwise need (the latter on a subset and extrapolated).
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from backend.app.services.analytics import DAY, TaskAnalytics
+
+TEAMS = np.array(["Sales", "Support", "HR", "Finance", "Marketing", "Engineering", "Legal", "Operations"], dtype=object)
+
+
+def synthetic_events(rng, size, agents, days):
+    return {
+        "timestamp": 1_700_000_000 + rng.uniform(0, days * DAY, size),
+        "agent_id": rng.integers(0, agents, size),
+        "team": TEAMS[rng.integers(0, len(TEAMS), size)],
+        "duration": np.where(rng.random(size) < 0.8, rng.exponential(30, size), np.nan),
+        "success": rng.random(size) < 0.9,
+        "rating": np.where(rng.random(size) < 0.3, rng.uniform(1, 5, size), np.nan),
+    }
+
+
+def time_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def groupby_summary(frame):
+    frame = frame.assign(is_task=frame["duration"].notna(), day=frame["timestamp"] // DAY)
+    frame["completed"] = frame["is_task"] & frame["success"]
+    aggregations = dict(tasks=("is_task", "sum"), tasks_completed=("completed", "sum"),
+                        avg_duration=("duration", "mean"), avg_rating=("rating", "mean"))
+    by_team = frame.groupby("team", observed=True).agg(**aggregations)
+    by_day = frame.groupby("day").agg(**aggregations)
+    by_day[["tasks_completed", "avg_rating"]].corr()
+    np.histogram(frame["rating"].dropna(), 10)
+    return by_team, by_day
+
+
+def python_summary(events):
+    teams = defaultdict(lambda: [0, 0, 0.0, 0.0, 0])
+    days = defaultdict(lambda: [0, 0, 0.0, 0.0, 0])
+    for timestamp, team, duration, success, rating in events:
+        for group in (teams[team], days[int(timestamp // DAY)]):
+            if duration == duration:
+                group[0] += 1
+                group[1] += success
+                group[2] += duration
+            if rating == rating:
+                group[3] += rating
+                group[4] += 1
+    return teams, days
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    analytics = TaskAnalytics(keep_events=True)
+    ingest = 0.0
+    for offset in range(0, args.events, args.batch):
+        batch = synthetic_events(rng, min(args.batch, args.events - offset), args.agents, args.days)
+        started = time.perf_counter()
+        analytics.append(**batch)
+        ingest += time.perf_counter() - started
+    print(f"ingested {analytics.events:,} events in {ingest:.1f} s ({analytics.events / ingest / 1e6:.1f} M events/s, batches of {args.batch:,})")
+
+    single = TaskAnalytics()
+    sample = synthetic_events(rng, 100_000, args.agents, args.days)
+    started = time.perf_counter()
+    for row in zip(*sample.values()):
+        single.add(*row)
+    single.flush()
+    print(f"buffered single-event add: {100_000 / (time.perf_counter() - started) / 1e3:.0f} k events/s")
+
+    print(f"{'query':<28}{'engine ms':>12}")
+    for label, query in (
+        ("by_team", analytics.by_team),
+        ("by_day", analytics.by_day),
+        ("by_agent", analytics.by_agent),
+        ("correlation (day)", lambda: analytics.correlation("day")),
+        ("correlation (agent)", lambda: analytics.correlation("agent")),
+        ("distributions", analytics.distributions),
+    ):
+        print(f"{label:<28}{time_ms(query, args.repeat):>12.3f}")
+
+    frame = analytics.frame()
+    print(f"raw events frame: {frame.memory_usage(deep=False).sum() / 2**20:.0f} MiB")
+    recompute = time_ms(lambda: groupby_summary(frame), 1)
+    print(f"pandas groupby recompute of team/day/correlation/histogram: {recompute:.0f} ms per request")
+    subset = min(args.python_events, len(frame))
+    rows = list(zip(frame["timestamp"][:subset], frame["team"][:subset], frame["duration"][:subset],
+                    frame["success"][:subset], frame["rating"][:subset]))
+    python = time_ms(lambda: python_summary(rows), 1)
+    print(f"pure-Python aggregation: {python:.0f} ms for {subset:,} events, ~{python * len(frame) / subset / 1000:.0f} s for {len(frame):,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task analytics ingest and query benchmark")
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--agents", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--python-events", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
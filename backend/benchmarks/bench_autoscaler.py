@@ -0,0 +1,67 @@
+# Simulation: the autoscaler driving the task dispatcher under synthetic load
+#
+#   python -m backend.benchmarks.bench_autoscaler --trigger p95_wait --up 200 --down 20
+#
+# Load comes in phases of --phase seconds: quiet, ramp, peak, ramp down, quiet. Each task
+# sleeps --task-ms, so a worker serves 1000 / task-ms tasks per second. Time is compressed
+# (--interval between control steps, short cooldowns); a line is printed per step.
+
+import argparse
+import asyncio
+import random
+import time
+
+from backend.app.services.agent_service import TaskDispatcher
+from backend.app.services.autoscaler import Autoscaler, ScalingPolicy
+
+
+async def main(args):
+    rng = random.Random(0)
+    dispatcher = TaskDispatcher(workers=args.min, max_queued=10**6, per_agent_limit=10**6, per_tenant_limit=10**6)
+    await dispatcher.start()
+    policy = ScalingPolicy(
+        args.trigger, args.up, args.down, min_workers=args.min, max_workers=args.max,
+        sustain=args.sustain, up_cooldown=args.interval * 2, down_cooldown=args.interval * 6,
+    )
+    autoscaler = Autoscaler("tasks", dispatcher.load, dispatcher.resize, policy, interval=args.interval)
+    autoscaler.start()
+
+    async def work():
+        await asyncio.sleep(args.task_ms / 1000)
+
+    async def control_log():
+        started = time.perf_counter()
+        while True:
+            await asyncio.sleep(args.interval)
+            reading = dispatcher.load()
+            print(f"{time.perf_counter() - started:6.1f}s  workers {reading['workers']:>3}  queued {dispatcher.queued:>6}  "
+                  f"util {reading['utilization']:5.1f}%  p95 wait {reading['p95_wait']:8.1f} ms")
+
+    log = asyncio.create_task(control_log())
+    rates = [args.rate * f for f in (0.05, 0.5, 1.0, 0.5, 0.05)]
+    for rate in rates:
+        phase_end = time.perf_counter() + args.phase
+        while time.perf_counter() < phase_end:
+            await dispatcher.submit(rng.randrange(1000), f"tenant-{rng.randrange(10)}", work)
+            await asyncio.sleep(rng.expovariate(rate))
+    log.cancel()
+    await autoscaler.stop()
+    await dispatcher.stop()
+    ups = sum(d["direction"] == "up" for d in autoscaler.decisions)
+    print(f"{len(autoscaler.decisions)} decisions ({ups} up, {len(autoscaler.decisions) - ups} down), "
+          f"{dispatcher.completed} tasks completed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autoscaler simulation with synthetic task load")
+    parser.add_argument("--trigger", default="queue_depth", choices=["queue_depth", "utilization", "p95_wait"])
+    parser.add_argument("--up", type=float, default=2.0)
+    parser.add_argument("--down", type=float, default=0.1)
+    parser.add_argument("--min", type=int, default=1)
+    parser.add_argument("--max", type=int, default=64)
+    parser.add_argument("--sustain", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--rate", type=float, default=2000, help="peak task arrivals per second")
+    parser.add_argument("--task-ms", type=float, default=20)
+    parser.add_argument("--phase", type=float, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,60 @@
+# Benchmark: payload size and render time of the Analytics & Reporting charts
+#
+#   python -m backend.benchmarks.bench_charts --points 100000
+#
+# Compares building and serializing a time series chart from every point (what the tab
+# shipped before) with downsampling it to CHART_POINTS with LTTB first, and with serving
+# the cached figure JSON. Also times the eager construction of the tab's six figures that
+# used to run whenever the Blocks were built.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from backend.app.utils.downsample import lttb
+from frontend.components.charts import CHART_POINTS, FigureCache, sample_metric_charts, sample_team_charts
+
+
+# Result of fn() and its best time over `repeat` runs, in ms
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    t = 1_700_000_000 + 60 * np.arange(args.points, dtype=np.float64)
+    value = 100 + np.cumsum(rng.normal(0, 1, args.points)) + 20 * np.sin(np.arange(args.points) / 1440 * 2 * np.pi)
+
+    def figure(keep):
+        frame = pd.DataFrame({"Date": pd.to_datetime(t[keep], unit="s"), "value": value[keep]})
+        return px.line(frame, x="Date", y="value", title="Tasks Completed Over Time").to_json()
+
+    figure(slice(0, 10))  # the first figure pays for Plotly's template and validator setup
+    full, full_ms = timed(lambda: figure(slice(None)))
+    keep, lttb_ms = timed(lambda: lttb(t, value, args.max_points))
+    thin, thin_ms = timed(lambda: figure(keep))
+    cache = FigureCache()
+    cache.get("tasks", lambda: px.line(x=t[keep], y=value[keep]))
+    _, hit_ms = timed(lambda: cache.get("tasks", lambda: None))
+    print(f"{'one chart, ' + format(args.points, ',') + ' points':<36}{'payload KiB':>12}{'render ms':>11}")
+    print(f"{'before: every point':<36}{len(full) / 1024:>12.0f}{full_ms:>11.1f}")
+    print(f"{'LTTB to ' + str(args.max_points) + ' points':<36}{len(thin) / 1024:>12.0f}{lttb_ms + thin_ms:>11.1f}  (LTTB {lttb_ms:.1f} ms)")
+    print(f"{'cached figure JSON':<36}{len(thin) / 1024:>12.0f}{hit_ms:>11.3f}")
+
+    _, eager_ms = timed(lambda: (sample_metric_charts(FigureCache()), sample_team_charts(FigureCache())))
+    print(f"six tab figures built with the Blocks before: {eager_ms:.0f} ms per build; now built on first open")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analytics chart payload and render time benchmark")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--max-points", type=int, default=CHART_POINTS)
+    main(parser.parse_args())
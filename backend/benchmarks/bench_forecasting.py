@@ -0,0 +1,87 @@
+# Benchmark: Holt-Winters fitting of every tenant's metric series
+#
+#   python -m backend.benchmarks.bench_forecasting --tenants 1000
+#
+# Compares the batched grid search over all series with fitting one series at a time,
+# and times a cached forecast request and the daily carry-forward of every model.
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.app.services.forecasting import Forecaster
+from backend.app.services.metrics_store import DAY, MetricsStore
+
+METRICS = ("total_agents", "active_agents", "tasks_completed", "avg_rating")
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def fill(store, tenants, days, first_day, seed=0):
+    rng = np.random.default_rng(seed)
+    day = np.arange(days)
+    season = np.sin(2 * np.pi * (first_day + day) / 7)
+    for tenant in range(tenants):
+        base = rng.uniform(10, 1000)
+        values = {
+            "total_agents": base + rng.uniform(0, 0.2) * day,
+            "active_agents": 0.7 * base + 0.1 * base * season,
+            "tasks_completed": 20 * base * (1 + 0.3 * season) + rng.normal(0, base, days),
+            "avg_rating": np.clip(4 + 0.3 * season + rng.normal(0, 0.1, days), 0, 5),
+        }
+        for metric, series in values.items():
+            rollup = store.series(f"tenant-{tenant}", metric).rollups[-1]
+            for offset, value in enumerate(series):
+                rollup.add((first_day + offset) * DAY, value)
+
+
+def main(args):
+    first_day = 19000
+    clock = Clock((first_day + args.days) * DAY + 60)
+    store = MetricsStore(raw_capacity=4, clock=clock)
+    started = time.perf_counter()
+    fill(store, args.tenants, args.days, first_day)
+    series = args.tenants * len(METRICS)
+    print(f"filled {series:,} series of {args.days} days in {time.perf_counter() - started:.1f} s")
+
+    forecaster = Forecaster(store)
+    started = time.perf_counter()
+    forecaster.refresh()
+    batched = time.perf_counter() - started
+    print(f"batched grid search ({len(forecaster.grid)} candidates): {batched:.2f} s for {series:,} series, {batched / series * 1000:.2f} ms per series")
+
+    one_at_a_time = Forecaster(store)
+    keys = list(store._series)[:args.single_series]
+    started = time.perf_counter()
+    for key in keys:
+        one_at_a_time.refresh([key])
+    single = (time.perf_counter() - started) / len(keys)
+    print(f"one series at a time: {single * 1000:.2f} ms per series, ~{single * series:.1f} s for all")
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        forecaster.forecast("tenant-0", "tasks_completed", 30)
+    print(f"cached forecast request: {(time.perf_counter() - started) * 1000:.1f} us")
+
+    for tenant in range(args.tenants):
+        for metric in METRICS:
+            store.record(f"tenant-{tenant}", metric, 1.0, clock.now)
+    clock.now += DAY
+    started = time.perf_counter()
+    forecaster.refresh()
+    print(f"next day, carry forward of every model: {time.perf_counter() - started:.2f} s ({forecaster.stats()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched Holt-Winters forecasting benchmark")
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--single-series", type=int, default=100)
+    main(parser.parse_args())
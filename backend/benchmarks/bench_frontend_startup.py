@@ -0,0 +1,116 @@
+# Benchmark: cold start of the Gradio dashboard (imports and Blocks construction)
+#
+#   python -m backend.benchmarks.bench_frontend_startup --runs 5 --budget 10
+#
+# Profiles `import frontend.main` in fresh interpreters under `-X importtime` and lists
+# the slowest imports and the import time of each top-level package. It then times the
+# wall clock from interpreter start to a built dashboard (Blocks and their config), with
+# lazy tabs and with every tab built up front (LAZY_TABS=false), and the build time of
+# each tab body, which is what lazy tabs move from startup to a tab's first visit.
+# Exits with status 1 when the median lazy startup is over --budget seconds.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+STARTUP = """
+import json, time
+started = time.perf_counter()
+import frontend.main as main
+built = time.perf_counter()
+main.agentic_dashboard.get_config_file()
+print(json.dumps({"import_and_build": built - started, "config": time.perf_counter() - built}))
+"""
+
+
+# (module, self us, cumulative us) for each line of `-X importtime` output
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run(code, env=None, importtime=False):
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    started = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, env=dict(os.environ, **(env or {})))
+    return process, time.perf_counter() - started
+
+
+def import_profile(top):
+    process, wall = run("import frontend.main", importtime=True)
+    imports = parse_importtime(process.stderr)
+    packages = defaultdict(int)
+    for module, self_us, _ in imports:
+        packages[module.split(".")[0]] += self_us
+    print(f"imports: {len(imports)} modules, {sum(s for _, s, _ in imports) / 1e6:.2f} s of {wall:.2f} s wall")
+    print(f"  {'slowest imports (cumulative)':<48}{'ms':>9}")
+    for module, _, cumulative_us in sorted(imports, key=lambda i: -i[2])[:top]:
+        print(f"  {module:<48}{cumulative_us / 1000:>9.1f}")
+    print(f"  {'top-level packages (self time)':<48}{'ms':>9}")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"  {package:<48}{self_us / 1000:>9.1f}")
+
+
+# Median timings of `runs` fresh starts, or the error that stopped them
+def startup(runs, lazy):
+    walls, builds = [], []
+    for _ in range(runs):
+        process, wall = run(STARTUP, env={"LAZY_TABS": "true" if lazy else "false"})
+        if process.returncode:
+            return None, process.stderr.strip().splitlines()[-1]
+        timings = json.loads(process.stdout.strip().splitlines()[-1])
+        walls.append(wall)
+        builds.append(timings["import_and_build"] + timings["config"])
+    return statistics.median(walls), statistics.median(builds)
+
+
+def tab_costs():
+    os.environ["LAZY_TABS"] = "true"
+    import gradio as gr
+    from frontend import main
+    print(f"  {'tab body':<48}{'build ms':>9}")
+    for label, build in main.TABS:
+        started = time.perf_counter()
+        try:
+            with gr.Blocks():
+                build()
+            print(f"  {label:<48}{(time.perf_counter() - started) * 1000:>9.1f}")
+        except Exception as e:
+            print(f"  {label:<48}{'failed':>9}  {type(e).__name__}: {str(e)[:60]}")
+
+
+def main(args):
+    import_profile(args.top)
+    lazy = None
+    for mode in (True, False):
+        median, detail = startup(args.runs, mode)
+        label = "lazy tabs" if mode else "LAZY_TABS=false"
+        if median is None:
+            print(f"startup, {label}: failed ({detail})")
+        else:
+            print(f"startup, {label}: {median:.2f} s wall, {detail:.2f} s importing and building (median of {args.runs})")
+        if mode:
+            lazy = median
+    tab_costs()
+    if lazy is None or lazy > args.budget:
+        print(f"over the startup budget of {args.budget:.1f} s")
+        sys.exit(1)
+    print(f"within the startup budget of {args.budget:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frontend import-time and startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds from interpreter start to a built dashboard")
+    parser.add_argument("--top", type=int, default=10)
+    main(parser.parse_args())
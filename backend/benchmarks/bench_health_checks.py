@@ -0,0 +1,92 @@
+# Benchmark: scheduler CPU overhead of health checks for many agents
+#
+#   python -m backend.benchmarks.bench_health_checks --checks 50000 --interval 30 --duration 10
+#
+# Registers `checks` health checks with a probe that returns at once, runs the event loop
+# for `duration` seconds and reports the CPU time used (as a share of one core), probes run
+# and how late they started. The timer wheel is compared with one sleeping task per agent.
+# The idle row has every check due after the run, so it only measures ticking the wheel.
+
+import argparse
+import asyncio
+import random
+import time
+
+from backend.app.services.health_checks import HealthChecker
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def probe(check):
+    return True
+
+
+async def recover(check):
+    pass
+
+
+async def measure(label, args, start, stop, probes, lateness):
+    start()
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.duration)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    await stop()
+    ran = probes()
+    print(f"{label:>14}  {100 * cpu / wall:>6.1f}  {ran:>8}  {1e6 * cpu / max(ran, 1):>9.1f}  "
+          f"{1000 * percentile(lateness, 0.5):>8.1f}  {1000 * percentile(lateness, 0.99):>8.1f}")
+
+
+async def timer_wheel(args, interval):
+    checker = HealthChecker(probe, recover, tick=args.tick, max_concurrency=args.concurrency, jitter=0.1, seed=1)
+    started = time.perf_counter()
+    for agent_id in range(args.checks):
+        checker.register(agent_id, interval)
+    print(f"registered {args.checks} checks in {1000 * (time.perf_counter() - started):.0f} ms")
+    await measure("wheel" if interval == args.interval else "wheel (idle)", args, checker.start, checker.stop,
+                  lambda: checker.probes, checker.lateness)
+
+
+# The alternative: a task per agent sleeping until its next check
+async def task_per_agent(args):
+    rng = random.Random(1)
+    lateness, ran, tasks = [], [0], []
+
+    async def loop(agent_id):
+        delay = rng.uniform(0, args.interval)
+        while True:
+            due = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            lateness.append(time.monotonic() - due)
+            ran[0] += 1
+            await probe(None)
+            delay = args.interval * rng.uniform(0.9, 1.1)
+
+    def start():
+        tasks.extend(asyncio.create_task(loop(agent_id)) for agent_id in range(args.checks))
+
+    async def stop():
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await measure("task per agent", args, start, stop, lambda: ran[0], lateness)
+
+
+async def main(args):
+    print(f"{args.checks} checks every {args.interval:g}s, {args.duration:g}s run, {args.tick * 1000:g} ms ticks")
+    print(f"{'scheduler':>14}  {'CPU %':>6}  {'probes':>8}  {'CPU us/probe':>9}  {'p50 late':>8}  {'p99 late':>8}")
+    await timer_wheel(args, args.duration * 10000)
+    await timer_wheel(args, args.interval)
+    await task_per_agent(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Health check scheduler benchmark")
+    parser.add_argument("--checks", type=int, default=50000)
+    parser.add_argument("--interval", type=float, default=30, help="seconds between checks of one agent")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--tick", type=float, default=0.1, help="timer wheel resolution, seconds")
+    parser.add_argument("--concurrency", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+# Benchmark: authenticated request overhead with and without the JWT claims cache
+#
+# Measures verify_token on its own and a full in-process request to an
+# authenticated endpoint that makes no upstream calls.
+#
+#   python -m backend.benchmarks.bench_jwt_cache --iterations 20000
+
+import argparse
+import asyncio
+import time
+import timeit
+
+import httpx
+
+from backend.app.main import app
+from backend.app.routes import users
+from backend.app.routes.users import create_access_token, verify_token
+
+
+def per_call_us(fn, iterations):
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+async def request_overhead_us(headers, iterations):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            response = await client.get("/users/cache/stats", headers=headers)
+            response.raise_for_status()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(args):
+    token = create_access_token({"sub": "bench@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{'':<28}{'no cache':>12}{'cache':>12}")
+    for label, measure in (
+        ("verify_token (us/call)", lambda: per_call_us(lambda: verify_token(token), args.iterations)),
+        ("GET request (us/request)", lambda: asyncio.run(request_overhead_us(headers, args.requests))),
+    ):
+        users.token_claims_cache.enabled = False
+        without = measure()
+        users.token_claims_cache.enabled = True
+        users.token_claims_cache.clear()
+        with_cache = measure()
+        print(f"{label:<28}{without:>12.1f}{with_cache:>12.1f}")
+    print("cache stats:", users.token_claims_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JWT claims cache benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+# Benchmark: throughput versus latency of LLM micro-batching
+#
+#   python -m backend.benchmarks.bench_llm_batching --callers 500 --requests 4
+#
+# `callers` agents each send `requests` completions back to back through an LLMGateway
+# backed by FakeBatchedProvider: a server with `slots` parallel forward passes, each taking
+# latency + batch size * per-item seconds. Every max-wait/max-batch pair is compared with
+# batching turned off.
+
+import argparse
+import asyncio
+import time
+
+from backend.app.services.llm_service import FakeBatchedProvider, LLMGateway
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args, max_batch, max_wait):
+    provider = FakeBatchedProvider(latency=args.latency / 1000, per_item=args.per_item / 1000, slots=args.slots)
+    gateway = LLMGateway(
+        providers={"openai": provider}, model_concurrency=0, tenant_concurrency=0,
+        batch_max_size=max_batch, batch_max_wait=max_wait / 1000,
+    )
+    latencies = []
+
+    async def caller(i):
+        for j in range(args.requests):
+            started = time.perf_counter()
+            await gateway.complete("GPT-4", f"agent {i} request {j}", tenant_id=f"tenant-{i % 10}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(i) for i in range(args.callers)))
+    elapsed = time.perf_counter() - started
+    sizes = provider.batch_sizes
+    label = "off" if max_batch <= 1 else f"{max_batch:>4} / {max_wait:>4g} ms"
+    print(f"{label:>16}  {len(latencies) / elapsed:>9.0f}  {sum(sizes) / len(sizes):>10.1f}  "
+          f"{percentile(latencies, 0.5) * 1000:>8.1f}  {percentile(latencies, 0.99) * 1000:>8.1f}")
+
+
+async def main(args):
+    print(f"{args.callers} callers x {args.requests} requests, {args.slots} slots, "
+          f"{args.latency:g} ms + {args.per_item:g} ms/prompt per pass")
+    print(f"{'batch / wait':>16}  {'req/s':>9}  {'mean batch':>10}  {'p50 ms':>8}  {'p99 ms':>8}")
+    await run(args, 1, 0)
+    for max_batch in args.max_batch:
+        for max_wait in args.max_wait:
+            await run(args, max_batch, max_wait)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM micro-batching benchmark")
+    parser.add_argument("--callers", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=50, help="fixed cost of a forward pass, ms")
+    parser.add_argument("--per-item", type=float, default=1, help="extra cost per prompt in a pass, ms")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--max-wait", type=float, nargs="+", default=[1, 5, 20])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+# Benchmark: tail latency of the LLM load balancing strategies
+#
+#   python -m backend.benchmarks.bench_load_balancer --replicas 8 --rate 1000 --requests 5000
+#
+# Simulated replicas serve `slots` requests at a time with log-normal service times around
+# --latency ms. One replica is degraded (--slow-factor times slower) and one fails fast on
+# --error-rate of its calls, the case where least-loaded strategies pull traffic onto a
+# broken replica. Requests arrive open-loop (Poisson) at --rate per second and are not
+# retried, so errors count against the strategy.
+
+import argparse
+import asyncio
+import random
+import time
+
+from backend.app.services.load_balancer import STRATEGIES, LoadBalancer
+
+
+class Replica:
+    def __init__(self, rng, slots, latency, slow_factor=1.0, error_rate=0.0):
+        self.rng = rng
+        self.slots = asyncio.Semaphore(slots)
+        self.latency = latency * slow_factor
+        self.error_rate = error_rate
+
+    async def complete(self, model, prompt, params):
+        if self.rng.random() < self.error_rate:
+            await asyncio.sleep(0.001)
+            raise ConnectionError("replica failed")
+        async with self.slots:
+            await asyncio.sleep(self.rng.lognormvariate(0, 0.3) * self.latency)
+        return {"text": "ok"}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args, strategy, ejection):
+    rng = random.Random(0)
+    replicas = {}
+    for i in range(args.replicas):
+        slow = args.slow_factor if i == 0 else 1.0
+        errors = args.error_rate if i == 1 else 0.0
+        replicas[f"replica-{i}"] = Replica(rng, args.slots, args.latency / 1000, slow, errors)
+    balancer = LoadBalancer(
+        replicas, strategy=strategy, seed=0,
+        eject_after=5 if ejection else 10**9, max_error_rate=0.2 if ejection else 0,
+        outlier_factor=3.0 if ejection else 0, ejection_time=1.0,
+    )
+    latencies = []
+    errors = 0
+
+    async def request():
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            async with balancer.endpoint() as endpoint:
+                await endpoint.provider.complete("model", "prompt", {})
+        except ConnectionError:
+            errors += 1
+            return
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    tasks = []
+    for _ in range(args.requests):
+        tasks.append(asyncio.ensure_future(request()))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    print(f"{strategy:>18} {'on' if ejection else 'off':>8}  {percentile(latencies, 0.5):>7.1f}  "
+          f"{percentile(latencies, 0.99):>7.1f}  {percentile(latencies, 0.999):>7.1f}  {errors / args.requests:>7.2%}")
+
+
+async def main(args):
+    print(f"{args.replicas} replicas x {args.slots} slots, {args.latency:g} ms service time, "
+          f"{args.rate:g} req/s, replica-0 {args.slow_factor:g}x slower, replica-1 fails {args.error_rate:.0%}")
+    print(f"{'strategy':>18} {'ejection':>8}  {'p50 ms':>7}  {'p99 ms':>7}  {'p99.9':>7}  {'errors':>7}")
+    for ejection in (False, True):
+        for strategy in STRATEGIES:
+            await run(args, strategy, ejection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM load balancing simulation")
+    parser.add_argument("--replicas", type=int, default=8)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=20, help="median service time, ms")
+    parser.add_argument("--rate", type=float, default=1000, help="arrivals per second")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--slow-factor", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    asyncio.run(main(parser.parse_args()))
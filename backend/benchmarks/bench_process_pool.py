@@ -0,0 +1,81 @@
+# Benchmark: CPU-bound agent work inline on the event loop vs in the process pool
+#
+#   python -m backend.benchmarks.bench_process_pool --tasks 32 --rows 1000000
+#
+# Each task scores `rows` synthetic records and returns the score array. Reports wall time
+# and the longest event-loop stall, which is what other requests feel. The pool is run
+# twice: results through shared memory, and results pickled back to the parent.
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from backend.app.services import process_pool as process_pool_module
+from backend.app.services.process_pool import AgentProcessPool, SharedArray
+
+
+def score(seed, rows):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(rows, 4))
+    weights = np.array([0.4, 0.3, 0.2, 0.1])
+    scores = (values - values.mean(axis=0)) / values.std(axis=0) @ weights
+    return np.sort(scores)
+
+
+async def measure(label, run_tasks):
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await run_tasks()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    print(f"{label:<24}{elapsed:>10.2f}{max(stalls) * 1000:>16.1f}")
+
+
+async def run(args):
+    print(f"tasks={args.tasks} rows={args.rows} cpu workers={args.workers} (cpu_count={os.cpu_count()})")
+    print(f"{'mode':<24}{'wall s':>10}{'max stall ms':>16}")
+
+    async def inline():
+        for i in range(args.tasks):
+            score(i, args.rows)
+
+    await measure("inline (event loop)", inline)
+
+    for label, min_bytes in (("pool + shared memory", 0), ("pool + pickle", float("inf"))):
+        # Workers are forked at start(), so they inherit the threshold
+        process_pool_module.SHARED_MEMORY_MIN_BYTES = min_bytes
+        pool = AgentProcessPool(cpu_workers=args.workers)
+        await pool.start()
+
+        async def pooled():
+            results = await asyncio.gather(*(pool.run("Analytical", score, i, args.rows) for i in range(args.tasks)))
+            for result in results:
+                if isinstance(result, SharedArray):
+                    result.close()
+
+        await measure(label, pooled)
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process pool vs inline CPU work benchmark")
+    parser.add_argument("--tasks", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    asyncio.run(run(parser.parse_args()))
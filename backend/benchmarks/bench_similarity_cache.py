@@ -0,0 +1,96 @@
+# Benchmark: precision/recall and lookup latency of the near-duplicate prompt cache
+#
+#   python -m backend.benchmarks.bench_similarity_cache --entries 1000000 --queries 5000
+#
+# Cached prompts are random 8-16 word questions. Positive queries are perturbed copies of
+# a cached prompt (a word replaced or dropped, an adjacent-letter typo, case and
+# punctuation changes); negative queries are fresh prompts. A hit is correct when it
+# returns the answer of the prompt the query was derived from.
+
+import argparse
+import random
+import string
+import time
+
+from backend.app.services.similarity_cache import SimilarityCache
+from backend.app.utils.cache import MISSING
+
+
+def vocabulary(rng, size):
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def question(rng, words):
+    return " ".join(rng.choice(words) for _ in range(rng.randint(8, 16))) + "?"
+
+
+def perturb(rng, text, words):
+    tokens = text.rstrip("?").split()
+    edit = rng.randrange(4)
+    position = rng.randrange(len(tokens))
+    if edit == 0:
+        tokens[position] = rng.choice(words)
+    elif edit == 1:
+        del tokens[position]
+    elif edit == 2 and len(tokens[position]) > 3:
+        word = tokens[position]
+        i = rng.randrange(len(word) - 1)
+        tokens[position] = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    else:
+        tokens[position] = tokens[position].upper()
+    return " ".join(tokens) + rng.choice(["?", "", "!", " ?"])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(args):
+    rng = random.Random(0)
+    words = vocabulary(rng, args.vocabulary)
+    cache = SimilarityCache(threshold=args.threshold, max_entries=args.entries, num_perm=args.num_perm, bands=args.bands)
+    prompts = []
+    started = time.perf_counter()
+    for i in range(args.entries):
+        prompt = question(rng, words)
+        prompts.append(prompt)
+        cache.add(i % args.scopes, prompt, i)
+    print(f"indexed {len(cache)} prompts in {args.scopes} scope(s) in {time.perf_counter() - started:.1f} s")
+
+    latencies = []
+    true_hits = false_hits = positives = 0
+    for q in range(args.queries):
+        if q % 2 == 0:
+            target = rng.randrange(args.entries)
+            text, expected, scope = perturb(rng, prompts[target], words), target, target % args.scopes
+            positives += 1
+        else:
+            text, expected, scope = question(rng, words), None, rng.randrange(args.scopes)
+        started = time.perf_counter()
+        match = cache.lookup(scope, text)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if match is not MISSING:
+            if match[0] == expected:
+                true_hits += 1
+            else:
+                false_hits += 1
+
+    hits = true_hits + false_hits
+    print(f"threshold={args.threshold} num_perm={args.num_perm} bands={args.bands}")
+    print(f"precision={true_hits / hits if hits else 1.0:.3f} recall={true_hits / positives:.3f} "
+          f"({true_hits} correct, {false_hits} wrong, {positives} positives)")
+    print(f"lookup ms: p50={percentile(latencies, 0.5):.3f} p95={percentile(latencies, 0.95):.3f} "
+          f"p99={percentile(latencies, 0.99):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate prompt cache benchmark")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--scopes", type=int, default=1)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+# Benchmark: per-request httpx.AsyncClient vs the shared, pooled Supabase client
+#
+# Runs a local stand-in for the Supabase REST API (plain HTTP/1.1 with keep-alive)
+# and fires the same request mix through both client strategies.
+#
+#   python -m backend.benchmarks.bench_supabase_pool --requests 2000 --concurrency 50
+#
+# `--handshake-ms` adds a delay when a new connection is accepted, standing in for
+# the TCP+TLS setup cost that a real Supabase hop pays on every fresh client.
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from backend.app.services.supabase_client import create_supabase_client
+
+BODY = json.dumps([{"id": "1", "email": "ada@example.com", "tenant_id": "t1", "created_at": "2024-01-01"}]).encode()
+
+
+async def start_stand_in_server(handshake_ms):
+    async def handle(reader, writer):
+        if handshake_ms:
+            await asyncio.sleep(handshake_ms / 1000)
+        try:
+            while True:
+                # Read request line + headers; the stand-in only serves GETs
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(fetch, total, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await fetch()
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return elapsed, sorted(latencies)
+
+
+def report(label, total, elapsed, latencies):
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(
+        f"{label:<22} {total / elapsed:>9.0f} req/s   "
+        f"p50 {pct(0.50):7.2f} ms   p95 {pct(0.95):7.2f} ms   p99 {pct(0.99):7.2f} ms   "
+        f"mean {statistics.mean(latencies) * 1000:7.2f} ms"
+    )
+
+
+async def main(args):
+    server, base_url = await start_stand_in_server(args.handshake_ms)
+    path = "/rest/v1/users?id=eq.1&select=*"
+
+    async def per_request_client():
+        async with httpx.AsyncClient() as client:
+            return await client.get(base_url + path)
+
+    pooled = create_supabase_client(base_url=base_url, max_connections=args.concurrency)
+
+    async def pooled_client():
+        return await pooled.get(path)
+
+    async with server:
+        print(f"{args.requests} requests, concurrency {args.concurrency}, handshake {args.handshake_ms} ms")
+        report("before (per-request)", args.requests, *await run(per_request_client, args.requests, args.concurrency))
+        report("after (pooled)", args.requests, *await run(pooled_client, args.requests, args.concurrency))
+    await pooled.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request vs pooled Supabase client benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
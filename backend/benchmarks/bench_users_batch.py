@@ -0,0 +1,68 @@
+# Benchmark: one-at-a-time POST /users vs chunked POST /users:batch
+#
+# Drives the real FastAPI app in-process over ASGI, with a stand-in Supabase
+# transport that adds a fixed round-trip latency to every upstream call.
+#
+#   python -m backend.benchmarks.bench_users_batch --users 2000 --latency-ms 5
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from backend.app.main import app
+from backend.app.routes import users
+from backend.app.routes.users import create_access_token
+from backend.app.services.supabase_client import create_supabase_client, get_supabase_client
+
+
+def stand_in_supabase(latency):
+    async def handler(request):
+        await asyncio.sleep(latency)
+        body = json.loads(request.content)
+        rows = body if isinstance(body, list) else [body]
+        created = [dict(row, id=str(i), tenant_id="t1", created_at="2024-01-01T00:00:00") for i, row in enumerate(rows)]
+        return httpx.Response(201, json=created if isinstance(body, list) else created[0])
+    return httpx.MockTransport(handler)
+
+
+async def main(args):
+    users.SUPABASE_KEY = users.SUPABASE_KEY or "bench-key"
+    pool = create_supabase_client(base_url="http://supabase.bench", transport=stand_in_supabase(args.latency_ms / 1000))
+    app.dependency_overrides[get_supabase_client] = lambda: pool
+    token = create_access_token({"sub": "bench@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = [{"email": f"user{i}@example.com", "password": "pw"} for i in range(args.users)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def create_one(user):
+            async with semaphore:
+                response = await client.post("/users", json=user, headers=headers)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(create_one(user) for user in payload))
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = await client.post("/users:batch", json=payload, headers=headers)
+        response.raise_for_status()
+        batch = time.perf_counter() - started
+        assert response.json()["succeeded"] == args.users
+
+    print(f"{args.users} users, upstream latency {args.latency_ms} ms, chunk size {users.USERS_BATCH_CHUNK_SIZE}")
+    print(f"one-at-a-time (concurrency {args.concurrency}): {args.users / single:>9.0f} users/s  ({single:.2f} s)")
+    print(f"batch endpoint:                   {args.users / batch:>9.0f} users/s  ({batch:.2f} s)")
+    await pool.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="One-at-a-time vs batch user creation benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
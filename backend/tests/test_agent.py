@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from backend.app.services.agent_service import create_agent
+from backend.app.services.agent_service import TaskDispatcher, create_agent
 
 class TestAgentService(unittest.TestCase):
     def test_create_agent(self):
@@ -8,5 +9,81 @@ class TestAgentService(unittest.TestCase):
         result = create_agent(agent_name, agent_type)
         self.assertEqual(result, f"Agent '{agent_name}' of type '{agent_type}' created successfully.")
 
+class TestTaskDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.order = []
+        self.dispatcher = TaskDispatcher(workers=1, max_queued=100, per_agent_limit=1, per_tenant_limit=10)
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+
+    def job(self, label, delay=0):
+        async def run():
+            await asyncio.sleep(delay)
+            self.order.append(label)
+            return label
+        return run
+
+    async def wait_idle(self):
+        while self.dispatcher.queued or self.dispatcher.stats()["running"]:
+            await asyncio.sleep(0.001)
+
+    async def test_priority_and_tenant_fairness(self):
+        for i in range(3):
+            await self.dispatcher.submit(f"a{i}", "busy", self.job(f"busy-{i}"), priority=5)
+        await self.dispatcher.submit("b0", "quiet", self.job("quiet-low"), priority=9)
+        await self.dispatcher.submit("b1", "quiet", self.job("quiet-high"), priority=1)
+        await self.dispatcher.start()
+        await self.wait_idle()
+        self.assertEqual(self.order, ["busy-0", "quiet-high", "busy-1", "quiet-low", "busy-2"])
+
+    async def test_per_agent_limit_and_status(self):
+        self.dispatcher.workers = 4
+        await self.dispatcher.start()
+        first = await self.dispatcher.submit("agent-1", "t1", self.job("first", 0.02), description="Text Processing")
+        second = await self.dispatcher.submit("agent-1", "t1", self.job("second"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.dispatcher.current_task("agent-1"), "Text Processing")
+        self.assertEqual(self.dispatcher.status(second)["status"], "queued")
+        await self.wait_idle()
+        self.assertEqual(self.order, ["first", "second"])
+        self.assertEqual(self.dispatcher.status(first)["status"], "completed")
+        self.assertIsNone(self.dispatcher.current_task("agent-1"))
+
+    async def test_backpressure_and_cancel(self):
+        self.dispatcher.max_queued = 1
+        await self.dispatcher.submit("agent-1", "t1", self.job("kept"))
+        with self.assertRaises(asyncio.QueueFull):
+            await self.dispatcher.submit("agent-2", "t1", self.job("rejected"), block=False)
+        blocked = asyncio.create_task(self.dispatcher.submit("agent-3", "t1", self.job("waited")))
+        await asyncio.sleep(0.01)
+        self.assertFalse(blocked.done())
+        await self.dispatcher.start()
+        waited = await blocked
+        cancelled = await self.dispatcher.submit("agent-4", "t1", self.job("cancelled", 1))
+        await asyncio.sleep(0.01)
+        self.assertTrue(await self.dispatcher.cancel(cancelled))
+        await self.wait_idle()
+        self.assertEqual(self.order, ["kept", "waited"])
+        self.assertEqual(self.dispatcher.status(waited)["status"], "completed")
+        self.assertEqual(self.dispatcher.status(cancelled)["status"], "cancelled")
+        self.assertEqual(self.dispatcher.stats("t1")["completed"], 2)
+        self.assertEqual(self.dispatcher.stats("other")["completed"], 0)
+
+    async def test_stop_releases_running_tasks(self):
+        self.dispatcher.per_tenant_limit = 1
+        await self.dispatcher.start()
+        stuck = await self.dispatcher.submit("agent-1", "t1", self.job("stuck", 10))
+        await asyncio.sleep(0.01)
+        await self.dispatcher.stop()
+        self.assertEqual(self.dispatcher.status(stuck)["status"], "cancelled")
+        self.assertEqual(self.dispatcher.stats()["running"], 0)
+        # The same agent and tenant can run work again after a restart
+        await self.dispatcher.start()
+        again = await self.dispatcher.submit("agent-1", "t1", self.job("again"))
+        await self.wait_idle()
+        self.assertEqual(self.order, ["again"])
+        self.assertEqual(self.dispatcher.status(again)["status"], "completed")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from backend.app.models.agent_model import Agent, AgentTable
+
+RECORDS = [
+    {"id": 1, "name": "Sales AI", "type": "Conversational", "status": "Active", "llm_base": "GPT-4", "performance": 4.5, "max_tokens": 512},
+    {"id": 2, "name": "Support Bot", "type": "Retrieval-based", "status": "Active", "llm_base": "Claude", "performance": 4.0},
+    {"id": 3, "name": "Marketing Assistant", "type": "Generative", "status": "Inactive", "llm_base": "GPT-4", "performance": 3.5},
+    {"id": 4, "name": "HR Coordinator", "type": "Conversational", "status": "Active", "llm_base": None},
+]
+
+class TestAgentModel(unittest.TestCase):
+    def test_agent_uses_slots(self):
+        agent = Agent("TestAgent", "Conversational")
+        self.assertFalse(hasattr(agent, "__dict__"))
+        self.assertEqual(agent.agent_type, "Conversational")
+
+    def test_table_filters_and_round_trips_rows(self):
+        table = AgentTable(capacity=2)
+        table.extend(RECORDS)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.filter(agent_type="Conversational", status="Active").tolist(), [0, 3])
+        self.assertEqual(table.filter(llm_base=["Claude", "PaLM"]).tolist(), [1])
+        self.assertEqual(table.filter(performance=(4.0, None)).tolist(), [0, 1])
+        self.assertEqual(table.filter(status="Missing").tolist(), [])
+        row = table.row(3)
+        self.assertEqual((row.id, row.name, row.llm_base, row.performance), (4, "HR Coordinator", None, None))
+        self.assertEqual(table.row(0).max_tokens, 512)
+
+    def test_aggregate_by_category(self):
+        table = AgentTable.from_records(RECORDS)
+        overall = table.aggregate("performance")
+        self.assertEqual((overall["count"], overall["mean"]), (3, 4.0))
+        by_llm = table.aggregate("performance", by="llm_base", mask=table.mask(status="Active"))
+        self.assertEqual(by_llm["GPT-4"], {"count": 1, "sum": 4.5, "mean": 4.5, "min": 4.5, "max": 4.5})
+        self.assertEqual(set(by_llm), {"GPT-4", "Claude"})
+
+if __name__ == '__main__':
+    unittest.main()
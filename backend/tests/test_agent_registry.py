@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.agent_registry import AgentRegistry, agent_registry
+
+AGENTS = [
+    {"id": 1, "tenant_id": "t1", "name": "Sales AI", "type": "Conversational", "status": "Active", "llm_base": "GPT-4", "performance": 4.5},
+    {"id": 2, "tenant_id": "t1", "name": "Support Bot", "type": "Retrieval-based", "status": "Active", "llm_base": "Claude", "performance": 4.2},
+    {"id": 3, "tenant_id": "t2", "name": "Marketing Assistant", "type": "Generative", "status": "Inactive", "llm_base": "GPT-4", "performance": 3.8},
+    {"id": 4, "tenant_id": "t2", "name": "Data Analyst", "type": "Analytical", "status": "Active", "llm_base": "PaLM", "performance": 4.7},
+    {"id": 5, "tenant_id": "t1", "name": "HR Coordinator", "type": "Conversational", "status": "Active", "llm_base": None, "performance": None},
+]
+
+class TestAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = AgentRegistry()
+        self.registry.load([dict(a) for a in AGENTS])
+
+    def names(self, agents):
+        return [a["name"] for a in agents]
+
+    def test_filtered_sorted_listing(self):
+        self.assertEqual(self.names(self.registry.list(sort="-performance", status="Active")),
+                         ["Data Analyst", "Sales AI", "Support Bot", "HR Coordinator"])
+        self.assertEqual(self.names(self.registry.list(tenant_id="t1", type="Conversational")), ["Sales AI", "HR Coordinator"])
+        self.assertEqual(self.names(self.registry.list(sort="name", limit=2, offset=1)), ["HR Coordinator", "Marketing Assistant"])
+        self.assertEqual(self.registry.count(llm_base="GPT-4"), 2)
+
+    def test_index_walk_matches_candidate_sort(self):
+        sets = self.registry._filter_sets({"status": "Active"})
+        self.assertEqual(self.registry._list_by_walk("name", True, sets, 3, 1),
+                         self.registry._list_by_candidates("name", True, sets, 3, 1))
+        self.assertEqual(self.registry._list_by_walk("performance", False, sets, 10, 0), [2, 1, 4, 5])
+
+    def test_walk_falls_back_when_filters_barely_overlap(self):
+        agents = [{"id": i, "tenant_id": "t1" if i < 500 else "t2", "status": "Active" if i >= 499 else "Idle"}
+                  for i in range(1000)]
+        self.registry.load(agents)
+        # Independence predicts ~250 matches; only agent 499 has both values
+        self.assertEqual([a["id"] for a in self.registry.list(tenant_id="t1", status="Active")], [499])
+        sets = self.registry._filter_sets({"tenant_id": "t1", "status": "Active"})
+        self.assertIsNone(self.registry._list_by_walk("id", False, sets, 50, 0, budget=len(sets[0])))
+
+    def test_writes_keep_indexes_consistent(self):
+        self.registry.update(3, {"status": "Active", "performance": 5.0})
+        self.registry.remove(1)
+        self.registry.upsert({"id": 6, "tenant_id": "t1", "name": "Aardvark", "type": "Generative", "status": "Active"})
+        self.assertEqual(self.names(self.registry.list(sort="-performance", status="Active", limit=2)),
+                         ["Marketing Assistant", "Data Analyst"])
+        self.assertEqual(self.names(self.registry.list(sort="name", tenant_id="t1")), ["Aardvark", "HR Coordinator", "Support Bot"])
+        self.assertEqual(self.registry.count(status="Inactive"), 0)
+        self.assertEqual(self.registry.count(llm_base="PaLM"), 1)
+
+    def test_background_load_replays_concurrent_writes(self):
+        async def run():
+            registry = AgentRegistry()
+            load = asyncio.create_task(registry.load_in_background([dict(a) for a in AGENTS]))
+            await asyncio.sleep(0)
+            self.assertFalse(registry.loaded)
+            registry.upsert({"id": 6, "tenant_id": "t1", "name": "New Hire", "status": "Active"})
+            registry.remove(2)
+            await load
+            return registry
+
+        registry = asyncio.run(run())
+        self.assertTrue(registry.loaded)
+        self.assertEqual(self.names(registry.list(tenant_id="t1")), ["Sales AI", "HR Coordinator", "New Hire"])
+
+    def test_agents_route_requires_tenant(self):
+        agent_registry.load([dict(a) for a in AGENTS])
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com")
+        try:
+            client = TestClient(app)
+            self.assertEqual(client.get("/agents").status_code, 403)
+            self.assertEqual(client.get("/agents/1").status_code, 403)
+            self.assertEqual(client.delete("/agents/1").status_code, 403)
+            self.assertEqual(client.get("/tasks").status_code, 403)
+        finally:
+            app.dependency_overrides.clear()
+            agent_registry.clear()
+
+    def test_agents_route_scopes_to_tenant(self):
+        agent_registry.load([dict(a) for a in AGENTS])
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t2")
+        try:
+            client = TestClient(app)
+            # A tenant_id query parameter cannot widen the scope
+            response = client.get("/agents", params={"sort": "-performance", "include_total": True, "tenant_id": "t1"})
+            other_tenant = client.get("/agents/1")
+        finally:
+            app.dependency_overrides.clear()
+            agent_registry.clear()
+        self.assertEqual(response.json()["total"], 2)
+        self.assertEqual(self.names(response.json()["agents"]), ["Data Analyst", "Marketing Assistant"])
+        self.assertEqual(other_tenant.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
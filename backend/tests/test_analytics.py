@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.agent_registry import agent_registry
+from backend.app.services.analytics import AnalyticsStore, TaskAnalytics, analytics_store
+
+DAY = 86400
+
+def random_events(rng, size):
+    return {
+        "timestamp": 1_700_000_000 + rng.uniform(0, 30 * DAY, size),
+        "agent_id": rng.integers(0, 50, size),
+        "team": rng.choice(["Sales", "Support", "HR"], size),
+        "duration": np.where(rng.random(size) < 0.8, rng.exponential(5, size), np.nan),
+        "success": rng.random(size) < 0.9,
+        "rating": np.where(rng.random(size) < 0.3, rng.uniform(1, 5, size), np.nan),
+    }
+
+class TestTaskAnalytics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.batches = [random_events(rng, size) for size in (1000, 1, 5000)]
+        self.analytics = TaskAnalytics(batch_size=100)
+        for batch in self.batches:
+            self.analytics.append(**batch)
+        events = pd.DataFrame({column: np.concatenate([batch[column] for batch in self.batches]) for column in self.batches[0]})
+        events["is_task"] = events["duration"].notna()
+        events["completed"] = events["is_task"] & events["success"]
+        events["day"] = pd.to_datetime(events["timestamp"] // DAY * DAY, unit="s")
+        self.events = events
+
+    def expected(self, key):
+        return self.events.groupby(key).agg(
+            tasks=("is_task", "sum"), tasks_completed=("completed", "sum"),
+            avg_duration=("duration", "mean"), avg_rating=("rating", "mean"), ratings=("rating", "count"),
+        )
+
+    def test_incremental_groupings_match_a_full_groupby(self):
+        for frame, key in ((self.analytics.by_team(), "team"), (self.analytics.by_agent(), "agent_id"), (self.analytics.by_day(), "day")):
+            expected = self.expected(key)
+            frame = frame.sort_index()
+            self.assertEqual(frame.index.tolist(), expected.index.tolist())
+            for column in expected.columns:
+                np.testing.assert_allclose(frame[column].to_numpy(np.float64), expected[column].to_numpy(np.float64), rtol=1e-9)
+        self.assertEqual(self.analytics.by_team()["agents"].sum(), 50)
+
+    def test_correlation_and_distributions(self):
+        by_day = self.expected("day")
+        r = np.corrcoef(by_day["tasks_completed"], by_day["avg_rating"])[0, 1]
+        self.assertAlmostEqual(self.analytics.correlation("day")["r"], r)
+        self.assertEqual(self.analytics.correlation("day")["n"], len(by_day))
+        distributions = self.analytics.distributions()
+        self.assertEqual(sum(distributions["rating"]["counts"]), self.events["rating"].count())
+        self.assertEqual(sum(distributions["duration"]["counts"]), self.events["is_task"].sum())
+
+    def test_summary_window_is_calendar_days(self):
+        store = AnalyticsStore(clock=lambda: 1_700_000_000 + 30 * DAY)
+        for batch in self.batches:
+            store.tenant("t1").append(**batch)
+        since = pd.Timestamp(1_700_000_000 + 30 * DAY - 6 * DAY, unit="s").normalize()
+        events = self.events[self.events["day"] >= since]
+        summary = store.summary("t1", days=7)
+        self.assertEqual([day["date"] for day in summary["days"]], sorted(events["day"].dt.strftime("%Y-%m-%d").unique()))
+        teams = events.groupby("team")["completed"].sum()
+        self.assertEqual({team["team"]: team["tasks_completed"] for team in summary["teams"]}, teams.to_dict())
+        by_agent = events.groupby("agent_id").agg(completed=("completed", "sum"), rating=("rating", "mean"))
+        self.assertAlmostEqual(summary["correlation"]["agent"]["r"], np.corrcoef(by_agent["completed"], by_agent["rating"])[0, 1])
+        self.assertEqual(summary["events"], len(self.events))
+        self.assertEqual(len(store.summary("t1")["days"]), self.events["day"].nunique())
+
+    def test_single_events_are_buffered_until_needed(self):
+        analytics = TaskAnalytics(batch_size=3, keep_events=True)
+        analytics.add(0, 1, "Sales", duration=2.0, success=True)
+        analytics.add(0, 1, "Sales", rating=4.0)
+        self.assertEqual(analytics.events, 0)
+        analytics.add(DAY, 2, "HR", duration=4.0, success=False)
+        self.assertEqual(analytics.events, 3)
+        analytics.add(DAY, 2, "HR", rating=2.0)
+        teams = analytics.by_team()
+        self.assertEqual(teams.loc["Sales", ["tasks_completed", "avg_rating", "agents"]].tolist(), [1, 4.0, 1])
+        self.assertEqual(teams.loc["HR", ["tasks", "tasks_completed", "avg_rating"]].tolist(), [1, 0, 2.0])
+        frame = analytics.frame()
+        self.assertEqual(len(frame), 4)
+        self.assertEqual(frame["team"].tolist(), ["Sales", "Sales", "HR", "HR"])
+        with self.assertRaises(ValueError):
+            TaskAnalytics().frame()
+
+class TestAnalyticsRoutes(unittest.TestCase):
+    def test_ratings_feed_the_summary(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        agent_registry.load([{"id": 1, "tenant_id": "t1", "name": "Sales AI", "type": "Conversational", "status": "Active"}])
+        self.addCleanup(agent_registry.clear)
+        self.addCleanup(analytics_store.tenants.clear)
+        client = TestClient(app)
+        client.post("/agents/1/rating", json={"rating": 4})
+        summary = client.get("/analytics/summary", params={"days": 7}).json()
+        self.assertEqual(summary["events"], 1)
+        self.assertEqual([(team["team"], team["avg_rating"], team["tasks"]) for team in summary["teams"]], [("Conversational", 4.0, 0)])
+        self.assertIsNone(summary["correlation"]["day"]["r"])
+
+if __name__ == '__main__':
+    unittest.main()
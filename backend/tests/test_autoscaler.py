@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.agent_service import TaskDispatcher
+from backend.app.services.autoscaler import Autoscaler, ScalingPolicy, autoscalers
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakePool:
+    def __init__(self, workers):
+        self.workers = workers
+        self.reading = {}
+
+    def load(self):
+        return dict(self.reading, workers=self.workers)
+
+    async def resize(self, workers):
+        self.workers = workers
+
+class TestAutoscaler(unittest.IsolatedAsyncioTestCase):
+    def autoscaler(self, workers=2, **policy):
+        self.clock = Clock()
+        self.pool = FakePool(workers)
+        policy = ScalingPolicy(**dict(dict(trigger="queue_depth", scale_up_threshold=2, scale_down_threshold=0.5,
+                                           max_workers=10, sustain=2, up_cooldown=10, down_cooldown=60), **policy))
+        return Autoscaler("test", self.pool.load, self.pool.resize, policy, clock=self.clock)
+
+    async def step(self, autoscaler, queue_depth, seconds=5):
+        self.clock.now += seconds
+        self.pool.reading = {"queue_depth": queue_depth, "utilization": 0.0, "p95_wait": 0.0}
+        return await autoscaler.evaluate()
+
+    async def test_scales_up_proportionally_after_sustained_load_then_cools_down(self):
+        autoscaler = self.autoscaler()
+        self.assertIsNone(await self.step(autoscaler, 5))  # one reading is not enough
+        self.assertIsNone(await self.step(autoscaler, 1))  # inside the band resets the streak
+        self.assertIsNone(await self.step(autoscaler, 5))
+        decision = await self.step(autoscaler, 5)
+        # 2 workers at 2.5x the threshold would want 5, but one step at most doubles
+        self.assertEqual((decision["from"], decision["to"], decision["direction"]), (2, 4, "up"))
+        self.assertIsNone(await self.step(autoscaler, 5, seconds=1))
+        self.assertIsNone(await self.step(autoscaler, 5, seconds=1))  # cooling down
+        self.assertEqual((await self.step(autoscaler, 3, seconds=10))["to"], 6)
+        self.assertEqual(autoscaler.stats()["decisions"][-1]["from"], 4)
+
+    async def test_scales_down_gradually_within_bounds(self):
+        autoscaler = self.autoscaler(workers=3, min_workers=2, max_workers=3)
+        self.assertIsNone(await self.step(autoscaler, 0))
+        self.assertEqual((await self.step(autoscaler, 0, seconds=60))["to"], 2)
+        for _ in range(5):
+            self.assertIsNone(await self.step(autoscaler, 0, seconds=60))
+        for _ in range(5):
+            await self.step(autoscaler, 100, seconds=60)
+        self.assertEqual(self.pool.workers, 3)
+        autoscaler = self.autoscaler(workers=10, down_cooldown=0)
+        sizes = []
+        for _ in range(8):
+            await self.step(autoscaler, 0)
+            sizes.append(self.pool.workers)
+        self.assertEqual(sizes, [10, 8, 8, 6, 6, 5, 5, 4])
+
+    def test_policy_validation_and_trigger_defaults(self):
+        policy = ScalingPolicy()
+        policy.configure("p95_wait")
+        self.assertEqual((policy.scale_up_threshold, policy.scale_down_threshold), (500.0, 50.0))
+        policy.configure(scale_down_threshold=100)
+        self.assertEqual((policy.trigger, policy.scale_up_threshold), ("p95_wait", 500.0))
+        with self.assertRaises(ValueError):
+            policy.configure(scale_up_threshold=50)
+        with self.assertRaises(ValueError):
+            policy.configure("cpu")
+
+    async def test_drives_the_task_dispatcher_under_synthetic_load(self):
+        dispatcher = TaskDispatcher(workers=1, per_agent_limit=100, per_tenant_limit=100)
+        await dispatcher.start()
+        self.addAsyncCleanup(dispatcher.stop)
+        policy = ScalingPolicy("queue_depth", 1.0, 0.1, min_workers=1, max_workers=8, sustain=1, up_cooldown=0, down_cooldown=0)
+        autoscaler = Autoscaler("tasks", dispatcher.load, dispatcher.resize, policy)
+
+        async def work():
+            await asyncio.sleep(0.01)
+
+        for i in range(200):
+            await dispatcher.submit(i % 50, "t1", work)
+        while dispatcher.queued:
+            await autoscaler.evaluate()
+            await asyncio.sleep(0.01)
+        self.assertEqual(dispatcher.workers, 8)
+        self.assertGreater(dispatcher.load()["p95_wait"], 0)
+        while dispatcher.stats()["running"]:
+            await asyncio.sleep(0.01)
+        for _ in range(10):
+            await autoscaler.evaluate()
+        self.assertEqual(dispatcher.workers, 1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(dispatcher._worker_tasks), 1)
+        self.assertEqual([d["direction"] for d in autoscaler.decisions][:3], ["up", "up", "up"])
+
+class TestAutoscalingRoutes(unittest.TestCase):
+    def test_dashboard_trigger_and_thresholds_configure_every_pool(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1", role="admin")
+        self.addCleanup(app.dependency_overrides.clear)
+        policies = {name: autoscaler.policy.to_dict() for name, autoscaler in autoscalers.items()}
+
+        def restore():
+            for name, policy in policies.items():
+                autoscalers[name].policy.configure(policy["trigger"], policy["scale_up_threshold"], policy["scale_down_threshold"])
+        self.addCleanup(restore)
+        client = TestClient(app)
+        response = client.put("/autoscaling", json={"trigger": "p95_wait", "scale_up_threshold": 300})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({state["policy"]["trigger"] for state in response.json().values()}, {"p95_wait"})
+        self.assertEqual(response.json()["tasks"]["policy"]["scale_up_threshold"], 300)
+        self.assertEqual(client.put("/autoscaling", json={"scale_down_threshold": 400}).status_code, 400)
+        self.assertEqual(client.get("/autoscaling").json()["cpu"]["policy"]["scale_down_threshold"], 50.0)
+
+    def test_only_admins_change_policies(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        client = TestClient(app)
+        self.assertEqual(client.put("/autoscaling", json={"trigger": "p95_wait"}).status_code, 403)
+        self.assertEqual(client.get("/autoscaling").status_code, 200)
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com")
+        self.assertEqual(client.get("/autoscaling").status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+from backend.app.utils.batching import MicroBatcher
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = []
+
+    async def run_batch(self, key, items):
+        self.calls.append((key, list(items)))
+        await asyncio.sleep(0)
+        if "boom" in items:
+            raise ValueError("provider failed")
+        return [f"{key}:{item}" for item in items]
+
+    async def test_full_batches_go_out_without_waiting(self):
+        batcher = MicroBatcher(self.run_batch, max_batch=4, max_wait=10)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit("m", i) for i in range(8))), 1)
+        self.assertEqual(results, [f"m:{i}" for i in range(8)])
+        self.assertEqual(self.calls, [("m", [0, 1, 2, 3]), ("m", [4, 5, 6, 7])])
+        self.assertEqual(batcher.stats()["full_batches"], 2)
+
+    async def test_partial_batch_goes_out_after_max_wait_per_key(self):
+        batcher = MicroBatcher(self.run_batch, max_batch=100, max_wait=0.01)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(batcher.submit("a", 1), batcher.submit("b", 2), batcher.submit("a", 3))
+        self.assertGreaterEqual(loop.time() - started, 0.009)
+        self.assertEqual(results, ["a:1", "b:2", "a:3"])
+        self.assertEqual(sorted(self.calls), [("a", [1, 3]), ("b", [2])])
+        self.assertEqual(batcher.stats()["mean_batch_size"], 1.5)
+
+    async def test_errors_reach_every_caller_and_cancelled_callers_do_not_stop_the_batch(self):
+        batcher = MicroBatcher(self.run_batch, max_batch=100, max_wait=0.01)
+        results = await asyncio.gather(batcher.submit("m", "boom"), batcher.submit("m", "ok"), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        gone = asyncio.ensure_future(batcher.submit("m", "gone"))
+        stays = asyncio.ensure_future(batcher.submit("m", "stays"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        self.assertEqual(await stays, "m:stays")
+        self.assertEqual(self.calls[-1], ("m", ["gone", "stays"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from backend.app.utils.cache import MISSING, NOT_FOUND, TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, negative_ttl=1, timer=self.clock)
+
+    def test_lru_eviction(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertIs(self.cache.get("b"), MISSING)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_ttl_and_negative_entries(self):
+        self.cache.set("a", 1)
+        self.cache.set_not_found("b")
+        self.assertIs(self.cache.get("b"), NOT_FOUND)
+        self.clock.now = 2
+        self.assertIs(self.cache.get("b"), MISSING)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.clock.now = 11
+        self.assertIs(self.cache.get("a"), MISSING)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (2, 2, 2))
+
+    def test_invalidate_prefix(self):
+        self.cache.set(("1", "t1"), "x")
+        self.cache.set(("2", "t1"), "y")
+        self.assertEqual(self.cache.invalidate_prefix(("1",)), 1)
+        self.assertNotIn(("1", "t1"), self.cache)
+        self.assertIn(("2", "t1"), self.cache)
+
+if __name__ == '__main__':
+    unittest.main()
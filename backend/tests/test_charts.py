@@ -0,0 +1,70 @@
+import json
+import time
+import unittest
+import numpy as np
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.metrics_store import metrics_store
+from backend.app.utils.downsample import lttb
+from frontend.components.charts import FigureCache, analytics_charts
+
+class TestLTTB(unittest.TestCase):
+    def test_keeps_endpoints_and_peaks(self):
+        x = np.arange(10_000.0)
+        y = np.sin(x / 500)
+        y[4321] = 50
+        keep = lttb(x, y, 100)
+        self.assertEqual(len(keep), 100)
+        self.assertEqual((keep[0], keep[-1]), (0, 9999))
+        self.assertTrue((np.diff(keep) > 0).all())
+        self.assertIn(4321, keep)
+        self.assertEqual(lttb(x[:5], y[:5], 10).tolist(), [0, 1, 2, 3, 4])
+
+class TestCharts(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t-charts")
+        self.addCleanup(app.dependency_overrides.clear)
+        self.addCleanup(metrics_store._series.clear)
+        self.addCleanup(metrics_store._dirty.clear)
+        self.client = TestClient(app)
+        self.now = time.time()
+        for minute in range(1, 1440):
+            metrics_store.record("t-charts", "tasks_completed", minute % 7, self.now - minute * 60)
+
+    def test_metrics_are_downsampled_to_max_points(self):
+        params = {"metric": "tasks_completed", "start": self.now - 86400, "end": self.now, "points": 600}
+        full = self.client.get("/metrics", params=params).json()
+        thin = self.client.get("/metrics", params=dict(params, max_points=300)).json()
+        self.assertEqual(full["resolution"], 60)
+        self.assertGreater(len(full["series"]["tasks_completed"]), 1400)
+        self.assertEqual(len(thin["series"]["tasks_completed"]), 300)
+        self.assertEqual(thin["version"], full["version"])
+        metrics_store.record("t-charts", "tasks_completed", 1)
+        self.assertGreater(self.client.get("/metrics", params=params).json()["version"], full["version"])
+
+    def test_figures_are_cached_by_version_and_timeframe(self):
+        cache = FigureCache()
+        with patch("frontend.components.charts.time.time", return_value=self.now):
+            charts, status = analytics_charts("Last Day", self.client, cache)
+            self.assertEqual(status, "Last Day at 1 minute resolution; team charts show sample data until tasks are recorded")
+            tasks = json.loads(charts[1][1].plot)
+            self.assertLessEqual(len(tasks["data"][0]["x"]), 600)
+            again, _ = analytics_charts("Last Day", self.client, cache)
+            self.assertTrue(all(a[1] is b[1] for a, b in zip(charts, again)))
+            self.assertEqual((cache.hits, cache.misses), (6, 6))
+            analytics_charts("Last Hour", self.client, cache)
+            self.assertEqual(cache.misses, 9)
+            metrics_store.record("t-charts", "avg_rating", 4)
+            changed, _ = analytics_charts("Last Day", self.client, cache)
+            self.assertIsNot(changed[1][1], charts[1][1])
+
+    def test_sample_data_without_a_backend(self):
+        app.dependency_overrides.clear()
+        charts, status = analytics_charts("Last Day", self.client, FigureCache())
+        self.assertTrue(status.startswith("Showing sample data"))
+        self.assertEqual(len(charts), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import httpx
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.llm_service import FakeProvider, llm_gateway
+from frontend.components.chat_stream import chat_events, stream_reply
+
+class TestChatStream(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        providers = patch.dict(llm_gateway.providers, {"openai": FakeProvider(latency=0)}, clear=True)
+        providers.start()
+        self.addCleanup(providers.stop)
+        self.addCleanup(app.dependency_overrides.clear)
+        self.client = TestClient(app)
+
+    def test_tokens_then_timings(self):
+        events = list(chat_events("hello", model="GPT-4", client=self.client))
+        self.assertEqual("".join(data["text"] for event, data in events if event == "token"), "Response for the prompt: hello")
+        self.assertGreater(len(events), 2)
+        event, done = events[-1]
+        self.assertEqual((event, done["model"]), ("done", "GPT-4"))
+        self.assertLessEqual(done["ttft"], done["latency"])
+
+    def test_reply_grows_as_tokens_arrive(self):
+        replies = list(stream_reply("hello", client=self.client))
+        self.assertEqual(replies[-1], "Response for the prompt: hello")
+        self.assertTrue(all(later.startswith(earlier) for earlier, later in zip(replies, replies[1:])))
+
+    def test_unknown_or_unserved_model(self):
+        self.assertEqual(self.client.post("/chat/stream", json={"message": "hi", "model": "GPT-9"}).status_code, 400)
+        self.assertEqual(self.client.post("/chat/stream", json={"message": "hi", "model": "Claude"}).status_code, 503)
+
+    def test_backend_errors_end_the_reply(self):
+        down = httpx.Client(base_url="http://backend.test", transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        replies = list(stream_reply("hi", client=down))
+        self.assertEqual(len(replies), 1)
+        self.assertIn("[Assistant unavailable:", replies[0])
+        self.assertIn("503", replies[0])
+
+if __name__ == '__main__':
+    unittest.main()
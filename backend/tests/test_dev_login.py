@@ -0,0 +1,90 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import httpx
+from dev import login
+
+BLOCKING_CALL_SECONDS = 0.05
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def upsert(self, row, returning=None):
+        self.rows = row
+        return self
+
+    def execute(self):
+        time.sleep(BLOCKING_CALL_SECONDS)
+        with self.client.lock:
+            self.client.calls.append((self.table, self.rows))
+        data = [self.rows] if isinstance(self.rows, dict) else self.rows
+        return type("Result", (), {"data": data})()
+
+class FakeSupabase:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.auth = self
+
+    def sign_in_with_password(self, credentials):
+        time.sleep(BLOCKING_CALL_SECONDS)
+        return {"user": credentials["email"]}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+class TestLoginBurst(unittest.IsolatedAsyncioTestCase):
+    async def test_login_burst_does_not_stall_event_loop(self):
+        fake = FakeSupabase()
+        activity_log = login.ActivityLogBuffer(login.insert_activity_rows, batch_size=50, flush_interval=0.05)
+        with patch.object(login, "supabase", fake), patch.object(login, "activity_log", activity_log):
+            activity_log.start()
+            gaps = []
+            done = asyncio.Event()
+
+            async def ticker():
+                last = time.perf_counter()
+                while not done.is_set():
+                    await asyncio.sleep(0.005)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+
+            transport = httpx.ASGITransport(app=login.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                tick = asyncio.create_task(ticker())
+                responses = await asyncio.gather(*(
+                    client.post("/api/login", json={"email": f"user{i}@example.com", "password": "pw"})
+                    for i in range(20)
+                ))
+                done.set()
+                await tick
+            await activity_log.stop()
+
+        self.assertTrue(all(r.json()["success"] for r in responses))
+        self.assertEqual(responses[0].json()["user_data"]["email"], "user0@example.com")
+        # 20 logins x 2 blocking calls would stall a blocked loop for ~2s in total; compare
+        # against that rather than a per-tick bound, which a GC pause can exceed
+        blocked_seconds = 20 * 2 * BLOCKING_CALL_SECONDS
+        stalled = sum(max(0.0, gap - 0.005) for gap in gaps)
+        self.assertLess(stalled, blocked_seconds / 4)
+        log_inserts = [rows for table, rows in fake.calls if table == "logs"]
+        self.assertEqual(sum(len(rows) for rows in log_inserts), 20)
+        self.assertLess(len(log_inserts), 20)
+
+if __name__ == '__main__':
+    unittest.main()
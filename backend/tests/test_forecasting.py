@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+import numpy as np
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from unittest.mock import patch
+from backend.app.services.forecasting import GRID, Forecaster, smooth
+from backend.app.services.metrics_store import DAY, MetricsStore
+
+FIRST_DAY = 19700  # a day number, 2023-12-09
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def weekly(days, level=100.0, slope=0.5, amplitude=20.0):
+    day = np.arange(days)
+    return level + slope * day + amplitude * np.sin(2 * np.pi * (FIRST_DAY + day) / 7)
+
+class TestForecaster(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock((FIRST_DAY + 120) * DAY + 3600)
+        self.store = MetricsStore(raw_capacity=16, clock=self.clock)
+        self.forecaster = Forecaster(self.store, refit_every=30)
+        for tenant_id, scale in (("t1", 1.0), ("t2", 3.0)):
+            for day, value in enumerate(weekly(120) * scale):
+                self.store.record(tenant_id, "tasks_completed", value, (FIRST_DAY + day) * DAY + 60)
+
+    def test_forecast_follows_trend_and_season(self):
+        result = self.forecaster.forecast("t1", "tasks_completed", 14)
+        expected = weekly(134)[120:]
+        values = np.array([point["value"] for point in result["forecast"]])
+        self.assertLess(np.abs(values - expected).max() / expected.mean(), 0.05)
+        self.assertEqual(result["forecast"][0]["t"], (FIRST_DAY + 120) * DAY)
+        self.assertTrue(all(p["lower"] <= p["value"] <= p["upper"] for p in result["forecast"]))
+        self.assertEqual(len(result["history"]), 90)
+        self.assertEqual(result["model"]["observations"], 120)
+
+    def test_batched_smoothing_matches_one_series_at_a_time(self):
+        rng = np.random.default_rng(1)
+        y = weekly(60) + rng.normal(0, 5, (3, 60))
+        y[1, :10] = np.nan  # starts later
+        y[2, 30:33] = np.nan  # gap
+        params = GRID[[0, 17, 79]]
+        batched = smooth(y, FIRST_DAY, params)
+        for row in range(3):
+            single = smooth(y[row:row + 1], FIRST_DAY, params[row:row + 1])
+            np.testing.assert_allclose([batched.level[row], batched.trend[row], batched.sse[row]],
+                                       [single.level[0], single.trend[0], single.sse[0]])
+            np.testing.assert_allclose(batched.season[row], single.season[0])
+
+    def test_models_are_cached_and_carried_forward_over_new_days(self):
+        first = self.forecaster.forecast("t1", "tasks_completed", 30)
+        self.assertEqual(self.forecaster.refresh(), 1)  # t2 fitted in the same pass
+        self.assertEqual(self.forecaster.fits, 2)
+        self.assertIs(self.forecaster.forecast("t1", "tasks_completed", 30), first)
+        # Samples of today do not touch the model
+        self.store.record("t1", "tasks_completed", 10, self.clock.now)
+        self.assertIs(self.forecaster.forecast("t1", "tasks_completed", 30), first)
+        # A new complete day is smoothed on with the fitted parameters
+        model = self.forecaster.models[("t1", "tasks_completed")]
+        self.clock.now += DAY
+        self.forecaster.forecast("t1", "tasks_completed", 30)
+        self.assertEqual((self.forecaster.fits, self.forecaster.updates), (2, 1))
+        _, y = self.forecaster.history("t1", "tasks_completed", FIRST_DAY + 121)
+        full = smooth(y[None, :], FIRST_DAY, model.params[None, :])
+        np.testing.assert_allclose([model.state.level[0], model.state.trend[0]], [full.level[0], full.trend[0]])
+        # A changed past day means a new grid search
+        self.store.record("t1", "tasks_completed", 50, (FIRST_DAY + 3) * DAY)
+        self.forecaster.forecast("t1", "tasks_completed", 30)
+        self.assertEqual(self.forecaster.fits, 3)
+
+    def test_thread_refresh_does_not_overwrite_newer_models(self):
+        forecaster = self.forecaster
+
+        # A request refreshes t1 after a new day while the worker thread smooths the old snapshot
+        def smooth_late(*args):
+            results = Forecaster._smooth(forecaster, *args)
+            if self.clock.now < (FIRST_DAY + 121) * DAY:
+                self.clock.now += DAY
+                forecaster.refresh([("t1", "tasks_completed")])
+            return results
+
+        with patch.object(forecaster, "_smooth", side_effect=smooth_late):
+            self.assertEqual(asyncio.run(forecaster.refresh_in_thread()), 2)
+        self.assertEqual(forecaster.fits, 2)
+        self.assertEqual(forecaster.models[("t1", "tasks_completed")].today, FIRST_DAY + 121)
+        self.assertEqual(forecaster.models[("t2", "tasks_completed")].today, FIRST_DAY + 120)
+
+    def test_bounds_and_missing_series(self):
+        for day in range(20):
+            self.store.record("t1", "avg_rating", 4.9 + 0.005 * day, (FIRST_DAY + 100 + day) * DAY)
+        result = self.forecaster.forecast("t1", "avg_rating", 365)
+        self.assertTrue(all(0 <= p["lower"] <= p["upper"] <= 5 for p in result["forecast"]))
+        self.assertEqual(self.forecaster.forecast("t3", "avg_rating", 7)["forecast"], [])
+        with self.assertRaises(ValueError):
+            self.forecaster.forecast("t1", "uptime", 7)
+
+class TestForecastRoutes(unittest.TestCase):
+    def test_forecast_endpoint(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t-forecast")
+        self.addCleanup(app.dependency_overrides.clear)
+        client = TestClient(app)
+        response = client.get("/forecast", params={"metric": "tasks_completed", "horizon": 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["forecast"], [])
+        self.assertEqual(client.get("/forecast", params={"metric": "uptime"}).status_code, 400)
+        self.assertEqual(client.get("/forecast", params={"metric": "avg_rating", "horizon": 1000}).status_code, 422)
+
+if __name__ == '__main__':
+    unittest.main()
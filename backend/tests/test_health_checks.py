@@ -0,0 +1,161 @@
+import asyncio
+import random
+import unittest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.agent_registry import agent_registry
+from backend.app.services.agent_service import TaskDispatcher
+from backend.app.services.health_checks import HealthChecker, health_checker
+from backend.app.utils.timer_wheel import TimerWheel
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTimerWheel(unittest.TestCase):
+    def test_timers_expire_on_their_tick_across_levels(self):
+        wheel = TimerWheel(size=4, levels=3, now=5)
+        rng = random.Random(7)
+        deadlines = [rng.randrange(0, 200) for _ in range(500)]
+        for i, deadline in enumerate(deadlines):
+            wheel.schedule(deadline, i)
+        cancelled = wheel.schedule(30, "cancelled")
+        cancelled.cancel()
+        fired = {i: 5 for i in wheel.advance(5)}  # already due
+        for tick in range(6, 201):
+            for i in wheel.advance(tick):
+                fired[i] = tick
+        self.assertNotIn("cancelled", fired)
+        self.assertEqual(fired, {i: max(5, deadline) for i, deadline in enumerate(deadlines)})
+        self.assertEqual(wheel.pending, 0)
+
+    def test_advancing_several_ticks_at_once(self):
+        wheel = TimerWheel(size=8, levels=2)
+        for deadline in (3, 70, 1000):  # the last is beyond the wheel, in the overflow list
+            wheel.schedule(deadline, deadline)
+        self.assertEqual(wheel.advance(69), [3])
+        self.assertEqual(wheel.advance(999), [70])
+        self.assertEqual(wheel.advance(1000), [1000])
+
+class TestHealthChecker(unittest.IsolatedAsyncioTestCase):
+    def checker(self, results, **kwargs):
+        self.clock = Clock()
+        self.probed, self.recovered = [], []
+
+        async def probe(check):
+            self.probed.append((check.agent_id, self.clock.now))
+            result = results.get(check.agent_id, True)
+            if isinstance(result, Exception):
+                raise result
+            if result == "hang":
+                await asyncio.sleep(10)
+            return result
+
+        async def recover(check):
+            self.recovered.append((check.agent_id, check.action))
+        return HealthChecker(probe, recover, tick=1, jitter=0.1, timeout=0.01, clock=self.clock, seed=1, **kwargs)
+
+    async def run_for(self, checker, seconds):
+        for _ in range(seconds):
+            self.clock.now += 1
+            checker.poll()
+            await asyncio.sleep(0)
+            await asyncio.gather(*checker._inflight)
+
+    async def test_recovery_runs_after_consecutive_failures(self):
+        checker = self.checker({1: True, 2: False, 3: RuntimeError("down"), 4: "hang"})
+        for agent_id, action in ((1, "restart"), (2, "restart"), (3, "reassign"), (4, "alert")):
+            checker.register(agent_id, interval=10, action=action, failure_threshold=3)
+        await self.run_for(checker, 36)
+        self.assertEqual(sorted(self.recovered), [(2, "restart"), (3, "reassign"), (4, "alert")])
+        self.assertEqual(checker.checks[1].to_dict()["failures"], 0)
+        self.assertEqual(checker.checks[3].last_error, "RuntimeError: down")
+        self.assertIn("Timed out", checker.checks[4].last_error)
+        # First runs are spread over the interval, later ones are 10s +-10% apart and never early
+        times = [now for agent_id, now in self.probed if agent_id == 1]
+        self.assertLessEqual(times[0], 10)
+        self.assertTrue(all(9 <= later - earlier <= 12 for earlier, later in zip(times, times[1:])))
+        checker.unregister(2)
+        probes = len(self.probed)
+        await self.run_for(checker, 30)
+        self.assertEqual(sum(agent_id == 2 for agent_id, _ in self.probed[probes:]), 0)
+
+    async def test_concurrency_is_bounded(self):
+        running = []
+        gate = asyncio.Event()
+
+        async def probe(check):
+            running.append(check.agent_id)
+            await gate.wait()
+            return True
+
+        async def recover(check):
+            pass
+        clock = Clock()
+        checker = HealthChecker(probe, recover, tick=1, clock=clock, max_concurrency=5, seed=1)
+        for agent_id in range(50):
+            checker.register(agent_id, interval=1)
+        clock.now = 2
+        checker.poll()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertEqual((len(running), checker.stats()["waiting"]), (5, 45))
+        gate.set()
+        while checker._due or checker._inflight:
+            await asyncio.sleep(0)
+        self.assertEqual(sorted(running), list(range(50)))
+
+    async def test_restart_and_reassign_act_on_the_dispatcher(self):
+        dispatcher = TaskDispatcher(workers=2)
+        await dispatcher.start()
+        self.addAsyncCleanup(dispatcher.stop)
+        started = asyncio.Event()
+
+        async def stuck():
+            started.set()
+            await asyncio.sleep(60)
+        await dispatcher.submit(1, "t1", stuck)
+        queued = [await dispatcher.submit(1, "t1", lambda: asyncio.sleep(0)) for _ in range(3)]
+        await started.wait()
+        self.assertIsNotNone(dispatcher.running_seconds(1))
+        self.assertEqual(await dispatcher.reassign(1, 2), 3)
+        for task_id in queued:
+            while dispatcher.status(task_id)["status"] != "completed":
+                await asyncio.sleep(0)
+        self.assertEqual(dispatcher.status(queued[0])["agent_id"], 2)
+        self.assertEqual(dispatcher.cancel_running(1), 1)
+
+        async def released():
+            while dispatcher.running_seconds(1) is not None:
+                await asyncio.sleep(0)
+        await asyncio.wait_for(released(), 1)
+
+class TestHealthCheckRoutes(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        agent_registry.load([
+            {"id": 1, "tenant_id": "t1", "name": "Sales AI", "type": "Conversational", "status": "Active"},
+            {"id": 2, "tenant_id": "t2", "name": "Other", "type": "Conversational", "status": "Active"},
+        ])
+        self.addCleanup(agent_registry.clear)
+        self.addCleanup(health_checker.checks.clear)
+        self.client = TestClient(app)
+
+    def test_setup_inspect_and_remove(self):
+        response = self.client.put("/agents/1/health-check", json={"interval": 60, "action": "restart"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["action"], response.json()["failure_threshold"]), ("restart", 3))
+        self.assertEqual(self.client.get("/agents/1/health-check").json()["interval"], 60)
+        self.assertEqual(self.client.get("/health-checks").json()["checks"], 1)
+        self.assertEqual(self.client.put("/agents/1/health-check", json={"interval": 60, "action": "reboot"}).status_code, 400)
+        self.assertEqual(self.client.put("/agents/2/health-check", json={"interval": 60}).status_code, 404)
+        self.assertEqual(self.client.delete("/agents/1/health-check").status_code, 200)
+        self.assertEqual(self.client.get("/agents/1/health-check").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from backend.app.utils.jwt_cache import ClaimsCache
+
+class FakeDecoder:
+    def __init__(self, claims):
+        self.claims = claims
+        self.calls = 0
+
+    def __call__(self, token, secret, algorithms):
+        self.calls += 1
+        if secret != "secret":
+            raise ValueError("bad signature")
+        return dict(self.claims)
+
+class TestClaimsCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = ClaimsCache(maxsize=10, max_ttl=300, clock=lambda: self.now)
+        self.decoder = FakeDecoder({"sub": "ada@example.com", "exp": 1060})
+
+    def test_repeat_tokens_skip_decode(self):
+        for _ in range(3):
+            claims = self.cache.decode("token", "secret", ["HS256"], self.decoder)
+        self.assertEqual(claims["sub"], "ada@example.com")
+        self.assertEqual(self.decoder.calls, 1)
+
+    def test_entries_never_outlive_exp(self):
+        self.cache.decode("token", "secret", ["HS256"], self.decoder)
+        self.now = 1061
+        self.cache.decode("token", "secret", ["HS256"], self.decoder)
+        self.assertEqual(self.decoder.calls, 2)
+
+    def test_secret_rotation_flushes_cache(self):
+        self.cache.decode("token", "secret", ["HS256"], self.decoder)
+        with self.assertRaises(ValueError):
+            self.cache.decode("token", "rotated", ["HS256"], self.decoder)
+        self.assertEqual(len(self.cache.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from backend.app.services import llm_service
+from backend.app.services.llm_cache import LLMResponseCache, SQLiteResponseStore, cache_key, is_deterministic
+from backend.app.services.llm_service import FakeProvider, LLMGateway, get_llm_response
+from backend.app.utils.cache import MISSING, TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestCacheKey(unittest.TestCase):
+    def test_canonical_key(self):
+        base = cache_key("GPT-4", "hi", {"temperature": 0, "stop": "\n", "max_tokens": 256})
+        self.assertEqual(base, cache_key("GPT-4", "hi", {"max_tokens": 256, "stop": ["\n"], "temperature": 0.0}))
+        self.assertNotEqual(base, cache_key("GPT-4", "hi", {"temperature": 0, "stop": "\n", "max_tokens": 256, "top_p": 0.9}))
+        self.assertNotEqual(base, cache_key("GPT-3.5", "hi", {"temperature": 0, "stop": "\n", "max_tokens": 256}))
+
+    def test_only_temperature_zero_is_deterministic(self):
+        self.assertTrue(is_deterministic({"temperature": 0}))
+        self.assertFalse(is_deterministic({"temperature": 0.7}))
+        self.assertFalse(is_deterministic({}))
+
+class TestSQLiteResponseStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "llm.sqlite3")
+        self.clock = FakeClock()
+
+    def store(self, **kwargs):
+        store = SQLiteResponseStore(self.path, clock=self.clock, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_survives_reopen_and_expires(self):
+        store = self.store(ttl=60)
+        store.set("k", {"text": "cached"})
+        store.close()
+        reopened = self.store(ttl=60)
+        self.assertEqual(reopened.get("k"), {"text": "cached"})
+        self.clock.now += 61
+        self.assertIs(reopened.get("k"), MISSING)
+
+    def test_evicts_least_recently_used(self):
+        store = self.store(max_entries=3)
+        for key in "abc":
+            store.set(key, {"text": key})
+            self.clock.now += 1
+        store.get("a")
+        self.clock.now += 1
+        store.set("d", {"text": "d"})
+        self.assertIs(store.get("b"), MISSING)
+        self.assertEqual(len(store), 3)
+        small = SQLiteResponseStore(self.path + "-small", max_bytes=100, clock=self.clock)
+        self.addCleanup(small.close)
+        for i in range(10):
+            small.set(str(i), {"text": "x" * 20})
+            self.clock.now += 1
+        self.assertLessEqual(len(small), 3)
+        self.assertEqual(small.get("9"), {"text": "x" * 20})
+
+class TestCachedResponses(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.provider = FakeProvider(latency=0.01)
+        self.store = SQLiteResponseStore(os.path.join(directory.name, "llm.sqlite3"))
+        self.addCleanup(self.store.close)
+        cache = LLMResponseCache(TTLCache(maxsize=100, ttl=60), self.store)
+        for name, value in (("llm_gateway", LLMGateway(providers={"openai": self.provider})), ("llm_cache", cache)):
+            patcher = patch.object(llm_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_deterministic_requests_are_cached_per_agent(self):
+        answers = await asyncio.gather(*(get_llm_response("hi", model="GPT-4", agent_id=1, temperature=0) for _ in range(5)))
+        self.assertEqual(set(answers), {"Response for the prompt: hi"})
+        await get_llm_response("hi", model="GPT-4", agent_id=2, temperature=0)
+        # Concurrent misses share one provider call, later calls hit the cache
+        self.assertEqual(self.provider.calls, 1)
+        self.assertEqual(llm_service.llm_cache.stats(2)["hit_ratio"], 1.0)
+        llm_service.llm_cache.memory.clear()
+        await get_llm_response("hi", model="GPT-4", agent_id=2, temperature=0)
+        self.assertEqual(llm_service.llm_cache.stats(2)["disk_hits"], 1)
+        self.assertEqual(self.provider.calls, 1)
+
+    async def test_sampled_requests_bypass_the_cache(self):
+        for _ in range(2):
+            await get_llm_response("hi", model="GPT-4", agent_id=1, temperature=0.7)
+        self.assertEqual(self.provider.calls, 2)
+        self.assertEqual(llm_service.llm_cache.stats(1)["bypassed"], 2)
+        self.assertEqual(len(self.store), 0)
+
+if __name__ == '__main__':
+    unittest.main()
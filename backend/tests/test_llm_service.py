@@ -0,0 +1,137 @@
+import asyncio
+import json
+import unittest
+import httpx
+from backend.app.services.llm_service import FakeBatchedProvider, FakeProvider, LLMGateway, OpenAICompatibleProvider, get_llm_response
+
+class TestLLMGateway(unittest.IsolatedAsyncioTestCase):
+    def gateway(self, provider, **kwargs):
+        return LLMGateway(providers={"openai": provider, "anthropic": provider}, **kwargs)
+
+    async def test_model_concurrency_cap_queues_instead_of_failing(self):
+        provider = FakeProvider(latency=0.02)
+        gateway = self.gateway(provider, model_concurrency=3, tenant_concurrency=0)
+        results = await asyncio.gather(*(gateway.complete("GPT-4", f"q{i}", tenant_id="t1") for i in range(10)))
+        self.assertEqual(provider.max_inflight, 3)
+        self.assertEqual([r["text"] for r in results], [f"Response for the prompt: q{i}" for i in range(10)])
+        self.assertEqual(gateway.stats()["models"]["GPT-4"], {"queued": 0, "inflight": 0, "completed": 10, "failed": 0})
+
+    async def test_tenant_concurrency_is_shared_across_models(self):
+        provider = FakeProvider(latency=0.02)
+        gateway = self.gateway(provider, model_concurrency=10, tenant_concurrency=2)
+        await asyncio.gather(*(gateway.complete(model, "q", tenant_id="t1") for model in ["GPT-4", "Claude"] * 3))
+        self.assertEqual(provider.max_inflight, 2)
+
+    async def test_tenant_rate_limit_comes_from_lookup(self):
+        lookups = []
+
+        async def rate_limit(tenant_id):
+            lookups.append(tenant_id)
+            return 60 if tenant_id == "slow" else None
+
+        gateway = self.gateway(FakeProvider(latency=0), tenant_rate_limit=rate_limit)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(gateway.complete("GPT-3.5", "q", tenant_id="fast") for _ in range(20)))
+        fast = loop.time() - started
+        started = loop.time()
+        await asyncio.gather(*(gateway.complete("GPT-3.5", "q", tenant_id="slow") for _ in range(12)))
+        slow = loop.time() - started
+        self.assertLess(fast, 0.1)
+        # 60/min is 1 request/s with a 10-request burst: the last two wait about a second each
+        self.assertGreater(slow, 1.5)
+        self.assertEqual(lookups, ["fast", "slow"])
+
+    async def test_unknown_model_and_unconfigured_provider(self):
+        gateway = LLMGateway(providers={})
+        with self.assertRaises(LookupError):
+            await gateway.complete("GPT-4", "q")
+
+    async def test_openai_compatible_provider(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertEqual(body["model"], "gpt-4")
+            self.assertEqual(body["max_tokens"], 256)
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": "hi"}}],
+                "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+            })
+
+        provider = OpenAICompatibleProvider("http://llm.test/v1", "key", transport=httpx.MockTransport(handler))
+        result = await self.gateway(provider).complete("GPT-4", "hello")
+        self.assertEqual((result["text"], result["prompt_tokens"], result["completion_tokens"]), ("hi", 3, 1))
+        await provider.aclose()
+
+    async def test_stream_yields_tokens_and_records_time_to_first_token(self):
+        provider = FakeProvider(latency=0.02, token_interval=0.01)
+        gateway = self.gateway(provider, model_concurrency=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        arrivals = []
+        async for chunk in gateway.stream("GPT-4", "hi there", tenant_id="t1"):
+            arrivals.append((loop.time() - started, chunk))
+        self.assertEqual("".join(chunk for _, chunk in arrivals), "Response for the prompt: hi there")
+        # The first word arrives after the provider latency, long before the last one
+        self.assertLess(arrivals[0][0], arrivals[-1][0] - 0.03)
+        timings = gateway.stats()["timings"]["GPT-4"]
+        self.assertEqual((timings["ttft"]["count"], timings["latency"]["count"]), (1, 1))
+        self.assertLess(timings["ttft"]["p50"], timings["latency"]["p50"])
+        self.assertEqual(gateway.stats()["models"]["GPT-4"], {"queued": 0, "inflight": 0, "completed": 1, "failed": 0})
+
+    async def test_openai_compatible_provider_stream(self):
+        def handler(request):
+            self.assertTrue(json.loads(request.content)["stream"])
+            lines = [f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}" for text in ("Hel", "lo")]
+            return httpx.Response(200, text="\n\n".join(lines + ["data: [DONE]"]) + "\n\n",
+                                  headers={"Content-Type": "text/event-stream"})
+
+        provider = OpenAICompatibleProvider("http://llm.test/v1", transport=httpx.MockTransport(handler))
+        chunks = [chunk async for chunk in self.gateway(provider).stream("GPT-4", "hello")]
+        self.assertEqual(chunks, ["Hel", "lo"])
+        await provider.aclose()
+
+    async def test_concurrent_requests_share_batches_per_model_and_params(self):
+        provider = FakeBatchedProvider(latency=0.01, per_item=0, slots=1)
+        gateway = self.gateway(provider, model_concurrency=0, tenant_concurrency=0, batch_max_size=8, batch_max_wait=0.005)
+        calls = [gateway.complete("GPT-4", f"q{i}", tenant_id="t1") for i in range(16)]
+        calls.append(gateway.complete("GPT-4", "hot", temperature=1.0))
+        results = await asyncio.gather(*calls)
+        self.assertEqual([r["text"] for r in results[:16]], [f"Response for the prompt: q{i}" for i in range(16)])
+        self.assertEqual(sorted(provider.batch_sizes), [1, 8, 8])
+        self.assertEqual(gateway.stats()["models"]["GPT-4"]["completed"], 17)
+
+    async def test_full_batch_is_not_held_back_by_concurrency_caps(self):
+        provider = FakeBatchedProvider(latency=0.01, per_item=0, slots=4)
+        gateway = self.gateway(provider, model_concurrency=2, tenant_concurrency=1, batch_max_size=8, batch_max_wait=5)
+        calls = [gateway.complete("GPT-4", f"q{i}", tenant_id="t1") for i in range(16)]
+        results = await asyncio.wait_for(asyncio.gather(*calls), timeout=1)
+        self.assertEqual(len(results), 16)
+        self.assertEqual(provider.batch_sizes, [8, 8])
+        self.assertLessEqual(provider.max_inflight, 2)  # one model slot per batch
+
+    async def test_openai_compatible_provider_batch(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertEqual(request.url.path, "/v1/completions")
+            # Choices may come back out of order
+            return httpx.Response(200, json={"choices": [
+                {"index": i, "text": prompt.upper()} for i, prompt in reversed(list(enumerate(body["prompt"])))
+            ]})
+
+        provider = OpenAICompatibleProvider("http://llm.test/v1", transport=httpx.MockTransport(handler), batching=True)
+        gateway = self.gateway(provider, batch_max_size=2, batch_max_wait=1)
+        results = await asyncio.gather(gateway.complete("GPT-4", "a"), gateway.complete("GPT-4", "b"))
+        self.assertEqual([r["text"] for r in results], ["A", "B"])
+        await provider.aclose()
+
+    async def test_get_llm_response_uses_shared_gateway(self):
+        from backend.app.services import llm_service
+        original = llm_service.llm_gateway
+        llm_service.llm_gateway = self.gateway(FakeProvider(latency=0))
+        try:
+            self.assertEqual(await get_llm_response("hi", model="GPT-4"), "Response for the prompt: hi")
+        finally:
+            llm_service.llm_gateway = original
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from collections import Counter
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import httpx
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.llm_service import FakeProvider, LLMGateway
+from backend.app.services.load_balancer import BalancedProvider, LoadBalancer
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestLoadBalancer(unittest.IsolatedAsyncioTestCase):
+    def balancer(self, names="abc", **kwargs):
+        self.clock = Clock()
+        return LoadBalancer({name: name for name in names}, clock=self.clock, seed=1, **kwargs)
+
+    async def call(self, balancer, latency=0.0, error=None):
+        async with balancer.endpoint() as endpoint:
+            self.clock.now += latency
+            if error is not None:
+                raise error
+            return endpoint.name
+
+    async def test_round_robin_and_least_outstanding(self):
+        balancer = self.balancer(strategy="round_robin")
+        self.assertEqual([balancer.pick().name for _ in range(6)], list("bcabca"))
+        balancer.set_strategy("least_outstanding")
+        a, b, c = balancer.endpoints
+        a.outstanding, b.outstanding, c.outstanding = 3, 1, 2
+        self.assertEqual(balancer.pick().name, "b")
+        with self.assertRaises(ValueError):
+            balancer.set_strategy("ip_hash")
+
+    async def test_ewma_prefers_fast_endpoints_and_p2c_the_less_loaded(self):
+        balancer = self.balancer(strategy="ewma", outlier_factor=0)
+        a, b, c = balancer.endpoints
+        a.ewma, b.ewma, c.ewma = 0.1, 0.5, 0.3
+        self.assertEqual(balancer.pick().name, "a")
+        a.outstanding = 5  # 0.6 per unit of work now
+        self.assertEqual(balancer.pick().name, "c")
+        balancer.set_strategy("p2c")
+        a.outstanding, b.outstanding, c.outstanding = 10, 0, 0
+        self.assertEqual(Counter(balancer.pick().name for _ in range(300))["a"], 0)
+
+    async def test_consecutive_failures_eject_for_a_while(self):
+        balancer = self.balancer(strategy="round_robin", eject_after=2, ejection_time=10, max_ejected_fraction=0.5)
+        a = balancer.endpoints[0]
+        for _ in range(2):
+            balancer._next = -1  # pick "a"
+            with self.assertRaises(httpx.ConnectError):
+                await self.call(balancer, error=httpx.ConnectError("down"))
+        self.assertEqual(a.ejections, 1)
+        self.assertNotIn("a", {balancer.pick().name for _ in range(10)})
+        # A 400 is the request's fault and does not count against the endpoint
+        request = httpx.Request("POST", "http://b")
+        balancer._next = 0
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.call(balancer, error=httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400)))
+        self.assertEqual(balancer.endpoints[1].failures, 0)
+        self.clock.now += 11
+        self.assertIn("a", {balancer.pick().name for _ in range(10)})
+
+    async def test_slow_outlier_is_ejected_but_never_too_many(self):
+        balancer = self.balancer("abcd", strategy="round_robin", outlier_factor=3, min_samples=5, max_ejected_fraction=0.3)
+        for _ in range(10):
+            for name, latency in zip("abcd", (0.01, 0.01, 0.01, 0.2)):
+                balancer._next = "abcd".index(name) - 1
+                await self.call(balancer, latency)
+        stats = balancer.stats()["endpoints"]
+        self.assertTrue(stats["d"]["ejected"])
+        self.assertFalse(any(stats[name]["ejected"] for name in "abc"))
+
+    async def test_gateway_spreads_calls_over_replicas(self):
+        replicas = {f"r{i}": FakeProvider(latency=0.01) for i in range(3)}
+        gateway = LLMGateway(providers={"openai": BalancedProvider(LoadBalancer(replicas, strategy="round_robin"))})
+        await asyncio.gather(*(gateway.complete("GPT-4", f"q{i}") for i in range(9)))
+        self.assertEqual([replica.calls for replica in replicas.values()], [3, 3, 3])
+        gateway.set_load_balancing("least_outstanding")
+        self.assertEqual(gateway.stats()["load_balancing"]["openai"]["strategy"], "least_outstanding")
+
+class TestLoadBalancingRoute(unittest.TestCase):
+    def test_switch_strategy_needs_an_admin(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        client = TestClient(app)
+        self.assertEqual(client.put("/llm/load-balancing", json={"strategy": "ewma"}).status_code, 403)
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1", role="admin")
+        response = client.put("/llm/load-balancing", json={"strategy": "ewma"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["strategy"], "ewma")
+        self.assertEqual(client.put("/llm/load-balancing", json={"strategy": "ip_hash"}).status_code, 400)
+
+    def test_stats_only_show_the_callers_tenant(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        gateway = LLMGateway(providers={"openai": FakeProvider(latency=0.01)})
+
+        async def complete():
+            await asyncio.gather(gateway.complete("GPT-4", "q", "t1"), gateway.complete("GPT-4", "q", "t2"))
+        asyncio.run(complete())
+        with patch("backend.app.routes.llm.llm_gateway", gateway):
+            stats = TestClient(app).get("/llm/stats").json()
+        self.assertEqual(list(stats["tenants"]), ["t1"])
+        self.assertEqual(stats["models"]["GPT-4"]["completed"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+import httpx
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.agent_registry import AgentRegistry, agent_registry
+from backend.app.services.agent_service import TaskDispatcher
+from backend.app.services.llm_service import LLM_PRICES
+from backend.app.services.metrics_store import MetricsStore, metrics_store, record_llm_call, record_task
+
+DAY = 86400
+START = 1_700_000_000 - 1_700_000_000 % DAY  # midnight UTC
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestMetricsStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock(START)
+        self.store = MetricsStore(raw_capacity=100, clock=self.clock)
+
+    def test_rollups_aggregate_each_resolution(self):
+        for minute in range(180):
+            self.store.record("t1", "tasks_completed", 2, START + minute * 60 + 5)
+            self.store.record("t1", "avg_rating", 4 + minute % 2, START + minute * 60 + 5)
+        self.clock.now = START + 3 * 3600
+        hourly = self.store.query("t1", ["tasks_completed", "avg_rating"], START, self.clock.now, points=3)
+        self.assertEqual(hourly["resolution"], 3600)
+        self.assertEqual([p["value"] for p in hourly["series"]["tasks_completed"]], [120, 120, 120])
+        self.assertEqual([(p["value"], p["min"], p["max"], p["count"]) for p in hourly["series"]["avg_rating"]], [(4.5, 4, 5, 60)] * 3)
+        minutes = self.store.query("t1", ["tasks_completed"], START, START + 3600, points=60)
+        self.assertEqual((minutes["resolution"], len(minutes["series"]["tasks_completed"])), (60, 60))
+        # Only the latest 100 samples are kept raw, so a short range reaching back further
+        # reads minute buckets instead
+        recent = self.store.query("t1", ["tasks_completed"], self.clock.now - 600, self.clock.now)
+        self.assertEqual((recent["resolution"], len(recent["series"]["tasks_completed"])), (0, 10))
+        self.assertEqual(self.store.query("t1", ["tasks_completed"], START, START + 600)["resolution"], 60)
+        self.assertEqual(self.store.query("t2", ["tasks_completed"], START, START + 600)["series"]["tasks_completed"], [])
+
+    def test_memory_is_fixed_and_old_buckets_age_out(self):
+        self.store.record("t1", "tasks_completed", 1, START)
+        series = self.store.series("t1", "tasks_completed")
+        sizes = [rollup.ids.nbytes for rollup in series.rollups]
+        for day in range(1, 800):
+            self.store.record("t1", "tasks_completed", 1, START + day * DAY)
+        self.assertEqual([rollup.ids.nbytes for rollup in series.rollups], sizes)
+        self.clock.now = START + 799 * DAY + 10
+        # Two years of days fit only the daily rollup; the first days are gone
+        result = self.store.query("t1", ["tasks_completed"], START, self.clock.now)
+        self.assertEqual(result["resolution"], 86400)
+        self.assertEqual(len(result["series"]["tasks_completed"]), 730)
+        self.assertEqual(result["series"]["tasks_completed"][0]["t"], START + 70 * DAY)
+
+    def test_agent_counts_are_sampled_from_the_registry(self):
+        registry = AgentRegistry()
+        registry.load([
+            {"id": 1, "tenant_id": "t1", "status": "Active"},
+            {"id": 2, "tenant_id": "t1", "status": "Inactive"},
+            {"id": 3, "tenant_id": "t2", "status": "Active"},
+        ])
+        self.store.sample_agents(registry)
+        result = self.store.query("t1", ["total_agents", "active_agents"], START - 60, START + 60)
+        self.assertEqual(result["series"]["total_agents"][0]["value"], 2)
+        self.assertEqual(result["series"]["active_agents"][0]["value"], 1)
+
+class TestMetricsPersistence(unittest.IsolatedAsyncioTestCase):
+    async def test_changed_days_are_upserted_in_one_batch_and_retried(self):
+        clock = Clock(START + DAY + 10)
+        store = MetricsStore(clock=clock)
+        requests = []
+
+        async def writer(rows):
+            requests.append(rows)
+            if len(requests) == 1:
+                raise httpx.ConnectError("down")
+        store.writer = writer
+        store.load([{"tenant_id": "t1", "date": "2023-11-14", "total_agents": 5, "active_agents": 4,
+                     "tasks_completed": 100, "avg_rating": 4.0, "llm_calls": 0, "llm_cost": 0.0}])
+        for tenant_id in ("t1", "t2"):
+            store.record(tenant_id, "tasks_completed", 3, START + 10)
+            store.record(tenant_id, "avg_rating", 5.0, START + 10)
+        store.record("t1", "llm_cost", 0.25, START + DAY + 10)
+        self.assertEqual(await store.flush(), 0)
+        self.assertEqual(await store.flush(), 3)
+        self.assertEqual(await store.flush(), 0)  # nothing changed since
+        self.assertEqual(len(requests), 2)
+        rows = {(row["tenant_id"], row["date"]): row for row in requests[1]}
+        merged = rows[("t1", "2023-11-14")]
+        self.assertEqual((merged["tasks_completed"], merged["avg_rating"], merged["total_agents"]), (103, 4.5, 5))
+        self.assertEqual(rows[("t1", "2023-11-15")]["llm_cost"], 0.25)
+        self.assertEqual(rows[("t2", "2023-11-14")]["active_agents"], 0)
+
+class TestMetricsRoutes(unittest.TestCase):
+    def setUp(self):
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com", tenant_id="t1")
+        self.addCleanup(app.dependency_overrides.clear)
+        agent_registry.load([{"id": 1, "tenant_id": "t1", "name": "Sales AI", "status": "Active"}])
+        self.addCleanup(agent_registry.clear)
+        self.addCleanup(metrics_store._series.clear)
+        self.addCleanup(metrics_store._dirty.clear)
+        self.client = TestClient(app)
+
+    def test_ratings_show_up_in_the_metrics(self):
+        for rating in (4, 5):
+            self.assertEqual(self.client.post("/agents/1/rating", json={"rating": rating}).status_code, 200)
+        self.assertEqual(self.client.post("/agents/1/rating", json={"rating": 7}).status_code, 422)
+        response = self.client.get("/metrics", params={"metric": "avg_rating"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["resolution"], 60)
+        points = response.json()["series"]["avg_rating"]
+        self.assertEqual(sum(p["value"] * p["count"] for p in points) / sum(p["count"] for p in points), 4.5)
+        self.assertEqual(self.client.get("/metrics", params={"metric": "uptime"}).status_code, 400)
+
+    def test_finished_tasks_and_llm_calls_are_recorded(self):
+        dispatcher = TaskDispatcher(workers=1)
+        dispatcher.finish_listeners.append(record_task)
+
+        async def run():
+            await dispatcher.start()
+            task_id = await dispatcher.submit(1, "t1", lambda: asyncio.sleep(0))
+            while dispatcher.status(task_id)["status"] != "completed":
+                await asyncio.sleep(0)
+            await dispatcher.stop()
+        asyncio.run(run())
+        with patch.dict(LLM_PRICES, {"GPT-4": 0.5}):
+            record_llm_call("GPT-4", "t1", 2000)
+        series = self.client.get("/metrics", params={"metric": ["tasks_completed", "llm_calls", "llm_cost"]}).json()["series"]
+        self.assertEqual({metric: sum(p["value"] for p in points) for metric, points in series.items()},
+                         {"tasks_completed": 1, "llm_calls": 1, "llm_cost": 1.0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+import unittest
+import numpy as np
+from backend.app.services.process_pool import AgentProcessPool, SharedArray
+
+def score(n):
+    values = np.arange(n, dtype=np.float64)
+    return {"scores": values * 2, "total": float(values.sum()), "pid": os.getpid()}
+
+def slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def slow_pid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+class TestAgentProcessPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = AgentProcessPool(cpu_workers=1, general_workers=1)
+        await self.pool.start()
+
+    async def asyncTearDown(self):
+        await self.pool.stop()
+
+    async def test_large_arrays_come_back_through_shared_memory(self):
+        result = await self.pool.run("Analytical", score, 100_000)
+        self.assertNotEqual(result["pid"], os.getpid())
+        self.assertEqual(result["total"], float(np.arange(100_000).sum()))
+        self.assertIsInstance(result["scores"], SharedArray)
+        with result["scores"] as scores:
+            self.assertEqual(scores.shape, (100_000,))
+            self.assertEqual(scores[-1], 199_998)
+        small = await self.pool.run("Analytical", score, 10)
+        self.assertIsInstance(small["scores"], np.ndarray)
+
+    async def test_resize_swaps_in_a_tier_of_the_new_size(self):
+        old = await self.pool.run("Conversational", slow_pid, 0)
+        running = asyncio.ensure_future(self.pool.run("Conversational", slow, 0.2))
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.pool.load("general")["utilization"], 100.0)
+        await self.pool.resize("general", 2)
+        self.assertEqual(self.pool.load("general")["workers"], 2)
+        # Overlapping tasks each hold a process, so they show how many the tier has
+        grown = set(await asyncio.gather(*(self.pool.run("Conversational", slow_pid, 0.2) for _ in range(2))))
+        self.assertEqual(len(grown), 2)
+        self.assertNotIn(old, grown)
+        # Work submitted before the resize finishes on the old processes
+        self.assertEqual(await running, 0.2)
+        self.assertEqual(self.pool.load("general")["queue_depth"], 0.0)
+
+        await self.pool.resize("general", 1)
+        self.assertEqual(self.pool.stats()["workers"]["general"], 1)
+        shrunk = set(await asyncio.gather(*(self.pool.run("Conversational", slow_pid, 0.05) for _ in range(3))))
+        self.assertEqual(len(shrunk), 1)
+        self.assertFalse(shrunk & (grown | {old}))
+
+    async def test_routes_by_agent_type(self):
+        cpu = await self.pool.run("Analytical", score, 1)
+        general = await self.pool.run("Conversational", score, 1)
+        self.assertNotEqual(cpu["pid"], general["pid"])
+        self.assertEqual(self.pool.tier("Generative"), "general")
+
+    async def test_cancel_queued_task(self):
+        running = asyncio.create_task(self.pool.run("Analytical", slow, 0.2))
+        queued = asyncio.create_task(self.pool.run("Analytical", slow, 5))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertEqual(await running, 0.2)
+        self.assertEqual(self.pool.stats()["cancelled"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
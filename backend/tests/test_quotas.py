@@ -0,0 +1,80 @@
+import asyncio
+import time
+import unittest
+import numpy as np
+from backend.app.services.process_pool import AgentProcessPool
+from backend.app.services.quotas import QuotaExceeded, ResourceGovernor
+
+def spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+    return seconds
+
+def allocate(megabytes):
+    return float(np.ones(megabytes * 1024 * 1024 // 8).sum())
+
+class TestQuotasInWorkers(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = AgentProcessPool(cpu_workers=1, general_workers=1)
+        await self.pool.start()
+        self.governor = ResourceGovernor(self.pool)
+
+    async def asyncTearDown(self):
+        await self.pool.stop()
+
+    async def test_memory_and_cpu_limits_fail_the_task_not_the_worker(self):
+        self.governor.set_quota(1, cpu_seconds=1, memory_bytes=64 * 1024 ** 2)
+        self.assertEqual(await self.governor.run(1, "Analytical", "t1", allocate, 16), 2 * 1024 ** 2)
+        with self.assertRaisesRegex(QuotaExceeded, "Memory"):
+            await self.governor.run(1, "Analytical", "t1", allocate, 512)
+        with self.assertRaisesRegex(QuotaExceeded, "CPU"):
+            await self.governor.run(1, "Analytical", "t1", spin, 5)
+        # Limits are lifted after each task, and other agents are not affected
+        self.assertEqual(await self.governor.run(2, "Analytical", "t1", allocate, 256), 32 * 1024 ** 2)
+        usage = self.governor.usage(1)
+        self.assertEqual((usage["tasks"], usage["quota_exceeded"]), (3, 2))
+        self.assertGreater(usage["cpu_seconds"], 0.9)
+        self.assertGreater(self.governor.usage(2)["peak_rss"], 256 * 1024 ** 2)
+        self.assertGreater(self.governor.stats()["compute_usage"], 0)
+
+class FakePool:
+    sizes = {"cpu": 1, "general": 1}
+
+    def __init__(self):
+        self.order = []
+
+    def tier(self, agent_type):
+        return "cpu"
+
+    async def run(self, agent_type, fn, limits, task, args, kwargs):
+        self.order.append(args[0])
+        await asyncio.sleep(0.001)
+        return args[0], {"cpu_seconds": 1.0, "peak_rss": 0}, None
+
+class TestFairShares(unittest.IsolatedAsyncioTestCase):
+    async def test_processes_are_shared_in_proportion_to_cpu_share(self):
+        pool = FakePool()
+        governor = ResourceGovernor(pool)
+        governor.set_quota("heavy", cpu_share=30)
+        governor.set_quota("light", cpu_share=10)
+        calls = [governor.run(agent, "Analytical", "t1", None, agent) for agent in ["heavy", "light"] * 20]
+        await asyncio.gather(*calls)
+        first = pool.order[:20]
+        self.assertAlmostEqual(first.count("heavy") / first.count("light"), 3, delta=1)
+        self.assertEqual(governor.usage("heavy")["cpu_seconds"], 20.0)
+
+    async def test_tenant_out_of_compute_hours_is_refused(self):
+        governor = ResourceGovernor(FakePool())
+
+        async def limits(tenant_id):
+            return (1, 10)  # 1 vCPU-hour, 10 GB
+
+        governor.tenant_limits = limits
+        governor._tenant_cpu["t1"] = 3600.0
+        with self.assertRaisesRegex(QuotaExceeded, "vCPU-hours"):
+            await governor.run("a", "Analytical", "t1", None, "a")
+        self.assertEqual(await governor.run("a", "Analytical", "t2", None, "a"), "a")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+from backend.app.utils.rate_limit import TokenBucket, per_minute
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_at_rate_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=4, clock=clock)
+        self.assertTrue(bucket.try_acquire(4))
+        self.assertFalse(bucket.try_acquire(1))
+        clock.now = 1.0
+        self.assertTrue(bucket.try_acquire(2))
+        clock.now = 100.0
+        self.assertFalse(bucket.try_acquire(5))
+        bucket.refund(10)
+        self.assertEqual(bucket.tokens, 4)
+
+    def test_per_minute(self):
+        self.assertIsNone(per_minute(0))
+        bucket = per_minute(600, burst_seconds=2)
+        self.assertEqual((bucket.rate, bucket.capacity), (10, 20))
+
+class TestTokenBucketAcquire(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_queues_in_order(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        order = []
+
+        async def take(label):
+            await bucket.acquire()
+            order.append(label)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(take(i) for i in range(5)))
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+        # One token up front, then four more at 100/s
+        self.assertGreaterEqual(loop.time() - started, 0.035)
+        self.assertEqual(bucket.waits, 4)
+
+if __name__ == '__main__':
+    unittest.main()
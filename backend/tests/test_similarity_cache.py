@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+from backend.app.services import llm_service
+from backend.app.services.llm_cache import LLMResponseCache
+from backend.app.services.llm_service import FakeProvider, LLMGateway, get_llm_response
+from backend.app.services.similarity_cache import SimilarityCache, shingles
+from backend.app.utils.cache import MISSING, TTLCache
+
+QUESTION = "How do I reset my password for the billing portal?"
+PARAPHRASE = "how can I reset my password for the billing portal"
+UNRELATED = "Which regions does the analytics dashboard support?"
+
+class TestSimilarityCache(unittest.TestCase):
+    def test_shingles_ignore_case_and_punctuation(self):
+        self.assertEqual(shingles("Reset, PASSWORD!"), shingles("reset password"))
+
+    def test_near_duplicates_match_within_scope(self):
+        cache = SimilarityCache(threshold=0.6)
+        cache.add(("t1", 1), QUESTION, "Use the reset link.")
+        value, similarity = cache.lookup(("t1", 1), PARAPHRASE)
+        self.assertEqual(value, "Use the reset link.")
+        self.assertGreater(similarity, 0.6)
+        self.assertIs(cache.lookup(("t1", 1), UNRELATED), MISSING)
+        self.assertIs(cache.lookup(("t2", 1), PARAPHRASE), MISSING)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_ring_overwrites_oldest_entry(self):
+        cache = SimilarityCache(max_entries=2)
+        cache.add("s", QUESTION, "first")
+        cache.add("s", UNRELATED, "second")
+        cache.add("s", "What does the Pro plan cost per seat?", "third")
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.lookup("s", QUESTION), MISSING)
+        self.assertEqual(cache.lookup("s", UNRELATED)[0], "second")
+
+    def test_ttl(self):
+        now = [0.0]
+        cache = SimilarityCache(ttl=10, clock=lambda: now[0])
+        cache.add("s", QUESTION, "answer")
+        now[0] = 11
+        self.assertIs(cache.lookup("s", QUESTION), MISSING)
+
+class TestSimilarResponses(unittest.IsolatedAsyncioTestCase):
+    async def test_get_llm_response_reuses_near_duplicate_answer(self):
+        provider = FakeProvider(latency=0)
+        patches = [
+            patch.object(llm_service, "llm_gateway", LLMGateway(providers={"openai": provider})),
+            patch.object(llm_service, "llm_cache", LLMResponseCache(TTLCache(maxsize=100, ttl=60))),
+            patch.object(llm_service, "similar_prompts", SimilarityCache(threshold=0.6)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        first = await get_llm_response(QUESTION, model="GPT-4", tenant_id="t1", agent_id=1, temperature=0)
+        self.assertEqual(await get_llm_response(PARAPHRASE, model="GPT-4", tenant_id="t1", agent_id=1, temperature=0), first)
+        await get_llm_response(PARAPHRASE, model="GPT-4", tenant_id="t1", agent_id=2, temperature=0)
+        await get_llm_response(PARAPHRASE, model="GPT-4", tenant_id="t1", agent_id=1, temperature=0, top_p=0.5)
+        self.assertEqual(provider.calls, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+from backend.app.utils.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "row"
+
+        results = await asyncio.gather(*(flight.do("users?id=eq.1", fetch) for _ in range(10)))
+        self.assertEqual(results, ["row"] * 10)
+        self.assertEqual(calls, 1)
+        self.assertAlmostEqual(flight.stats()["collapse_ratio"], 0.9)
+        await flight.do("users?id=eq.1", fetch)
+        self.assertEqual(calls, 2)
+
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_cancelling_one_waiter_keeps_the_call_alive(self):
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "row"
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await started.wait()
+        first.cancel()
+        self.assertEqual(await second, "row")
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_last_waiter_cancelling_stops_the_call(self):
+        flight = SingleFlight()
+        finished = False
+
+        async def fetch():
+            nonlocal finished
+            await asyncio.sleep(1)
+            finished = True
+
+        waiter = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        self.assertFalse(finished)
+        self.assertEqual(flight.stats()["inflight"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+import gradio as gr
+from frontend.components.tabs import lazy_tab
+
+class TestLazyTabs(unittest.TestCase):
+    def build(self, lazy):
+        calls = []
+
+        def body():
+            calls.append(1)
+            gr.Textbox(label="Body")
+
+        with gr.Blocks() as demo:
+            with gr.Tab("First"):
+                gr.Markdown("first")
+            lazy_tab("Second", body, lazy=lazy)
+        labels = [c["props"].get("label") for c in demo.get_config_file()["components"]]
+        return calls, labels
+
+    def test_body_is_built_with_the_blocks_unless_lazy(self):
+        calls, labels = self.build(lazy=False)
+        self.assertEqual(len(calls), 1)
+        self.assertIn("Body", labels)
+        calls, labels = self.build(lazy=True)
+        self.assertEqual(calls, [])
+        self.assertNotIn("Body", labels)
+
+if __name__ == '__main__':
+    unittest.main()
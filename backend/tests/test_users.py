@@ -0,0 +1,210 @@
+import asyncio
+import json
+import re
+import unittest
+from unittest.mock import patch
+import httpx
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.routes import users
+from backend.app.routes.users import TokenData, get_current_user
+from backend.app.services.supabase_client import create_supabase_client, get_supabase_client
+from backend.app.utils.cache import TTLCache
+from backend.app.utils.singleflight import SingleFlight
+
+USERS = [
+    {"id": "1", "email": "ada@example.com", "role": "admin", "tenant_id": "t1", "created_at": "2024-01-01T00:00:00"},
+    {"id": "2", "email": "bob@example.com", "role": None, "tenant_id": "t1", "created_at": "2024-01-02T00:00:00"},
+]
+
+class FakeSupabase:
+    def __init__(self):
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.url.path == "/rest/v1/users" and request.method == "GET":
+            user_id = request.url.params.get("id")
+            if user_id:
+                return httpx.Response(200, json=[u for u in USERS if "eq." + u["id"] == user_id])
+            rows = USERS
+            keyset = re.search(r'created_at\.gt\."([^"]+)".*id\.gt\."([^"]+)"', request.url.params.get("or", ""))
+            if keyset:
+                rows = [u for u in rows if (u["created_at"], u["id"]) > keyset.groups()]
+            if "Range" in request.headers:
+                start, end = map(int, request.headers["Range"].split("-"))
+                return httpx.Response(206, json=rows[start:end + 1])
+            return httpx.Response(200, json=rows[:int(request.url.params.get("limit", len(rows)))])
+        if request.url.path == "/rest/v1/users" and request.method == "POST":
+            rows = json.loads(request.content)
+            created = [dict(row, id=str(100 + i), tenant_id="t1", created_at="2024-02-01T00:00:00") for i, row in enumerate(rows)]
+            return httpx.Response(201, json=created)
+        if request.url.path == "/rest/v1/users" and request.method == "PATCH":
+            changes = json.loads(request.content)
+            user_id = request.url.params["id"]
+            return httpx.Response(200, json=[dict(u, **changes) for u in USERS if "eq." + u["id"] == user_id])
+        if request.url.path == "/rest/v1/users" and request.method == "DELETE":
+            if "return=representation" not in request.headers.get("Prefer", ""):
+                return httpx.Response(204)
+            ids = re.findall(r'"([^"]+)"', request.url.params["id"])
+            return httpx.Response(200, json=[u for u in USERS if u["id"] in ids])
+        if request.url.path == "/auth/v1/token":
+            credentials = json.loads(request.content)
+            user = {
+                "email": credentials["email"],
+                "app_metadata": {"tenant_id": "t1"},
+                "user_metadata": {"tenant_id": "someone-elses-tenant"} if credentials["password"] == "spoof" else None,
+            }
+            return httpx.Response(200, json={"user": user})
+        return httpx.Response(404, text="not found")
+
+class TestUsersRoutes(unittest.TestCase):
+    def setUp(self):
+        self.supabase = FakeSupabase()
+        key_patch = patch.object(users, "SUPABASE_KEY", "test-key")
+        key_patch.start()
+        self.addCleanup(key_patch.stop)
+        self.client_pool = create_supabase_client(
+            base_url="http://supabase.test", transport=httpx.MockTransport(self.supabase.handler)
+        )
+        app.dependency_overrides[get_supabase_client] = lambda: self.client_pool
+        app.dependency_overrides[get_current_user] = lambda: TokenData(email="ada@example.com")
+        self.client = TestClient(app)
+        for name in ("user_cache", "user_list_cache"):
+            cache_patch = patch.object(users, name, TTLCache(maxsize=100, ttl=60))
+            cache_patch.start()
+            self.addCleanup(cache_patch.stop)
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+
+    def test_read_users_uses_shared_client(self):
+        response = self.client.get("/users")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u["id"] for u in response.json()], ["1", "2"])
+        self.client.get("/users/1")
+        self.assertEqual(len(self.supabase.requests), 2)
+        self.assertEqual(self.supabase.requests[0].url.params["order"], "created_at.asc,id.asc")
+
+    def test_read_users_cursor_pagination(self):
+        first = self.client.get("/users", params={"limit": 1})
+        self.assertEqual([u["id"] for u in first.json()], ["1"])
+        cursor = first.headers["X-Next-Cursor"]
+        second = self.client.get("/users", params={"limit": 1, "cursor": cursor})
+        self.assertEqual([u["id"] for u in second.json()], ["2"])
+        self.assertNotIn("X-Next-Cursor", second.headers)
+        self.assertEqual(self.client.get("/users", params={"cursor": "not-a-cursor"}).status_code, 400)
+
+    def test_stream_users_ndjson(self):
+        response = self.client.get("/users/stream", params={"page_size": 1})
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([u["id"] for u in rows], ["1", "2"])
+        ranges = [r.headers["Range"] for r in self.supabase.requests]
+        self.assertEqual(ranges, ["0-0", "1-1", "2-2"])
+
+    def test_read_user_is_cached_until_delete(self):
+        self.assertEqual(self.client.get("/users/1").json()["email"], "ada@example.com")
+        self.client.get("/users/1")
+        self.client.get("/users")
+        self.client.get("/users")
+        self.assertEqual(len(self.supabase.requests), 2)
+        self.assertEqual(self.client.delete("/users/1").status_code, 200)
+        self.client.get("/users/1")
+        self.client.get("/users")
+        self.assertEqual(len(self.supabase.requests), 5)
+        stats = self.client.get("/users/cache/stats").json()
+        self.assertEqual(stats["users"]["hits"], 1)
+        self.assertEqual(stats["user_lists"]["hits"], 1)
+
+    def test_missing_user_is_negatively_cached(self):
+        self.assertEqual(self.client.get("/users/404").status_code, 404)
+        self.assertEqual(self.client.get("/users/404").status_code, 404)
+        self.assertEqual(len(self.supabase.requests), 1)
+
+    def test_create_users_batch_chunks_requests(self):
+        payload = [{"email": f"user{i}@example.com", "password": "pw"} for i in range(5)]
+        with patch.object(users, "USERS_BATCH_CHUNK_SIZE", 2):
+            response = self.client.post("/users:batch", json=payload)
+        body = response.json()
+        self.assertEqual((body["succeeded"], body["failed"]), (5, 0))
+        self.assertEqual([r["index"] for r in body["results"]], [0, 1, 2, 3, 4])
+        self.assertEqual(body["results"][4]["user"]["email"], "user4@example.com")
+        self.assertEqual(len(self.supabase.requests), 3)
+
+    def test_update_users_batch_patches_each_user(self):
+        self.client.get("/users/1")
+        payload = [
+            {"id": "1", "email": "ada@example.com", "role": "owner"},
+            {"id": "missing", "email": "nobody@example.com"},
+            {"id": "2", "email": "robert@example.com"},
+        ]
+        body = self.client.patch("/users:batch", json=payload).json()
+        self.assertEqual((body["succeeded"], body["failed"]), (2, 1))
+        self.assertEqual([r["status_code"] for r in body["results"]], [200, 404, 200])
+        self.assertEqual(body["results"][0]["user"]["role"], "owner")
+        patches = [r for r in self.supabase.requests if r.method == "PATCH"]
+        self.assertEqual(sorted(r.url.params["id"] for r in patches), ["eq.1", "eq.2", "eq.missing"])
+        # Only the fields that were sent are updated; the id stays in the filter
+        self.assertEqual(json.loads(patches[0].content), {"email": "ada@example.com", "role": "owner"})
+        # The cached user was invalidated by the update
+        self.client.get("/users/1")
+        self.assertEqual(len(self.supabase.requests), 5)
+
+    def test_batch_items_without_rows_are_failed(self):
+        response = httpx.Response(201, json=USERS[:1])
+        results = users.chunk_results([(0, None), (1, None)], response, 201)
+        self.assertEqual([r.status_code for r in results], [201, 502])
+        self.assertIsNotNone(results[1].error)
+
+    def test_delete_users_batch_reports_per_item(self):
+        response = self.client.request("DELETE", "/users:batch", json={"ids": ["1", "missing"]})
+        body = response.json()
+        self.assertEqual([r["status_code"] for r in body["results"]], [200, 404])
+        self.assertEqual(len(self.supabase.requests), 1)
+        self.assertEqual(self.supabase.requests[0].url.params["id"], 'in.("1","missing")')
+
+    def test_login_tenant_comes_from_app_metadata(self):
+        for password in ("pw", "spoof"):
+            token = self.client.post("/api/token", data={"username": "ada@example.com", "password": password}).json()
+            self.assertEqual(users.verify_token(token["access_token"]).tenant_id, "t1")
+        body = self.client.post("/api/login", json={"email": "ada@example.com", "password": "pw"}).json()
+        self.assertTrue(body["success"])
+        self.assertEqual(users.verify_token(body["user_data"]["access_token"]).tenant_id, "t1")
+
+    def test_lifespan_opens_and_closes_pool(self):
+        app.dependency_overrides.pop(get_supabase_client)
+        with TestClient(app):
+            pool = app.state.supabase_client
+            self.assertIsInstance(pool, httpx.AsyncClient)
+            self.assertFalse(pool.is_closed)
+        self.assertTrue(pool.is_closed)
+
+class TestReadWriteRace(unittest.IsolatedAsyncioTestCase):
+    async def test_read_in_flight_during_write_is_not_cached(self):
+        release = asyncio.Event()
+        versions = iter(range(1, 10))
+
+        async def handler(request):
+            version = next(versions)
+            await release.wait()
+            return httpx.Response(200, json=[dict(USERS[0], role=f"v{version}")])
+
+        client = create_supabase_client(base_url="http://supabase.test", transport=httpx.MockTransport(handler))
+        with patch.object(users, "SUPABASE_KEY", "test-key"), \
+                patch.object(users, "user_cache", TTLCache(maxsize=100, ttl=60)), \
+                patch.object(users, "upstream_reads", SingleFlight()):
+            before = asyncio.create_task(users.read_user("1", TokenData(), client))
+            await asyncio.sleep(0.01)
+            users.invalidate_user_cache("1")
+            # A read that starts after the write must not join the pre-write request
+            after = asyncio.create_task(users.read_user("1", TokenData(), client))
+            await asyncio.sleep(0.01)
+            release.set()
+            self.assertEqual((await before)["role"], "v1")
+            self.assertEqual((await after)["role"], "v2")
+            self.assertEqual(users.user_cache.get("1")["role"], "v2")
+        await client.aclose()
+
+if __name__ == '__main__':
+    unittest.main()
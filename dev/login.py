@@ -8,6 +8,7 @@ import gradio as gr
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager
 from fastapi.openapi.docs import get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
 from datetime import datetime, timedelta
 from supabase import create_client, Client
@@ -37,8 +38,74 @@ class UserLogin(BaseModel):
     session_start: Optional[datetime] = None
     session_end: Optional[datetime] = None
 
+# Activity log rows are queued and written in multi-row inserts, off the login path
+ACTIVITY_LOG_MAX_QUEUE = int(os.getenv("ACTIVITY_LOG_MAX_QUEUE", "10000"))
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "100"))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", "1.0"))
+
+class ActivityLogBuffer:
+    def __init__(self, insert_rows, max_queue=ACTIVITY_LOG_MAX_QUEUE, batch_size=ACTIVITY_LOG_BATCH_SIZE, flush_interval=ACTIVITY_LOG_FLUSH_INTERVAL):
+        self.insert_rows = insert_rows  # blocking callable taking a list of rows
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = None
+        self.task = None
+        self.flushes = 0
+        self.failed_rows = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Let the flusher drain what is queued, then write the final partial batch
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    # Waits only when the queue is full, which applies backpressure instead of growing without bound
+    async def put(self, row):
+        await self.queue.put(row)
+
+    async def _run(self):
+        while True:
+            rows = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self.insert_rows, rows)
+                self.flushes += 1
+            except Exception as e:
+                self.failed_rows += len(rows)
+                print(f"Activity log flush failed ({type(e).__name__}): {e}")
+            finally:
+                for _ in rows:
+                    self.queue.task_done()
+
+def insert_activity_rows(rows):
+    supabase.table("logs").insert(rows).execute()
+
+activity_log = ActivityLogBuffer(insert_activity_rows)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    activity_log.start()
+    yield
+    await activity_log.stop()
+
 # Create a FastAPI app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 class AuthenticationError(Exception):
     pass
@@ -67,21 +134,20 @@ def authenticate_user(email, password):
 def generate_session_id():
     return str(uuid.uuid4())
 
-def log_user_activity(user_email: str, activity: str, user_agent: str):
-    sanitized_email = user_email.replace("@", "_").replace(".", "_")
+async def log_user_activity(user_email: str, activity: str, user_agent: str):
     data = {
         "timestamp": datetime.now().isoformat(),
         "activity": activity,
         "user_agent": user_agent
     }
-    supabase.table("logs").insert(data).execute()
+    await activity_log.put(data)
 
 # Define a route for the login endpoint
 @app.post("/api/login", response_model=LoginResponse)
 async def login_endpoint(request: Request, user_data: UserLogin):
     try:
-        # Authenticate user with Supabase
-        user = supabase.auth.sign_in_with_password({
+        # Authenticate user with Supabase; the client is synchronous, so run it off the event loop
+        user = await asyncio.to_thread(supabase.auth.sign_in_with_password, {
             "email": user_data.email,
             "password": user_data.password
         })
@@ -91,7 +157,7 @@ async def login_endpoint(request: Request, user_data: UserLogin):
 
         # Log user activity
         user_agent = request.headers.get("User-Agent")
-        log_user_activity(user_data.email, "Login", user_agent)
+        await log_user_activity(user_data.email, "Login", user_agent)
         
         # Update user details
         user_data.last_login = datetime.now()
@@ -101,7 +167,6 @@ async def login_endpoint(request: Request, user_data: UserLogin):
         user_data.session_end = user_data.session_start + timedelta(hours=8)  # Set session duration to 8 hours
 
         # Save user details to Supabase
-        sanitized_email = user_data.email.replace("@", "_").replace(".", "_")
         data = {
             "email": user_data.email,
             "last_login": user_data.last_login.isoformat(),
@@ -110,11 +175,11 @@ async def login_endpoint(request: Request, user_data: UserLogin):
             "session_start": user_data.session_start.isoformat(),
             "session_end": user_data.session_end.isoformat()
         }
-        supabase.table("users").upsert(data).execute()
-
-        # Retrieve user data from Supabase
-        user_data_snapshot = supabase.table("users").select("*").eq("email", user_data.email).execute()
-        user_data_dict = user_data_snapshot.data[0] if user_data_snapshot.data else {}
+        # The upsert returns the stored row, so no read-back query is needed
+        stored = await asyncio.to_thread(
+            lambda: supabase.table("users").upsert(data, returning="representation").execute()
+        )
+        user_data_dict = stored.data[0] if stored.data else {}
         
         return LoginResponse(success=True, user_data=user_data_dict)
     except AuthenticationError as e:
@@ -0,0 +1,26 @@
+import os
+import httpx
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+# Bearer token for the backend; most endpoints need a user with a tenant
+BACKEND_TOKEN = os.getenv("BACKEND_TOKEN")
+
+# One pooled client for every dashboard handler; reads may wait a while between streamed tokens
+backend = httpx.Client(base_url=BACKEND_URL, timeout=httpx.Timeout(10.0, read=120.0))
+
+def auth_headers():
+    return {"Authorization": f"Bearer {BACKEND_TOKEN}"} if BACKEND_TOKEN else {}
+
+# Send a request and return (ok, JSON body or error text) instead of raising into the UI
+def call_backend(method, path, client=None, **kwargs):
+    try:
+        response = (client or backend).request(method, path, headers=auth_headers(), **kwargs)
+    except httpx.HTTPError as e:
+        return False, f"Backend unavailable: {e}"
+    if response.is_error:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        return False, f"{response.status_code}: {detail}"
+    return True, response.json()
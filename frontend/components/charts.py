@@ -0,0 +1,140 @@
+# Figures of the Analytics & Reporting tab.
+#
+# Figures are built when the tab or its Key Metrics accordion is opened rather than when
+# the Blocks are constructed. The serialized Plotly JSON of each figure is cached by
+# chart, dataset version and filter, so opening the tab again or reloading unchanged data
+# reuses it without building the figure. Time series come from the backend already
+# downsampled with LTTB to about one point per pixel of a chart (`max_points`).
+
+import math
+import os
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+from gradio.components.plot import PlotData
+
+from frontend.components.backend_client import call_backend
+
+CHART_POINTS = int(os.getenv("CHART_POINTS", "600"))  # about the width of a half-row chart in pixels
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "128"))
+TIMEFRAMES = {"Last Hour": 3600, "Last Day": 86400, "Last 30 Days": 30 * 86400, "Last Year": 365 * 86400}
+RESOLUTIONS = {0: "raw samples", 60: "1 minute", 3600: "1 hour", 86400: "1 day"}
+
+# Shown until the backend has metrics for the tenant
+SAMPLE_METRICS = {
+    "Date": ["2023-01-01", "2023-01-08", "2023-01-15", "2023-01-22", "2023-01-29",
+             "2023-02-05", "2023-02-12", "2023-02-19", "2023-02-26", "2023-03-05",
+             "2023-03-12", "2023-03-19", "2023-03-26", "2023-04-02", "2023-04-09"],
+    "Total Agents": [500, 525, 540, 560, 575, 590, 600, 615, 630, 645, 660, 675, 690, 700, 710],
+    "Active Agents": [375, 395, 410, 430, 445, 460, 475, 490, 505, 520, 535, 550, 565, 580, 595],
+    "Tasks Completed": [8000, 8500, 9200, 9800, 10400, 11000, 11600, 12200, 12800, 13400, 14000, 14600, 15200, 15800, 16400],
+    "Avg Rating": [4.5, 4.52, 4.54, 4.56, 4.58, 4.6, 4.62, 4.64, 4.66, 4.68, 4.7, 4.72, 4.74, 4.76, 4.78],
+}
+SAMPLE_TEAMS = {
+    "Team": ["Sales", "Support", "Marketing", "Analytics", "HR"],
+    "Agents": [120, 180, 95, 65, 40],
+    "Tasks": [3200, 4800, 2400, 1600, 800],
+    "Avg Rating": [4.7, 4.75, 4.65, 4.8, 4.72],
+}
+
+
+class FigureCache:
+    def __init__(self, size=FIGURE_CACHE_SIZE):
+        self.size = size
+        self._figures = OrderedDict()  # key -> PlotData, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    # Serialized figure for `key`, built with `build()` on a miss
+    def get(self, key, build):
+        figure = self._figures.get(key)
+        if figure is not None:
+            self._figures.move_to_end(key)
+            self.hits += 1
+            return figure
+        self.misses += 1
+        figure = self._figures[key] = PlotData(type="plotly", plot=build().to_json())
+        if len(self._figures) > self.size:
+            self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        self._figures.clear()
+
+
+figure_cache = FigureCache()
+
+
+def sample_metric_charts(cache=figure_cache):
+    return [(key, cache.get(key, build)) for key, build in (
+        (("sample", "workforce"), lambda: px.line(SAMPLE_METRICS, x="Date", y=["Total Agents", "Active Agents"], title="Agent Workforce Metrics Over Time")),
+        (("sample", "tasks"), lambda: px.line(SAMPLE_METRICS, x="Date", y="Tasks Completed", title="Tasks Completed Over Time")),
+        (("sample", "rating"), lambda: px.bar(SAMPLE_METRICS, x="Date", y="Avg Rating", title="Average Agent Rating Over Time")),
+    )]
+
+
+def sample_team_charts(cache=figure_cache):
+    return [(key, cache.get(key, build)) for key, build in (
+        (("sample", "teams"), lambda: px.bar(SAMPLE_TEAMS, x="Team", y=["Agents", "Tasks"], barmode="group", title="Agent Performance by Team")),
+        (("sample", "correlation"), lambda: px.scatter(SAMPLE_METRICS, x="Tasks Completed", y="Avg Rating", color="Active Agents", title="Correlation Between Tasks Completed, Rating, and Active Agents")),
+        (("sample", "distribution"), lambda: px.pie(SAMPLE_TEAMS, values="Agents", names="Team", title="Agent Distribution by Team")),
+    )]
+
+
+# Workforce, tasks and rating charts over `timeframe`, or (None, error text)
+def metric_charts(timeframe, client=None, cache=figure_cache):
+    end = math.ceil(time.time() / 60) * 60  # requests within a minute share a window, and cache entries
+    ok, result = call_backend("GET", "/metrics", client, params={
+        "metric": ["total_agents", "active_agents", "tasks_completed", "avg_rating"],
+        "start": end - TIMEFRAMES[timeframe], "end": end, "points": CHART_POINTS, "max_points": CHART_POINTS,
+    })
+    if not ok:
+        return None, result
+
+    def frame(metric):
+        return pd.DataFrame(result["series"][metric], columns=["t", "value"]).assign(Date=lambda df: pd.to_datetime(df["t"], unit="s"))
+
+    def workforce():
+        series = pd.concat([frame("total_agents").assign(Series="Total Agents"), frame("active_agents").assign(Series="Active Agents")])
+        return px.line(series, x="Date", y="value", color="Series", title="Agent Workforce Metrics Over Time")
+
+    version = ("metrics", timeframe, end, result["version"])
+    charts = [(version + (name,), build) for name, build in (
+        ("workforce", workforce),
+        ("tasks", lambda: px.line(frame("tasks_completed"), x="Date", y="value", title="Tasks Completed Over Time")),
+        ("rating", lambda: px.bar(frame("avg_rating"), x="Date", y="value", title="Average Agent Rating Over Time")),
+    )]
+    resolution = RESOLUTIONS.get(result["resolution"], f"{result['resolution']}s")
+    return [(key, cache.get(key, build)) for key, build in charts], f"{timeframe} at {resolution} resolution"
+
+
+# Team, correlation and distribution charts from the task analytics, or None before any
+# task or rating was recorded
+def team_charts(timeframe, client=None, cache=figure_cache):
+    days = max(1, TIMEFRAMES[timeframe] // 86400)
+    ok, summary = call_backend("GET", "/analytics/summary", client, params={"days": days})
+    if not ok or not summary["teams"]:
+        return None
+    r = summary["correlation"]["day"]["r"]
+    version = ("analytics", days, summary["events"])  # the event count only grows
+    charts = [(version + (name,), build) for name, build in (
+        ("teams", lambda: px.bar(pd.DataFrame(summary["teams"]), x="team", y=["agents", "tasks_completed"], barmode="group", title="Agent Performance by Team")),
+        ("correlation", lambda: px.scatter(pd.DataFrame(summary["days"]), x="tasks_completed", y="avg_rating", hover_data=["date"],
+                                           title="Tasks Completed vs Avg Rating per Day" + ("" if r is None else f" (r = {r:.2f})"))),
+        ("distribution", lambda: px.pie(pd.DataFrame(summary["teams"]), values="agents", names="team", title="Agent Distribution by Team")),
+    )]
+    return [(key, cache.get(key, build)) for key, build in charts]
+
+
+# The six (cache key, figure) pairs of the tab and a status line; sample data stands in
+# for what the backend cannot provide yet
+def analytics_charts(timeframe, client=None, cache=figure_cache):
+    metrics, status = metric_charts(timeframe, client, cache)
+    if metrics is None:
+        return sample_metric_charts(cache) + sample_team_charts(cache), f"Showing sample data: {status}"
+    teams = team_charts(timeframe, client, cache)
+    if teams is None:
+        return metrics + sample_team_charts(cache), status + "; team charts show sample data until tasks are recorded"
+    return metrics + teams, status
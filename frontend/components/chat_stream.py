@@ -0,0 +1,30 @@
+import json
+import httpx
+from frontend.components.backend_client import auth_headers, backend
+
+# Events from the backend's /chat/stream endpoint as (event, data) pairs
+def chat_events(message, agent_id=None, model=None, client=None):
+    body = {"message": message, "agent_id": agent_id, "model": model}
+    with (client or backend).stream("POST", "/chat/stream", json=body, headers=auth_headers()) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[5:])
+
+# The reply so far, growing as tokens arrive, for Gradio generator handlers. Backend
+# errors end the reply with a note instead of raising into the UI.
+def stream_reply(message, agent_id=None, model=None, client=None):
+    reply = ""
+    try:
+        for event, data in chat_events(message, agent_id, model, client):
+            if event == "token":
+                reply += data["text"]
+                yield reply
+            elif event == "error":
+                yield reply + f"\n\n[Reply interrupted: {data['detail']}]"
+                return
+    except httpx.HTTPError as e:
+        yield reply + f"\n\n[Assistant unavailable: {e}]"
@@ -0,0 +1,21 @@
+import os
+import gradio as gr
+
+# Build tab bodies on the first visit of each session rather than with the Blocks, so
+# startup only builds the tab shown first; LAZY_TABS=false builds every tab up front
+LAZY_TABS = os.getenv("LAZY_TABS", "true").lower() in ("1", "true", "yes")
+
+# A tab whose body is `build()`. Lazily, selecting the tab flips a per-session flag whose
+# first change renders the body; later visits keep what was rendered.
+def lazy_tab(label, build, lazy=LAZY_TABS):
+    with gr.Tab(label) as tab:
+        if not lazy:
+            build()
+            return tab
+        visited = gr.State(False)
+        tab.select(lambda: True, outputs=visited, queue=False)
+
+        @gr.render(triggers=[visited.change])
+        def body():
+            build()
+    return tab
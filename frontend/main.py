@@ -2,8 +2,10 @@ import gradio as gr
 import pandas as pd
 import time
 import random
-import plotly.express as px
 from gradio_modal import Modal
+from frontend.components.backend_client import call_backend
+from frontend.components.chat_stream import stream_reply
+from frontend.components.tabs import LAZY_TABS, lazy_tab
 
 def create_new_agent_wizard():
     with Modal(visible=False) as create_agent_modal:
@@ -84,14 +86,13 @@ def create_new_agent_wizard():
         
     return create_agent_modal
 
+# Generator handler: the reply is rendered token by token as the backend streams it
 def settings_conversation(user_message, chat_history):
-    bot_response = random.choice([
-        "How can I assist you with settings?",
-        "What would you like to change?",
-        "I'm here to help with any settings issues!"
-    ])
-    chat_history.append((user_message, bot_response))
-    return "", chat_history  # Clear the message input after submission
+    chat_history.append((user_message, ""))
+    yield "", chat_history  # Clear the message input after submission
+    for reply in stream_reply(user_message):
+        chat_history[-1] = (user_message, reply)
+        yield "", chat_history
     
 def agent_management():
     with gr.Blocks() as agent_dashboard:
@@ -176,6 +177,14 @@ def agent_management():
                     compute_usage = gr.Number(value=85.2, label="Compute Usage (%)")
                     storage_usage = gr.Number(value=1250, label="Storage Usage (GB)")
                     llm_calls = gr.Number(value=9875, label="Total LLM API Calls")  
+                    refresh_usage_button = gr.Button("Refresh Usage")
+
+                    # Compute usage measured by the backend's resource governor
+                    def refresh_compute_usage(current):
+                        ok, result = call_backend("GET", "/resources/usage")
+                        return round(result["compute_usage"], 1) if ok else current
+
+                    refresh_usage_button.click(refresh_compute_usage, inputs=compute_usage, outputs=compute_usage)
                 with gr.Column(scale=1):
                     gr.Markdown("## Cost Analysis") 
                     total_cost = gr.Number(value=12345.67, label="Total Cost ($)")
@@ -409,9 +418,16 @@ def agent_controls():
                     memory_allocation = gr.Slider(minimum=0, maximum=64, step=1, label="Memory Allocation (GB)")
                     allocate_resources_button = gr.Button("Allocate Resources")
 
-                    # Placeholder function to simulate resource allocation
+                    # CPU allocation is the agent's share of the worker processes; memory caps each task
                     def allocate_resources(agent_id, cpu, memory):
-                        return f"Resources allocated to agent {agent_id}: CPU {cpu}%, Memory {memory}GB"
+                        if not str(agent_id).strip().isdigit():
+                            return "Enter a numeric agent ID"
+                        ok, result = call_backend("PUT", f"/agents/{int(agent_id)}/quota", json={"cpu_share": max(1, int(cpu)), "memory_gb": memory})
+                        if not ok:
+                            return f"Resources not allocated: {result}"
+                        return (f"Resources allocated to agent {agent_id}: CPU share {result['quota']['cpu_share']}, "
+                                f"Memory {memory}GB. Used so far: {result['cpu_seconds']:.1f} CPU-seconds, "
+                                f"peak RSS {result['peak_rss'] / 1024 ** 2:.0f} MB")
 
                     allocate_resources_button.click(allocate_resources, inputs=[agent_id, cpu_allocation, memory_allocation], outputs=gr.Textbox(label="Allocation Status"))
 
@@ -419,35 +435,69 @@ def agent_controls():
                  
                     gr.Markdown("""
                     **Description:**
-                    Implement auto-scaling capabilities that automatically adjust the number of active agents based on predefined triggers such as CPU usage, memory usage, or task queue length. Provide a visual interface for setting up and adjusting auto-scaling rules.
+                    Worker pools grow and shrink on their own based on a trigger: task queue length (queued tasks per worker), worker utilization (% busy) or P95 wait time (ms a task waits for a worker). Scale Up sets the level above which workers are added; Scale Down the level below which they are removed.
                     """)
-                    scaling_trigger = gr.Dropdown(label="Scaling Trigger", choices=["CPU Usage", "Memory Usage", "Task Queue Length"])
-                    trigger_threshold = gr.Slider(minimum=0, maximum=100, step=1, label="Trigger Threshold (%)")
+                    triggers = {"Task Queue Length": "queue_depth", "Worker Utilization": "utilization", "P95 Wait Time": "p95_wait"}
+                    scaling_trigger = gr.Dropdown(label="Scaling Trigger", choices=list(triggers), value="Worker Utilization")
+                    trigger_threshold = gr.Number(value=80, label="Trigger Threshold (tasks per worker, % busy, or ms)")
                     scale_up_button = gr.Button("Scale Up")
                     scale_down_button = gr.Button("Scale Down")
+                    refresh_scaling_button = gr.Button("Refresh Scaling Decisions")
+                    scaling_status = gr.Textbox(label="Autoscaler Status", lines=8)
+
+                    def describe_autoscaling(result):
+                        lines = []
+                        for pool, state in result.items():
+                            policy, reading = state["policy"], state["reading"] or {}
+                            lines.append(
+                                f"{pool}: {reading.get('workers', '?')} workers, {policy['trigger']} "
+                                f"{reading.get(policy['trigger'], 0):.1f} (up > {policy['scale_up_threshold']:g}, down < {policy['scale_down_threshold']:g})"
+                            )
+                            for decision in state["decisions"][-3:]:
+                                lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(decision['at']))} "
+                                             f"{decision['from']} -> {decision['to']} workers at {decision['value']:.1f}")
+                        return "\n".join(lines)
+
+                    def configure_scaling(body):
+                        ok, result = call_backend("PUT", "/autoscaling", json=body)
+                        return describe_autoscaling(result) if ok else f"Autoscaler not updated: {result}"
 
-                    # Placeholder functions to simulate scaling actions
                     def scale_up(trigger, threshold):
-                        return f"Scaling up agents based on {trigger} with threshold {threshold}%"
+                        return configure_scaling({"trigger": triggers[trigger], "scale_up_threshold": threshold})
 
                     def scale_down(trigger, threshold):
-                        return f"Scaling down agents based on {trigger} with threshold {threshold}%"
+                        return configure_scaling({"trigger": triggers[trigger], "scale_down_threshold": threshold})
+
+                    def refresh_scaling():
+                        ok, result = call_backend("GET", "/autoscaling")
+                        return describe_autoscaling(result) if ok else result
 
-                    scale_up_button.click(scale_up, inputs=[scaling_trigger, trigger_threshold], outputs=gr.Textbox(label="Scale Up Status"))
-                    scale_down_button.click(scale_down, inputs=[scaling_trigger, trigger_threshold], outputs=gr.Textbox(label="Scale Down Status"))
+                    scale_up_button.click(scale_up, inputs=[scaling_trigger, trigger_threshold], outputs=scaling_status)
+                    scale_down_button.click(scale_down, inputs=[scaling_trigger, trigger_threshold], outputs=scaling_status)
+                    refresh_scaling_button.click(refresh_scaling, outputs=scaling_status)
 
                 with gr.Accordion("Load Balancing Strategies"):
                
                     gr.Markdown("""
                     **Description:**
-                    Offer multiple load balancing strategies (e.g., round-robin, least connections, IP hash) that can be configured per project or agent group. Integrate with existing load balancers and provide analytics on load distribution efficiency.
+                    Choose how LLM calls are spread across replicas of a model: round-robin, least outstanding requests, EWMA latency or power of two choices. Replicas that keep failing or run far slower than their peers are ejected for a while.
                     """)
-                    load_balancing_strategy = gr.Dropdown(label="Load Balancing Strategy", choices=["Round-robin", "Least Connections", "IP Hash"])
+                    strategies = {
+                        "Round-robin": "round_robin",
+                        "Least Outstanding Requests": "least_outstanding",
+                        "EWMA Latency": "ewma",
+                        "Power of Two Choices": "p2c",
+                    }
+                    load_balancing_strategy = gr.Dropdown(label="Load Balancing Strategy", choices=list(strategies), value="Power of Two Choices")
                     apply_strategy_button = gr.Button("Apply Strategy")
 
-                    # Placeholder function to simulate applying load balancing strategy
+                    # Switches how LLM calls are spread across model replicas in the backend
                     def apply_strategy(strategy):
-                        return f"Load balancing strategy applied: {strategy}"
+                        ok, result = call_backend("PUT", "/llm/load-balancing", json={"strategy": strategies[strategy]})
+                        if not ok:
+                            return f"Could not apply {strategy}: {result}"
+                        replicas = sum(len(balancer["endpoints"]) for balancer in result["providers"].values())
+                        return f"Load balancing strategy applied: {strategy} ({replicas} replicas across {len(result['providers'])} providers)"
 
                     apply_strategy_button.click(apply_strategy, inputs=[load_balancing_strategy], outputs=gr.Textbox(label="Strategy Status"))
 
@@ -479,14 +529,25 @@ def agent_controls():
                     """)
                     agent_id = gr.Textbox(label="Agent ID", placeholder="Enter agent ID here...")
                     health_check_interval = gr.Slider(minimum=1, maximum=60, step=1, label="Health Check Interval (minutes)")
-                    recovery_action = gr.Dropdown(label="Recovery Action", choices=["Restart Agent", "Notify Admin", "Escalate Issue"])
+                    recovery_actions = {"Restart Agent": "restart", "Reassign Tasks": "reassign", "Notify Admin": "alert"}
+                    recovery_action = gr.Dropdown(label="Recovery Action", choices=list(recovery_actions))
+                    failure_threshold = gr.Slider(minimum=1, maximum=10, step=1, value=3, label="Consecutive Failures Before Recovery")
                     setup_health_check_button = gr.Button("Setup Health Check")
 
-                    # Placeholder function to simulate health check setup
-                    def setup_health_check(agent_id, interval, action):
-                        return f"Health check set for agent {agent_id} with interval {interval} minutes and action '{action}'"
-
-                    setup_health_check_button.click(setup_health_check, inputs=[agent_id, health_check_interval, recovery_action], outputs=gr.Textbox(label="Health Check Setup Status"))
+                    def setup_health_check(agent_id, interval, action, threshold):
+                        if not str(agent_id).strip().isdigit():
+                            return "Enter a numeric agent ID"
+                        if action not in recovery_actions:
+                            return "Choose a recovery action"
+                        ok, result = call_backend("PUT", f"/agents/{int(agent_id)}/health-check", json={
+                            "interval": interval * 60, "action": recovery_actions[action], "failure_threshold": int(threshold),
+                        })
+                        if not ok:
+                            return f"Health check not set up: {result}"
+                        return (f"Health check set for agent {agent_id} every {interval} minutes; "
+                                f"'{action}' after {result['failure_threshold']} consecutive failures")
+
+                    setup_health_check_button.click(setup_health_check, inputs=[agent_id, health_check_interval, recovery_action, failure_threshold], outputs=gr.Textbox(label="Health Check Setup Status"))
 
     return app
 
@@ -543,7 +604,11 @@ def collaboration_governance():
         
         def send_message(message, chat_history):
             chat_history.append(("Current Agent", message))
-            return chat_history
+            yield chat_history
+            chat_history.append(("Assistant", ""))
+            for reply in stream_reply(message):
+                chat_history[-1] = ("Assistant", reply)
+                yield chat_history
         
         send_button.click(send_message, inputs=[message_input, chat_history], outputs=chat_history)
         
@@ -707,55 +772,51 @@ def governance():
 
   return gr.Column()
 def analytics_reporting():
-    with gr.Accordion("Key Metrics", open=True):
-        # Sample data
-        dates = ["2023-01-01", "2023-01-08", "2023-01-15", "2023-01-22", "2023-01-29",
-                 "2023-02-05", "2023-02-12", "2023-02-19", "2023-02-26", "2023-03-05",
-                 "2023-03-12", "2023-03-19", "2023-03-26", "2023-04-02", "2023-04-09"]
-        total_agents = [500, 525, 540, 560, 575, 590, 600, 615, 630, 645, 660, 675, 690, 700, 710]
-        active_agents = [375, 395, 410, 430, 445, 460, 475, 490, 505, 520, 535, 550, 565, 580, 595]
-        tasks_completed = [8000, 8500, 9200, 9800, 10400, 11000, 11600, 12200, 12800, 13400, 14000, 14600, 15200, 15800, 16400]
-        avg_rating = [4.5, 4.52, 4.54, 4.56, 4.58, 4.6, 4.62, 4.64, 4.66, 4.68, 4.7, 4.72, 4.74, 4.76, 4.78]
-
-        agent_metrics = {
-            "Date": dates,
-            "Total Agents": total_agents,
-            "Active Agents": active_agents,
-            "Tasks Completed": tasks_completed,
-            "Avg Rating": avg_rating
-        }
-
-        agent_teams = {
-            "Team": ["Sales", "Support", "Marketing", "Analytics", "HR"],
-            "Agents": [120, 180, 95, 65, 40],
-            "Tasks": [3200, 4800, 2400, 1600, 800],
-            "Avg Rating": [4.7, 4.75, 4.65, 4.8, 4.72]
-        }
-
+    # Imported here so plotly loads with the first visit of the tab, not at startup
+    from frontend.components.charts import TIMEFRAMES, analytics_charts
+
+    with gr.Accordion("Key Metrics", open=True) as key_metrics:
+        # The tab is built on its first visit (see lazy_tab), so the figures are drawn
+        # with it; the accordion, timeframe and Load Metrics redraw them
+        charts, status = analytics_charts("Last 30 Days")
+        figures = [figure for _, figure in charts]
         with gr.Row():
             with gr.Column():
-                fig1 = px.line(agent_metrics, x='Date', y=['Total Agents', 'Active Agents'], title='Agent Workforce Metrics Over Time')
-                plot1 = gr.Plot(fig1)
+                plot1 = gr.Plot(figures[0])
             with gr.Column():
-                fig2 = px.line(agent_metrics, x='Date', y='Tasks Completed', title='Tasks Completed Over Time')
-                plot2 = gr.Plot(fig2)
+                plot2 = gr.Plot(figures[1])
 
         with gr.Row():
             with gr.Column():
-                fig3 = px.bar(agent_metrics, x='Date', y='Avg Rating', title='Average Agent Rating Over Time')
-                plot3 = gr.Plot(fig3)
+                plot3 = gr.Plot(figures[2])
             with gr.Column():
-                fig4 = px.bar(agent_teams, x='Team', y=['Agents', 'Tasks'], barmode='group', title='Agent Performance by Team')
-                plot4 = gr.Plot(fig4)
+                plot4 = gr.Plot(figures[3])
+
+        with gr.Row():
+            metrics_timeframe = gr.Dropdown(list(TIMEFRAMES), value="Last 30 Days", label="Timeframe")
+            refresh_metrics_button = gr.Button("Load Metrics")
+            metrics_status = gr.Textbox(value=status, label="Metrics Status")
 
         # Additional example
         with gr.Row():
           with gr.Column():
-              fig5 = px.scatter(agent_metrics, x='Tasks Completed', y='Avg Rating', color='Active Agents', title='Correlation Between Tasks Completed, Rating, and Active Agents')
-              plot5 = gr.Plot(fig5)
+              plot5 = gr.Plot(figures[4])
           with gr.Column():
-              fig6 = px.pie(agent_teams, values='Agents', names='Team', title='Agent Distribution by Team')
-              plot6 = gr.Plot(fig6)
+              plot6 = gr.Plot(figures[5])
+
+        # Cache keys of the figures this session already shows; those are not sent again
+        shown_charts = gr.State(tuple(key for key, _ in charts))
+
+        def render_charts(timeframe, shown):
+            charts, status = analytics_charts(timeframe)
+            keys = tuple(key for key, _ in charts)
+            figures = [gr.skip() if key in shown else figure for key, figure in charts]
+            return (*figures, status, keys)
+
+        chart_outputs = [plot1, plot2, plot3, plot4, plot5, plot6, metrics_status, shown_charts]
+        refresh_metrics_button.click(render_charts, inputs=[metrics_timeframe, shown_charts], outputs=chart_outputs)
+        metrics_timeframe.change(render_charts, inputs=[metrics_timeframe, shown_charts], outputs=chart_outputs)
+        key_metrics.expand(render_charts, inputs=[metrics_timeframe, shown_charts], outputs=chart_outputs)
 
     with gr.Accordion("Reporting", open=True):
       with gr.Tab("Custom Reports"):
@@ -791,21 +852,38 @@ def analytics_reporting():
           
           forecast_button = gr.Button("Generate Forecast")
           
-          forecast_plot = gr.LinePlot(x="Date", y="Value", title="Forecast for Tasks Completed")
+          forecast_plot = gr.LinePlot(x="Date", y="Value", color="Series", title="Forecast for Tasks Completed")
+          forecast_status = gr.Textbox(label="Forecast Status")
           
           def generate_report(report_type, report_period, start_date, end_date):
               # Placeholder logic to generate custom report based on selected parameters
               return report_output
           
+          forecast_metric_names = {"Total Agents": "total_agents", "Active Agents": "active_agents", "Tasks Completed": "tasks_completed", "Avg Rating": "avg_rating"}
+          forecast_horizons = {"Next 7 Days": 7, "Next 30 Days": 30, "Next 6 Months": 182, "Next Year": 365}
+
+          # Holt-Winters forecast from the backend's forecaster, drawn after the history it was fitted on
           def generate_forecast(metric, period):
-              # Placeholder logic to generate forecast based on selected parameters
-              dates = pd.date_range(start='2023-01-01', end='2023-06-01', freq='W')
-              values = np.random.randint(10000, 20000, size=len(dates))
-              forecast_data = pd.DataFrame({"Date": dates, "Value": values})
-              forecast_plot.plot(forecast_data, x="Date", y="Value", title=f"Forecast for {metric} ({period})")
+              ok, result = call_backend("GET", "/forecast", params={"metric": forecast_metric_names[metric], "horizon": forecast_horizons[period]})
+              if not ok:
+                  return gr.update(), f"Forecast not generated: {result}"
+              if not result["forecast"]:
+                  return gr.update(), f"No {metric} history to forecast from yet"
+              history = pd.DataFrame(result["history"], columns=["t", "value"]).assign(Series="History")
+              forecast = pd.DataFrame(result["forecast"])
+              frame = pd.concat([
+                  history,
+                  forecast[["t", "value"]].assign(Series="Forecast"),
+                  forecast[["t", "lower"]].rename(columns={"lower": "value"}).assign(Series="Lower (80%)"),
+                  forecast[["t", "upper"]].rename(columns={"upper": "value"}).assign(Series="Upper (80%)"),
+              ])
+              frame = pd.DataFrame({"Date": pd.to_datetime(frame["t"], unit="s"), "Value": frame["value"], "Series": frame["Series"]})
+              model = result["model"]
+              return (gr.update(value=frame, title=f"Forecast for {metric} ({period})"),
+                      f"Fitted on {model['observations']} days (alpha={model['alpha']}, beta={model['beta']}, gamma={model['gamma']})")
       
       generate_report_button.click(generate_report, inputs=[report_type_dropdown, report_period_dropdown, start_date_input, end_date_input], outputs=report_output)
-      forecast_button.click(generate_forecast, inputs=[forecast_metric_dropdown, forecast_period_dropdown], outputs=forecast_plot)    
+      forecast_button.click(generate_forecast, inputs=[forecast_metric_dropdown, forecast_period_dropdown], outputs=[forecast_plot, forecast_status])    
       
       
     return gr.Column(plot1, plot2, plot3, plot4, plot5, plot6)
@@ -968,33 +1046,24 @@ def documentation():
         with gr.Tab("Search Documentation"):
             gr.Markdown("## Search Documentation\nLearn how to effectively search and retrieve information from the documentation.")
 
-with gr.Blocks() as app:
-    documentation()
+# Tabs of the dashboard; the first is built with the Blocks, the others on first visit
+TABS = [
+    ("Agent Management", agent_management),
+    ("Agentic Command & Control", agent_controls),
+    ("Collaboration & Governance", collaboration_governance),
+    ("Governance", governance),
+    ("Analytics & Reporting", analytics_reporting),
+    ("System Settings", system_settings),
+    ("Documentation", documentation),
+]
 
 with gr.Blocks() as agentic_dashboard:
   gr.Markdown("# 🪰 Agentic Employment Infrastructure")
   gr.Markdown("### Manage an adaptive network of autonomous agents")
 
-  with gr.Tab("Agent Management"):
-    agent_management()
-
-  with gr.Tab("Agentic Command & Control"):
-    agent_controls()
-
-  with gr.Tab("Collaboration & Governance"):
-    collaboration_governance()
-
-  with gr.Tab("Governance"):
-    governance()
-
-  with gr.Tab("Analytics & Reporting"):
-    analytics_reporting()
-      
-  with gr.Tab("System Settings"):
-    system_settings()
-
-  with gr.Tab("Documentation"):
-    documentation()  
+  for index, (label, build) in enumerate(TABS):
+    lazy_tab(label, build, lazy=LAZY_TABS and index > 0)
 
 # Launch the interface
-agentic_dashboard.launch(debug=True)
\ No newline at end of file
+if __name__ == "__main__":
+  agentic_dashboard.launch(debug=True)
@@ -7,7 +7,11 @@ CREATE TABLE agent_metrics (
     active_agents INT NOT NULL,
     tasks_completed INT NOT NULL,
     avg_rating FLOAT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    llm_calls INT NOT NULL DEFAULT 0,
+    llm_cost FLOAT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- The backend's metrics store upserts one row per tenant and date
+    UNIQUE (tenant_id, date)
 );
 
 -- Insert sample data into agent_metrics table